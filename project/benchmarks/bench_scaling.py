@@ -0,0 +1,229 @@
+"""
+Scaling benchmarks for the simulation core.
+
+Sweeps NUM_PATIENTS, NUM_PATHWAYS, NUM_ACTIONS and NUM_STEPS one at a time around a base configuration and times
+initialize_simulation, initialize_patients, run_simulation and each vis_* function separately at every point.
+For each swept parameter the scaling exponent of every timed function is fitted as the slope of log(time) against
+log(parameter), so changes to the engine show up as changes in how it scales, not just in absolute times.
+
+Run with pytest (the file is deliberately not named test_*, so it is not picked up by a normal test run):
+
+    python -m pytest project/benchmarks/bench_scaling.py -s
+
+Results are written as JSON and compared with a stored baseline; test_compare_with_baseline fails, listing each
+one, if any timing or exponent has regressed beyond the tolerance. Settings are read from environment variables:
+
+- BENCH_PROFILE: 'quick' (default, three points per parameter, a few seconds each) or 'full' (adds a further order
+  of magnitude; expect a long run).
+- BENCH_REPEAT: Number of timed repeats per point; the fastest is kept (default 1).
+- BENCH_VIS: Set to 0 to skip the visualisations (default 1).
+- BENCH_OUTPUT: Path of the results JSON (default results.json next to this file).
+- BENCH_BASELINE: Path of the baseline JSON (default baseline.json next to this file).
+- BENCH_TOLERANCE: Allowed fractional slowdown before a timing counts as a regression (default 0.25).
+- BENCH_UPDATE_BASELINE: Set to 1 to save this run's results as the new baseline.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from healthcare_sim import Patient, Pathway, Action, config, initialize_patients, initialize_simulation, run_simulation
+from healthcare_sim import vis
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BASE = {
+    'NUM_PATIENTS': 100,
+    'NUM_PATHWAYS': 10,
+    'NUM_ACTIONS': 10,
+    'NUM_STEPS': 30,
+}
+
+SWEEPS = {
+    'quick': {
+        'NUM_PATIENTS': [10, 100, 1000],
+        'NUM_PATHWAYS': [1, 10, 100],
+        'NUM_ACTIONS': [10, 30, 100],
+        'NUM_STEPS': [10, 30, 100],
+    },
+    'full': {
+        'NUM_PATIENTS': [10, 100, 1000, 10000],
+        'NUM_PATHWAYS': [1, 10, 100, 1000],
+        'NUM_ACTIONS': [10, 30, 100, 300],
+        'NUM_STEPS': [10, 30, 100, 1000],  # Queues build up over long horizons, so run time grows faster than linearly
+    },
+}
+
+PROFILE = os.environ.get('BENCH_PROFILE', 'quick')
+REPEAT = int(os.environ.get('BENCH_REPEAT', '1'))
+VIS = os.environ.get('BENCH_VIS', '1') != '0'
+OUTPUT = os.environ.get('BENCH_OUTPUT', os.path.join(HERE, 'results.json'))
+BASELINE = os.environ.get('BENCH_BASELINE', os.path.join(HERE, 'baseline.json'))
+TOLERANCE = float(os.environ.get('BENCH_TOLERANCE', '0.25'))
+MIN_TIME = 0.05  # Timings below this (seconds) are too noisy to flag
+EXPONENT_TOLERANCE = 0.2
+
+POINTS = [(param, value) for param, values in SWEEPS[PROFILE].items() for value in values]
+RESULTS = {}
+
+
+def timed(timings, name, fn, *args):
+    """
+    Calls fn(*args) REPEAT times, records the fastest wall time under `name` and returns the last result.
+    """
+    best = np.inf
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    timings[name] = best
+    return result
+
+
+def run_point(params, timings):
+    rng = np.random.default_rng(0)
+    output_actions = f"a{params['NUM_ACTIONS'] - 1}"
+    actions, pathways, transition_matrix = timed(
+        timings, 'initialize_simulation', initialize_simulation, Action, Pathway, params['NUM_PATIENTS'],
+        params['NUM_PATHWAYS'], params['NUM_ACTIONS'], config.BASE_CAPACITY, config.IDEAL_CLINICAL_VALUES,
+        config.PROBABILITY_OF_DISEASE, config.INPUT_ACTIONS, output_actions, rng,
+    )
+    patients = timed(
+        timings, 'initialize_patients', initialize_patients, Patient, params['NUM_PATHWAYS'],
+        config.IDEAL_CLINICAL_VALUES, params['NUM_PATIENTS'], rng,
+    )
+    # run_simulation mutates its inputs, so it is timed once whatever REPEAT is
+    start = time.perf_counter()
+    actions_major, _, system_cost_major, activity_log_major, _, _ = run_simulation(
+        Patient, patients, pathways, actions, output_actions, config.INPUT_ACTIONS, config.PROBABILITY_OF_DISEASE,
+        params['NUM_PATHWAYS'], params['NUM_STEPS'], config.IDEAL_CLINICAL_VALUES, rng,
+    )
+    timings['run_simulation'] = time.perf_counter() - start
+    if not VIS:
+        return
+
+    first, last = min(actions_major), max(actions_major)
+    calls = {
+        'vis_heatmaps': (vis.vis_heatmaps, actions_major, first, last),
+        'vis_penalty': (vis.vis_penalty, patients),
+        'vis_activity': (vis.vis_activity, actions_major, first, last),
+        'vis_learning': (vis.vis_learning, system_cost_major, first, last),
+        'vis_change': (vis.vis_change, transition_matrix, actions_major, first, last),
+        'vis_net': (vis.vis_net, transition_matrix),
+    }
+    try:
+        import kaleido  # Needed by plotly to write the sankey image
+        calls['vis_sankey'] = (vis.vis_sankey, activity_log_major[last])
+    except ImportError:
+        pass
+    for name, (fn, *args) in calls.items():
+        timed(timings, name, fn, *args)
+        plt.close('all')
+
+
+def scaling_exponents(results):
+    """
+    Fits log(time) = k * log(value) + c per swept parameter and timed function, and returns the slopes k.
+    """
+    exponents = {}
+    for param, points in results.items():
+        values = sorted(points, key=float)
+        names = set.intersection(*(set(points[v]) for v in values)) if values else set()
+        exponents[param] = {}
+        for name in sorted(names):
+            x = np.log([float(v) for v in values])
+            y = np.log([max(points[v][name], 1e-9) for v in values])
+            if len(x) > 1:
+                exponents[param][name] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+
+def find_regressions(current, baseline):
+    """
+    Lists timings more than TOLERANCE slower than the baseline, and exponents more than EXPONENT_TOLERANCE steeper.
+    Exponents are only compared against a baseline from the same profile, and only where the timings are large
+    enough (MIN_TIME) for the fit to mean something.
+    """
+    regressions = []
+    for param, points in current['timings'].items():
+        for value, timings in points.items():
+            for name, seconds in timings.items():
+                old = baseline['timings'].get(param, {}).get(value, {}).get(name)
+                if old is not None and seconds > MIN_TIME and seconds > old * (1 + TOLERANCE):
+                    regressions.append(f"{name} at {param}={value}: {seconds:.3f}s vs {old:.3f}s baseline")
+    if baseline['meta'].get('profile') != current['meta']['profile']:
+        return regressions
+    for param, fits in current['exponents'].items():
+        for name, k in fits.items():
+            if max(timings[name] for timings in current['timings'][param].values()) < MIN_TIME:
+                continue
+            old = baseline['exponents'].get(param, {}).get(name)
+            if old is not None and k > old + EXPONENT_TOLERANCE:
+                regressions.append(f"{name} scaling in {param}: exponent {k:.2f} vs {old:.2f} baseline")
+    return regressions
+
+
+@pytest.fixture(scope='module', autouse=True)
+def output_dir(tmp_path_factory):
+    """
+    Runs the benchmarks from a scratch directory, so the figures the vis_* functions save to outputs/ are thrown away.
+    """
+    cwd = os.getcwd()
+    scratch = tmp_path_factory.mktemp('bench')
+    os.makedirs(scratch / 'outputs')
+    os.chdir(scratch)
+    yield scratch
+    os.chdir(cwd)
+
+
+@pytest.mark.parametrize('param,value', POINTS, ids=[f'{p}={v}' for p, v in POINTS])
+def test_scaling(param, value):
+    params = dict(BASE, **{param: value})
+    timings = {}
+    run_point(params, timings)
+    RESULTS.setdefault(param, {})[str(value)] = timings
+
+
+def test_compare_with_baseline():
+    if not RESULTS:
+        pytest.skip("No scaling points were run")
+    current = {
+        'meta': {
+            'profile': PROFILE,
+            'repeat': REPEAT,
+            'base': BASE,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'timings': RESULTS,
+        'exponents': scaling_exponents(RESULTS),
+    }
+    with open(OUTPUT, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nScaling exponents ({PROFILE}):")
+    for param, fits in current['exponents'].items():
+        print(f"  {param}: " + ", ".join(f"{name} {k:.2f}" for name, k in fits.items()))
+
+    if os.environ.get('BENCH_UPDATE_BASELINE') == '1':
+        with open(BASELINE, 'w') as f:
+            json.dump(current, f, indent=2)
+        return
+    if not os.path.exists(BASELINE):
+        pytest.skip(f"No baseline at {BASELINE}; rerun with BENCH_UPDATE_BASELINE=1 to create one")
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(current, baseline)
+    assert not regressions, "Performance regressions against baseline:\n" + "\n".join(regressions)
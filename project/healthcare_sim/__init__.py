@@ -1,6 +1,34 @@
 from .action import Action
 from .patient import Patient
 from .pathway import Pathway
-from .build import initialize_patients, initialize_simulation
+from .population import Population
+from .activity_log import ActivityLog
+from .sinks import RecordSink, MemorySink, ChunkedFileSink
+from .snapshot import ActionsSnapshot, ActionSnapshot, PathwaySnapshot
+from .checkpoint import Checkpoint
+from .profiling import PhaseProfiler
+from .transitions import TransitionTable
+from .capacity import CapacityCalendar
+from .policy import QPolicy
+from .thresholds import ThresholdTensor
+from .build import initialize_patients, initialize_population, initialize_simulation
 from .run import run_simulation
-from .vis import vis_heatmaps, vis_penalty, vis_activity, vis_learning, vis_change, vis_sankey, vis_net
+from .events import run_event_simulation
+from .replicate import run_replications
+from .sweep import run_sweep
+from .batched import BatchedSimulation
+
+# The plotting stack (matplotlib, seaborn, plotly, networkx, pandas, IPython) takes over a second to import, so the
+# vis_* functions are only imported from vis.py on first use; the simulation core above needs nothing beyond numpy.
+_VIS_FUNCTIONS = ('vis_heatmaps', 'vis_penalty', 'vis_activity', 'vis_learning', 'vis_change', 'vis_sankey', 'vis_net')
+
+
+def __getattr__(name):
+    if name in _VIS_FUNCTIONS:
+        from . import vis
+        return getattr(vis, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_VIS_FUNCTIONS))
@@ -1,3 +1,8 @@
+from collections import deque
+from healthcare_sim.pqueue import IndexedPriorityQueue
+from healthcare_sim.rng import get_rng
+
+
 class Action:
     """
     Represents an action or intervention in the healthcare simulation.
@@ -8,8 +13,10 @@ class Action:
         effect (dict): A dictionary specifying the effect of the action on clinical variables.
         cost (int): The cost associated with performing the action.
         duration (int): The duration of the action in time steps.
-        queue (list): A priority queue of patients waiting for the action.
+        queue (IndexedPriorityQueue): A priority queue of patients waiting for the action.
+        occupancy (int): Number of patients currently in progress.
         schedule (list): A record of the number of patients served at each time step.
+        metrics (SystemMetrics): Optional aggregator notified of queue and outcome changes.
     """
     
     def __init__(self, name, base_capacity, effect, cost, duration):
@@ -19,32 +26,68 @@ class Action:
         self.effect = effect
         self.cost = cost
         self.duration = duration
-        self.queue = []  # Use a priority queue
-        self.in_progress = []  # List of (patient, remaining_time)
+        self.queue = IndexedPriorityQueue()
+        self._wheel = self._empty_wheel()  # Timing wheel of in-progress patients (see execute)
+        self.occupancy = 0
         self.schedule = []
+        self.metrics = None
+
+    def _empty_wheel(self):
+        return deque([] for _ in range(max(1, self.duration)))
+
+    @property
+    def in_progress(self):
+        """
+        Patients currently in progress, as a list of (patient, remaining_time).
+        """
+        return [(patient, remaining) for remaining, bucket in enumerate(self._wheel, start=1) for patient in bucket]
         
-    def update_capacity(self, day):
+    def update_capacity(self, day, rng=None):
         # Example: capacity reduced by 30% on weekends
-        import numpy as np
+        rng = get_rng(rng)
         
         if day % 7 in [5, 6]:
             self.capacity = int(self.base_capacity * 0.7)
         else:
-            fluctuation = np.random.uniform(0.8, 1.2)
+            fluctuation = rng.uniform(0.8, 1.2)
             self.capacity = int(self.base_capacity * fluctuation)
 
+    @staticmethod
+    def priority_score(patient):
+        # Combine priority level and outcomes score for sorting
+        return patient.clinical_penalty + 0.005*patient.queue_penalty
+
     def assign(self, patient):
         """
         Assigns a patient to the action's queue based on their priority.
         - Patients with lower clinical_penalty (worse clinical outcome) and lower queue_penalty (longer wait) get a lower priority_score.
-        - Since heapq is a min-heap, patients with the lowest priority_score are popped first and served earlier.
+        - Since the queue is a min-heap, patients with the lowest priority_score are popped first and served earlier.
         - This ensures that sicker patients and those who have waited longer are prioritized in the queue.
+        - The queue entry is recorded on the patient (queue_entries) so its priority can be updated while they wait.
         """
-        import heapq
-                
-        # Combine priority level and outcomes score for sorting
-        priority_score = patient.outcomes['clinical_penalty'] + 0.005*patient.outcomes['queue_penalty']
-        heapq.heappush(self.queue, (priority_score, patient.pid, patient))
+        entry_id = self.queue.push(patient, Action.priority_score(patient), patient.pid)
+        patient.queue_entries[self, entry_id] = None
+        if self.metrics is not None:
+            self.metrics.queue_changed(1)
+
+    def assign_many(self, patients):
+        """
+        Assigns a batch of patients (e.g. all same-step arrivals) to the action's queue in one bulk heap operation.
+        """
+        entry_ids = self.queue.push_many(patients, [Action.priority_score(p) for p in patients], [p.pid for p in patients])
+        for entry_id, patient in zip(entry_ids, patients):
+            patient.queue_entries[self, entry_id] = None
+        if self.metrics is not None:
+            self.metrics.queue_changed(len(patients))
+
+    @staticmethod
+    def reprioritise(patient):
+        """
+        Re-scores every queue entry the patient is waiting on after their outcomes have changed, so triage uses current rather than stale priorities.
+        """
+        priority_score = Action.priority_score(patient)
+        for action, entry_id in patient.queue_entries:
+            action.queue.update(entry_id, priority_score)
         
     
     def update_log(self, patient, pathway, current_action, step, activity_log):
@@ -52,16 +95,15 @@ class Action:
         # Determine previous action from patient history
         prev_action = pathway.get_last_action_on_pathway(patient)
         
-        activity_log.append({
-            "pathway_code": pathway.name,
-            "pathway_flag": patient.diseases[pathway.name],
-            "patient_id": patient.pid,
-            "simulation_time": step,
-            "previous_action": prev_action,
-            "action_name": current_action,
-            "next_action": self.name
-            
-        })
+        activity_log.record(
+            pathway.name,
+            patient.has_disease(pathway.name),
+            patient.pid,
+            step,
+            prev_action,
+            current_action,
+            self.name,
+        )
 
     
     def execute(self, IDEAL_CLINICAL_VALUES):
@@ -69,40 +111,68 @@ class Action:
         Processes patients assigned to this action for the current simulation step.
 
         - Updates the status of patients currently in progress, moving those who have completed the action to a finished list.
+          In-progress patients are held in a timing wheel: one bucket per remaining step, with the bucket due to finish at the front.
+          As duration is fixed per action, each step just pops the front bucket and opens a new one at the back for patients
+          starting now, so the cost is O(finished + started) rather than O(in progress).
         - Moves patients from the queue to in-progress if there is available capacity, applies the action's clinical effects, and updates their outcomes.
+          The patients admitted this step are the top entries of the queue when execution starts, taken in one batch; each admitted patient's
+          other queue entries are then re-prioritised from their new outcomes.
         - Tracks the number of patients served at this step in the schedule.
         - Returns a tuple containing:
             - finished_patients: List of patients who have completed this action during this step.
             - cost: Total cost incurred by the action for this step (number of finished patients multiplied by the action's cost).
         """
-        import heapq
-        
         # Update in-progress patients
-        finished_patients = []
-        new_in_progress = []
-        for patient, remaining_time in self.in_progress:
-            if remaining_time > 1:
-                new_in_progress.append((patient, remaining_time - 1))
-            else:
-                finished_patients.append(patient)
-        self.in_progress = new_in_progress
+        finished_patients = self._wheel.popleft()
+        starting = []
+        self._wheel.append(starting)
+        self.occupancy -= len(finished_patients)
 
         # Move patients from queue to in-progress if capacity allows
-        available_slots = self.capacity - len(self.in_progress)
-        for _ in range(available_slots):
-            if self.queue:
-                _, _, patient = heapq.heappop(self.queue)
-                patient.queue_time += 1  # Still count as queue time until assigned?
-                patient.apply_action(self.effect, IDEAL_CLINICAL_VALUES)
-                patient.score_outcomes(IDEAL_CLINICAL_VALUES)
-                self.in_progress.append((patient, self.duration))
-        self.schedule.append(len(self.in_progress))
+        available_slots = self.capacity - self.occupancy
+        admitted = self.queue.pop_many(available_slots)
+        if admitted and self.metrics is not None:
+            self.metrics.queue_changed(-len(admitted))
+        for _, _, entry_id, patient in admitted:
+            del patient.queue_entries[self, entry_id]
+        for _, _, _, patient in admitted:
+            patient.queue_time += 1  # Still count as queue time until assigned?
+            patient.apply_action(self.effect, IDEAL_CLINICAL_VALUES)
+            patient.score_outcomes(IDEAL_CLINICAL_VALUES, self.metrics)
+            Action.reprioritise(patient)
+            starting.append(patient)
+        self.occupancy += len(starting)
+        self.schedule.append(self.occupancy)
 
         # Return finished patients and cost
         return finished_patients, len(finished_patients) * self.cost
             
+    def restore(self, queue_entries, in_progress, schedule, next_entry_id=None):
+        """
+        Restores the action's dynamic state, e.g. from a checkpoint.
+
+        Args:
+            queue_entries (list): Queue entries as [priority, tiebreak, entry_id, patient], keeping their original ids.
+            in_progress (list): In-progress patients as (patient, remaining_time).
+            schedule (list): The schedule so far.
+            next_entry_id (int, optional): The id the queue's next entry will get (see IndexedPriorityQueue.next_id).
+        """
+        self.queue = IndexedPriorityQueue.from_entries(queue_entries, next_entry_id)
+        for _, _, entry_id, patient in queue_entries:
+            patient.queue_entries[self, entry_id] = None
+        self._wheel = self._empty_wheel()
+        for patient, remaining in in_progress:
+            self._wheel[remaining - 1].append(patient)
+        self.occupancy = len(in_progress)
+        self.schedule = list(schedule)
+
     def reset(self):
-        self.queue = []
-        self.in_progress = []
+        if self.metrics is not None:
+            self.metrics.queue_changed(-len(self.queue))
+        for _, _, entry_id, patient in self.queue.entries():
+            patient.queue_entries.pop((self, entry_id), None)
+        self.queue = IndexedPriorityQueue()
+        self._wheel = self._empty_wheel()
+        self.occupancy = 0
         self.schedule = []
     
\ No newline at end of file
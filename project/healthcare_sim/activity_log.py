@@ -0,0 +1,230 @@
+import os
+import numpy as np
+
+
+class ActivityLog:
+    """
+    Columnar, chunked log of pathway transitions.
+
+    Each transition is stored as one row of a fixed-size NumPy structured array ("chunk"); a new chunk is
+    allocated when the current one fills, so appending never copies earlier rows. Pathway and action names are
+    dictionary-encoded as small integers (-1 for None) and patient ids and steps are stored as int32. Codes are int16,
+    so a log holds at most MAX_LABELS distinct pathway names and MAX_LABELS distinct action names.
+
+    Attributes:
+        chunk_size (int): Number of rows per chunk.
+        pathway_labels (list): Pathway codes, indexed by their integer code.
+        action_labels (list): Action names, indexed by their integer code.
+    """
+
+    COLUMNS = ["pathway_code", "pathway_flag", "patient_id", "simulation_time", "previous_action", "action_name", "next_action"]
+    DTYPE = np.dtype([
+        ("pathway_code", np.int16),
+        ("pathway_flag", np.bool_),
+        ("patient_id", np.int32),
+        ("simulation_time", np.int32),
+        ("previous_action", np.int16),
+        ("action_name", np.int16),
+        ("next_action", np.int16),
+    ])
+    MAX_LABELS = int(np.iinfo(np.int16).max) + 1  # Codes 0 .. int16 max
+
+    def __init__(self, chunk_size=65536):
+        self.chunk_size = chunk_size
+        self.pathway_labels = []
+        self.action_labels = []
+        self._pathway_codes = {}
+        self._action_codes = {}
+        self._chunks = []
+        self._fill = chunk_size  # Forces allocation of the first chunk on the first record
+
+    def _encode(self, label, labels, codes):
+        if label is None:
+            return -1
+        code = codes.get(label)
+        if code is None:
+            if len(labels) == self.MAX_LABELS:
+                raise ValueError(f"An ActivityLog holds at most {self.MAX_LABELS} distinct labels per column; cannot add {label!r}")
+            code = codes[label] = len(labels)
+            labels.append(label)
+        return code
+
+    def record(self, pathway_code, pathway_flag, patient_id, simulation_time, previous_action, action_name, next_action):
+        """
+        Appends one transition to the log.
+        """
+        if self._fill == self.chunk_size:
+            self._chunks.append(np.empty(self.chunk_size, dtype=self.DTYPE))
+            self._fill = 0
+        self._chunks[-1][self._fill] = (
+            self._encode(pathway_code, self.pathway_labels, self._pathway_codes),
+            pathway_flag,
+            patient_id,
+            simulation_time,
+            self._encode(previous_action, self.action_labels, self._action_codes),
+            self._encode(action_name, self.action_labels, self._action_codes),
+            self._encode(next_action, self.action_labels, self._action_codes),
+        )
+        self._fill += 1
+
+    def clear(self):
+        """
+        Drops all rows (e.g. once they have been written out) while keeping the label tables, so codes stay stable.
+        """
+        self._chunks = []
+        self._fill = self.chunk_size
+
+    def append(self, entry):
+        """
+        Appends one transition given as a dict with the keys in COLUMNS (the old list-of-dicts form).
+        """
+        self.record(*(entry[c] for c in self.COLUMNS))
+
+    def __len__(self):
+        if not self._chunks:
+            return 0
+        return (len(self._chunks) - 1) * self.chunk_size + self._fill
+
+    def chunks(self):
+        """
+        Yields the filled part of each chunk as a structured array view (no copy).
+        """
+        for i, chunk in enumerate(self._chunks):
+            yield chunk if i < len(self._chunks) - 1 else chunk[:self._fill]
+
+    def to_numpy(self):
+        """
+        Returns the whole log as one structured array. This is a view when the log fits in a single chunk.
+        """
+        parts = list(self.chunks())
+        if not parts:
+            return np.empty(0, dtype=self.DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def __iter__(self):
+        """
+        Yields each transition as a dict, as the old list-of-dicts log did. Prefer to_pandas() for large logs.
+        """
+        for chunk in self.chunks():
+            for row in chunk:
+                yield self._decode_row(row)
+
+    def _decode_row(self, row):
+        def action(code):
+            return self.action_labels[code] if code >= 0 else None
+        return {
+            "pathway_code": self.pathway_labels[row["pathway_code"]],
+            "pathway_flag": bool(row["pathway_flag"]),
+            "patient_id": int(row["patient_id"]),
+            "simulation_time": int(row["simulation_time"]),
+            "previous_action": action(row["previous_action"]),
+            "action_name": action(row["action_name"]),
+            "next_action": action(row["next_action"]),
+        }
+
+    def _frame(self, data):
+        import pandas as pd
+
+        columns = {}
+        for name in self.COLUMNS:
+            if name == "pathway_code":
+                columns[name] = pd.Categorical.from_codes(data[name], categories=self.pathway_labels)
+            elif name in ("previous_action", "action_name", "next_action"):
+                columns[name] = pd.Categorical.from_codes(data[name], categories=self.action_labels)
+            else:
+                columns[name] = data[name]
+        return pd.DataFrame(columns, copy=False)
+
+    def to_pandas(self):
+        """
+        Returns the log as a DataFrame with the same columns as the old list-of-dicts log.
+
+        Pathway and action columns are categoricals built directly from the stored integer codes and the numeric
+        columns wrap the stored arrays, so no per-row Python objects are created.
+        """
+        return self._frame(self.to_numpy())
+
+    def export(self, directory, fmt="npz", prefix="activity"):
+        """
+        Writes the log to disk, one file per chunk.
+
+        Args:
+            directory (str): Directory to write into (created if missing).
+            fmt (str): 'npz' for compressed NumPy archives holding the coded columns and label tables,
+                or 'csv' for decoded text.
+            prefix (str): File name prefix; files are named '<prefix>_<chunk>.<fmt>'.
+
+        Returns:
+            list: Paths of the files written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for i, chunk in enumerate(self.chunks()):
+            path = os.path.join(directory, f"{prefix}_{i:05d}.{fmt}")
+            if fmt == "npz":
+                np.savez_compressed(
+                    path,
+                    pathway_labels=np.array(self.pathway_labels, dtype=str),
+                    action_labels=np.array(self.action_labels, dtype=str),
+                    **{name: chunk[name] for name in self.COLUMNS},
+                )
+            elif fmt == "csv":
+                self._frame(chunk).to_csv(path, index=False)
+            else:
+                raise ValueError(f"Unknown export format: {fmt}")
+            paths.append(path)
+        return paths
+
+    @classmethod
+    def from_arrays(cls, rows, pathway_labels, action_labels, chunk_size=65536):
+        """
+        Builds a log from coded rows (as returned by to_numpy()) and the label tables they were coded with.
+        """
+        log = cls(chunk_size)
+        for label in pathway_labels:
+            log._encode(str(label), log.pathway_labels, log._pathway_codes)
+        for label in action_labels:
+            log._encode(str(label), log.action_labels, log._action_codes)
+        log._append_chunk(np.asarray(rows, dtype=cls.DTYPE))
+        return log
+
+    @classmethod
+    def load(cls, paths, chunk_size=65536):
+        """
+        Rebuilds a log from the .npz files written by export().
+        """
+        log = cls(chunk_size)
+        for path in sorted(paths):
+            with np.load(path) as data:
+                pathway_labels = list(data["pathway_labels"])
+                action_labels = list(data["action_labels"])
+                chunk = np.empty(len(data["patient_id"]), dtype=cls.DTYPE)
+                for name in cls.COLUMNS:
+                    chunk[name] = data[name]
+            # Re-map codes onto this log's label tables; the trailing -1 keeps code -1 (None) as -1
+            for name, labels, own_labels, own_codes in (
+                ("pathway_code", pathway_labels, log.pathway_labels, log._pathway_codes),
+                ("previous_action", action_labels, log.action_labels, log._action_codes),
+                ("action_name", action_labels, log.action_labels, log._action_codes),
+                ("next_action", action_labels, log.action_labels, log._action_codes),
+            ):
+                mapping = np.array([log._encode(str(label), own_labels, own_codes) for label in labels] + [-1], dtype=np.int16)
+                chunk[name] = mapping[chunk[name]]
+            log._append_chunk(chunk)
+        return log
+
+    def _append_chunk(self, rows):
+        """
+        Appends already-encoded rows, filling the current chunk before allocating new ones.
+        """
+        start = 0
+        while start < len(rows):
+            if self._fill == self.chunk_size:
+                self._chunks.append(np.empty(self.chunk_size, dtype=self.DTYPE))
+                self._fill = 0
+            n = min(self.chunk_size - self._fill, len(rows) - start)
+            self._chunks[-1][self._fill:self._fill + n] = rows[start:start + n]
+            self._fill += n
+            start += n
@@ -0,0 +1,300 @@
+import numpy as np
+from healthcare_sim.population import Population
+from healthcare_sim.transitions import TransitionTable
+from healthcare_sim.rng import get_rng
+
+"""
+Batched environments: K independent copies of the system advanced in lockstep.
+
+run_simulation advances one system, pair by pair. A BatchedSimulation holds K copies of the same actions and pathways
+(each with its own cohort, queues and random numbers) with every piece of state carrying a leading copy axis, so each
+step is a fixed number of NumPy calls whatever K is:
+
+- Capacity, decay, onset and next action sampling (or the policy's choice) for every (copy, patient, pathway) at once.
+- Queue service one action at a time, in action order as in run_simulation, but for all K copies in one sort.
+
+Queues are held as counts: the number of entries each patient has in each action's queue. A queue is served lowest
+priority first with ties broken by patient id and then by entry, and the priority of an entry is always its patient's
+current priority score (clinical penalty + 0.005 * queue penalty), as reprioritising keeps it in the object model. So
+the entries of one patient in one queue are interchangeable, and serving a queue only needs the patients sorted by
+(priority, id), not every entry.
+
+The model is the same as run_simulation's, step for step:
+
+- Pairs active at the start of a step move to their next action and inactive pairs may start a disease on an input
+  action, each joining that action's queue.
+- A patient decays once per active pathway (drawn as one N(0.5 * n, 0.1 * sqrt(n)) drift per variable, so the same
+  in distribution as the per-pathway draws, though not draw for draw).
+- Admitting a patient counts a step of queue time, applies the action's effect and rescores them, once per admitted
+  entry; later actions in the same step see the new priorities.
+- The reward of each pair is the same as run_simulation's, including the queue length seen when the pair is reached.
+
+Nothing is logged per patient (no activity log or histories); each step returns per-copy costs, penalties and queue
+lengths. A QPolicy given to run() chooses the next actions of all copies and learns from all of them with one batch
+of TD updates per step, so one episode of K copies gives it K episodes of experience.
+"""
+
+
+class BatchedSimulation:
+    """
+    K copies of the simulation, stored as arrays with a leading copy axis.
+
+    Attributes:
+        num_copies (int): Number of copies K.
+        table (TransitionTable): The transitions, in the action order of `actions`.
+        clinical (np.ndarray): K x N x C clinical values.
+        diseases (np.ndarray): K x N x P disease flags, in `pathways` order.
+        current (np.ndarray): K x N x P current action code on each pathway (-1 before the first).
+        queue_time (np.ndarray): K x N time spent in queues.
+        queue_penalty (np.ndarray): K x N queue penalties.
+        clinical_penalty (np.ndarray): K x N clinical penalties.
+        sickness (np.ndarray): K x N sickness bands.
+        capacity (np.ndarray): K x A capacity of each action this step.
+        calendar (CapacityCalendar): The capacity calendar the copies share, if any.
+        occupancy (np.ndarray): K x A patients in progress on each action.
+        queue (np.ndarray): K x A x N number of entries each patient has in each action's queue.
+        queue_length (np.ndarray): Total queue entries per copy.
+        schedule (list): One K x A occupancy array per step of the current episode.
+    """
+
+    def __init__(self, NUM_COPIES, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, PROBABILITY_OF_DISEASE,
+                 IDEAL_CLINICAL_VALUES, patients=None, NUM_PATIENTS=None, rng=None, capacity=None):
+        """
+        Args:
+            NUM_COPIES (int): Number of copies K.
+            pathways (list): The pathways (shared by every copy).
+            actions (dict): Action name -> Action (parameters shared by every copy).
+            patients (list or Population, optional): A cohort every copy starts from. If not given, each copy gets
+                its own cohort of NUM_PATIENTS drawn as build.initialize_population does.
+            rng (np.random.Generator, optional): Source of all random numbers.
+            capacity (CapacityCalendar, optional): Capacity of each action at each step, shared by every copy.
+                Without one, capacity is redrawn each step as Action.update_capacity does.
+
+        Raises:
+            ValueError: If OUTPUT_ACTIONS or one of INPUT_ACTIONS is not in `actions`.
+        """
+        self.rng = get_rng(rng)
+        self.num_copies = NUM_COPIES
+        action_names = list(actions)
+        self.calendar = capacity.reindex(action_names) if capacity is not None else None
+        table = pathways[0].transitions if pathways else None
+        if not (isinstance(table, TransitionTable) and table.action_names == action_names
+                and all(pw.transitions is table and pw.name in table for pw in pathways)):
+            table = TransitionTable.from_dict({pw.name: dict(pw.transitions.get(pw.name, {})) for pw in pathways}, action_names)
+        self.table = table
+        self.pathway_codes = np.array([table.pathway_index[pw.name] for pw in pathways], dtype=np.int64)
+        # -1 marks pairs with no next action, so an unknown output action must not fall back to it
+        missing = [a for a in [OUTPUT_ACTIONS, *INPUT_ACTIONS] if a not in table.action_index]
+        if missing:
+            raise ValueError(f"Input or output actions not among the actions: {missing}")
+        self.output = table.action_index[OUTPUT_ACTIONS]
+        self.inputs = np.array([table.action_index[a] for a in INPUT_ACTIONS], dtype=np.int64)
+        self.probability = PROBABILITY_OF_DISEASE
+
+        self.clinical_keys = list(IDEAL_CLINICAL_VALUES.keys())
+        self.ideal = np.array([IDEAL_CLINICAL_VALUES[k] for k in self.clinical_keys], dtype=float)
+        self.lower = 0.4 * self.ideal
+        self.upper = 1.6 * self.ideal
+        acts = list(actions.values())
+        self.base_capacity = np.array([act.base_capacity for act in acts], dtype=float)
+        self.cost = np.array([act.cost for act in acts], dtype=float)
+        self.duration = np.array([max(1, act.duration) for act in acts], dtype=np.int64)
+        self.effect = np.array([[act.effect.get(k, 0) for k in self.clinical_keys] for act in acts], dtype=float)
+
+        K = NUM_COPIES
+        if patients is None:
+            _, _, clinical = Population.draw_attributes(K * NUM_PATIENTS, IDEAL_CLINICAL_VALUES, self.rng)
+            self.clinical = clinical.reshape(K, NUM_PATIENTS, len(self.ideal))
+            self.pid = np.arange(NUM_PATIENTS)
+            self.queue_time = np.zeros((K, NUM_PATIENTS), dtype=np.int64)
+            self.queue_penalty = np.full((K, NUM_PATIENTS), 1000000, dtype=np.int64)
+            self.clinical_penalty = np.full((K, NUM_PATIENTS), 100, dtype=float)
+            self.sickness = np.zeros((K, NUM_PATIENTS), dtype=np.int8)
+        elif isinstance(patients, Population):
+            self.clinical = np.repeat(patients.clinical[None], K, axis=0)
+            self.pid = np.arange(len(patients))
+            self.queue_time = np.repeat(patients.queue_time[None], K, axis=0)
+            self.queue_penalty = np.repeat(patients.queue_penalty[None], K, axis=0)
+            self.clinical_penalty = np.repeat(patients.clinical_penalty[None], K, axis=0).astype(float)
+            self.sickness = np.repeat(patients.sickness[None], K, axis=0)
+        else:
+            self.clinical = np.repeat(np.array([[p.clinical[k] for k in self.clinical_keys] for p in patients], dtype=float)[None], K, axis=0)
+            self.pid = np.array([p.pid for p in patients], dtype=np.int64)
+            self.queue_time = np.repeat(np.array([p.queue_time for p in patients], dtype=np.int64)[None], K, axis=0)
+            self.queue_penalty = np.repeat(np.array([p.outcomes['queue_penalty'] for p in patients], dtype=np.int64)[None], K, axis=0)
+            self.clinical_penalty = np.repeat(np.array([p.outcomes['clinical_penalty'] for p in patients], dtype=float)[None], K, axis=0)
+            self.sickness = np.repeat(np.array([p.sickness for p in patients], dtype=np.int8)[None], K, axis=0)
+        N, P, A = self.clinical.shape[1], len(pathways), len(acts)
+        self.diseases = np.zeros((K, N, P), dtype=bool)
+        self.current = np.full((K, N, P), -1, dtype=np.int64)
+        self.capacity = np.zeros((K, A), dtype=np.int64)
+        self.reset_episode()
+
+    def reset_episode(self):
+        """
+        Clears disease flags, queues and in-progress patients, as at the start of a major step of run_simulation.
+        Clinical values and outcomes carry over.
+        """
+        K, A = self.num_copies, len(self.cost)
+        self.diseases[:] = False
+        self.occupancy = np.zeros((K, A), dtype=np.int64)
+        self.queue_length = np.zeros(K, dtype=np.int64)
+        self.schedule = []
+        self.queue = np.zeros((K, A, len(self.pid)), dtype=np.int64)
+        self._wheel = np.zeros((K, A, int(self.duration.max())), dtype=np.int64)  # Patients finishing in 1, 2, ... steps
+
+    # --- One step ---
+    def step(self, step, policy=None):
+        """
+        Advances every copy by one step.
+
+        Args:
+            step (int): The step number (sets the weekend capacity pattern, or the calendar column).
+            policy (QPolicy, optional): Chooses the next actions and learns from their rewards.
+
+        Returns:
+            tuple: K-length arrays of the step's cost, the average clinical penalty and the average queue length
+                (sampled, as in run_simulation, after assignment and before the actions execute).
+        """
+        rng = self.rng
+        K, N, P = self.diseases.shape
+        A = len(self.cost)
+
+        # Capacity
+        if self.calendar is not None:
+            self.capacity[:] = self.calendar.at(step)
+        elif step % 7 in [5, 6]:
+            self.capacity[:] = (self.base_capacity * 0.7).astype(np.int64)
+        else:
+            self.capacity[:] = (self.base_capacity * rng.uniform(0.8, 1.2, size=(K, A))).astype(np.int64)
+
+        # Decay: once per pathway active at the start of the step
+        active = self.diseases.copy()
+        counts = active.sum(axis=2)
+        decaying = counts > 0
+        if decaying.any():
+            n = counts[decaying][:, None]
+            drift = np.abs(rng.normal(0.5 * n, 0.1 * np.sqrt(n), size=(len(n), len(self.ideal))))
+            clinical = self.clinical[decaying]
+            direction = np.where(clinical >= self.ideal, 1.0, -1.0)
+            self.clinical[decaying] = np.clip(clinical + direction * drift, self.lower, self.upper)
+
+        # Next actions of active pairs and disease onset on inactive pairs
+        kk, nn, jj = np.nonzero(active)
+        pathway_codes = self.pathway_codes[jj]
+        action_codes = self.current[kk, nn, jj]
+        if policy is not None:
+            state_codes = policy.states(self.sickness[kk, nn], self.queue_length[kk])
+            chosen = policy.choose(pathway_codes, action_codes, state_codes, rng)
+        else:
+            chosen = self.table.sample(pathway_codes, action_codes, rng.random(len(kk)))
+        onset = ~active & (rng.random((K, N, P)) < self.probability)
+        ko, no, jo = np.nonzero(onset)
+        start = self.inputs[rng.integers(len(self.inputs), size=len(ko))]
+
+        assigned_action = np.full((K, N, P), -1, dtype=np.int64)
+        assigned_action[kk, nn, jj] = chosen
+        assigned_action[ko, no, jo] = start
+        assigned = assigned_action >= 0
+
+        # Rewards, with the queue length each pair sees when the step loop reaches it
+        flat = assigned.reshape(K, N * P)
+        queued_before = (np.cumsum(flat, axis=1) - flat).reshape(K, N, P)[kk, nn, jj]
+        system_state = self.queue_length[kk] + queued_before
+        action_cost = np.where(chosen >= 0, self.cost[np.maximum(chosen, 0)], 0.0)
+        rewards = (- 0.25 * action_cost - 0.5 * np.exp(self.clinical_penalty[kk, nn] / 50)
+                   - 0.0001 * self.queue_time[kk, nn] ** 2 - 0.5 * system_state)
+
+        moved = chosen >= 0
+        self.current[kk[moved], nn[moved], jj[moved]] = chosen[moved]
+        finished = chosen == self.output
+        self.diseases[kk[finished], nn[finished], jj[finished]] = False
+        self.diseases[ko, no, jo] = True
+        self.current[ko, no, jo] = start
+
+        # Queue the new entries
+        ka, na, ja = np.nonzero(assigned)
+        index = np.ravel_multi_index((ka, assigned_action[ka, na, ja], na), self.queue.shape)
+        self.queue += np.bincount(index, minlength=self.queue.size).reshape(self.queue.shape)
+        self.queue_length += np.bincount(ka, minlength=K)
+
+        avg_clinical_penalty = self.clinical_penalty.mean(axis=1)
+        avg_queue_length = self.queue_length / A
+
+        # Execute: finish in-progress patients, then admit from each queue in action order
+        done = self._wheel[:, :, 0].copy()
+        self._wheel[:, :, :-1] = self._wheel[:, :, 1:]
+        self._wheel[:, :, -1] = 0
+        self.occupancy -= done
+        step_cost = (done * self.cost).sum(axis=1)
+        for a in range(A):
+            self._serve(a)
+        self.schedule.append(self.occupancy.copy())
+
+        if policy is not None:
+            next_state_codes = policy.states(self.sickness[kk, nn], self.queue_length[kk])
+            policy.learn(pathway_codes, action_codes, state_codes, chosen, rewards, next_state_codes)
+        return step_cost, avg_clinical_penalty, avg_queue_length
+
+    def _serve(self, a):
+        """
+        Admits up to the free capacity of action `a` from its queue in every copy, lowest priority first.
+        """
+        waiting = self.queue[:, a]
+        available = np.maximum(self.capacity[:, a] - self.occupancy[:, a], 0)
+        if not (waiting.any() and available.any()):
+            return
+        priority = self.clinical_penalty + 0.005 * self.queue_penalty
+        order = np.lexsort((np.broadcast_to(self.pid, priority.shape), priority), axis=-1)
+        counts = np.take_along_axis(waiting, order, axis=1)
+        before = np.cumsum(counts, axis=1) - counts
+        admitted = np.zeros_like(waiting)
+        np.put_along_axis(admitted, order, np.clip(available[:, None] - before, 0, counts), axis=1)
+        waiting -= admitted
+
+        # A patient with several entries admitted at once is treated once per entry, as in Action.execute
+        for r in range(int(admitted.max())):
+            k, n = np.nonzero(admitted > r)
+            self.queue_time[k, n] += 1
+            clinical = self.clinical[k, n]
+            clinical = np.where(clinical < self.ideal, clinical + self.effect[a], clinical - self.effect[a])
+            self.clinical[k, n] = clinical
+            self.queue_penalty[k, n] = np.maximum(0, self.queue_penalty[k, n] - self.queue_time[k, n])
+            penalty = np.abs(clinical - self.ideal).sum(axis=1)
+            self.clinical_penalty[k, n] = penalty
+            self.sickness[k, n] = np.where(penalty < 110, 0, np.where(penalty <= 160, 1, 2))
+
+        started = admitted.sum(axis=1)
+        self.occupancy[:, a] += started
+        self._wheel[:, a, self.duration[a] - 1] += started
+        self.queue_length -= started
+
+    # --- Whole runs ---
+    def run(self, NUM_STEPS, NUM_EPISODES=2, policy=None):
+        """
+        Runs NUM_EPISODES major steps of NUM_STEPS steps in every copy.
+
+        Returns:
+            dict: NUM_EPISODES x K x NUM_STEPS arrays 'system_cost' (cumulative cost, as run_simulation's
+                system_cost), 'clinical_penalty_history' and 'queue_length_history', and the last episode's
+                'schedule' as a K x A x NUM_STEPS array.
+        """
+        shape = (NUM_EPISODES, self.num_copies, NUM_STEPS)
+        step_cost = np.zeros(shape)
+        clinical_penalty_history = np.zeros(shape)
+        queue_length_history = np.zeros(shape)
+        for episode in range(NUM_EPISODES):
+            self.reset_episode()
+            if policy is not None:
+                policy.start_episode(episode)
+            for step in range(NUM_STEPS):
+                cost, penalty, queue = self.step(step, policy)
+                step_cost[episode, :, step] = cost
+                clinical_penalty_history[episode, :, step] = penalty
+                queue_length_history[episode, :, step] = queue
+        return {
+            'system_cost': np.cumsum(step_cost, axis=2),
+            'clinical_penalty_history': clinical_penalty_history,
+            'queue_length_history': queue_length_history,
+            'schedule': np.stack(self.schedule, axis=2) if self.schedule else np.zeros((self.num_copies, len(self.cost), 0)),
+        }
@@ -1,10 +1,29 @@
 import numpy as np
+from healthcare_sim.rng import get_rng
+from healthcare_sim.transitions import TransitionTable
+from healthcare_sim.thresholds import ThresholdTensor
+from healthcare_sim.population import Population as _Population
 
-def initialize_patients(Patient, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS=100):
-    patients = [Patient(i, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES) for i in range(NUM_PATIENTS)]
+def initialize_patients(Patient, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS=100, rng=None):
+    """
+    Builds the cohort as Patient objects. Age, sex and clinical values for the whole cohort are drawn up front in
+    one vectorized call each (see Population.draw_attributes) and handed to Patient, which then draws nothing.
+    """
+    rng = get_rng(rng)
+    age, sex, clinical = _Population.draw_attributes(NUM_PATIENTS, IDEAL_CLINICAL_VALUES, rng)
+    patients = [
+        Patient(i, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, age=a, sex=s, clinical=c)
+        for i, (a, s, c) in enumerate(zip(age.tolist(), sex.tolist(), clinical.tolist()))
+    ]
     return patients
 
-def generate_transition_matrix(NUM_PATHWAYS, NUM_ACTIONS, input_actions=None, output_actions=None):
+def initialize_population(Population, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS=100, rng=None):
+    """
+    Builds the cohort in struct-of-arrays form (see population.Population) instead of one Patient object per patient.
+    """
+    return Population.random(NUM_PATIENTS, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, get_rng(rng))
+
+def generate_transition_matrix(NUM_PATHWAYS, NUM_ACTIONS, input_actions=None, output_actions=None, rng=None):
     """
     Generates a transition matrix for healthcare pathways.
 
@@ -14,59 +33,43 @@ def generate_transition_matrix(NUM_PATHWAYS, NUM_ACTIONS, input_actions=None, ou
         input_actions (list, optional): List of action names considered as input actions (entry points).
         output_actions (list or str, optional): List or single action name(s) considered as output actions (exit points).
         intermediate_actions (list, optional): List of action names considered as intermediate actions.
+        rng (np.random.Generator, optional): Source of random numbers.
 
     Returns:
         dict: A nested dictionary where each key is a pathway name (e.g., 'P0'), and each value is a dictionary mapping
             action names to lists of possible next actions. Output actions have empty lists as next actions.
     """
-    import random 
-            
-    transition_matrix = {}
-    for p in range(NUM_PATHWAYS):
-        pathway = f'P{p}'
-        actions_list = [f'a{i}' for i in range(NUM_ACTIONS)]
-        transitions = {}
-        for action in actions_list:
-            if action in output_actions:
-                next_action = []  # Output action has no next actions
-            elif action in input_actions:
-                next_action = random.sample(actions_list, random.randint(1, NUM_ACTIONS)) #random combinations
-            else:
-                actions_list_no_input = [a for a in actions_list if a not in input_actions]
-                next_action = random.sample(actions_list_no_input, random.randint(1, NUM_ACTIONS-len(input_actions))) #random combinations but no input actions
-            transitions[action] = next_action
-        transition_matrix[pathway] = transitions                
-    return transition_matrix
+    rng = get_rng(rng)
+    actions_list = [f'a{i}' for i in range(NUM_ACTIONS)]
+    pathway_list = [f'P{p}' for p in range(NUM_PATHWAYS)]
+    return TransitionTable.random(pathway_list, actions_list, input_actions, output_actions, rng).to_dict()
+
+def initialize_simulation(Action, Pathway, NUM_PATIENTS=100, NUM_PATHWAYS=10, NUM_ACTIONS=10, BASE_CAPACITY=5, IDEAL_CLINICAL_VALUES=None, PROBABILITY_OF_DISEASE=0.1, input_actions='a0', output_actions='a9', rng=None): 
+    rng = get_rng(rng)
 
-def initialize_simulation(Action, Pathway, NUM_PATIENTS=100, NUM_PATHWAYS=10, NUM_ACTIONS=10, BASE_CAPACITY=5, IDEAL_CLINICAL_VALUES=None, PROBABILITY_OF_DISEASE=0.1, input_actions='a0', output_actions='a9'): 
+    # Action parameters, drawn as arrays: each action affects one clinical variable (cycling through them) by ~N(2, 0.05)
+    clinical_keys = list(IDEAL_CLINICAL_VALUES.keys())
+    effect_size = rng.normal(2, 0.05, size=NUM_ACTIONS)
+    cost = rng.integers(20, 100, size=NUM_ACTIONS)
+    duration = rng.integers(1, 3, size=NUM_ACTIONS)
     actions = {
         f'a{i}': Action(
             f'a{i}', 
             base_capacity=BASE_CAPACITY,
-            effect = {k: (np.random.normal(2,0.05) if j == i % 5 else 0) for j, k in enumerate(IDEAL_CLINICAL_VALUES.keys())},
-            cost=np.random.randint(20, 100), 
-            duration=np.random.randint(1, 3)        #removes_disease=random.rand() < 0.1
+            effect = {k: (e if j == i % 5 else 0) for j, k in enumerate(clinical_keys)},
+            cost=c, 
+            duration=d        #removes_disease=random.rand() < 0.1
         )
-        for i in range(NUM_ACTIONS)
+        for i, (e, c, d) in enumerate(zip(effect_size.tolist(), cost.tolist(), duration.tolist()))
     }
 
     intermediate_actions = [a for a in actions if a not in input_actions + [output_actions]]
 
-    threshold_matrix = {
-        f'P{p}': {
-            f'a{i}': {
-                **{k: np.random.normal(v, 5) for k, v in IDEAL_CLINICAL_VALUES.items()},
-                'age': np.random.randint(18, 65),
-                'rand_factor': np.random.uniform(0.2, 0.8)
-            }
-            for i in range(NUM_ACTIONS)
-        }
-        for p in range(NUM_PATHWAYS)
-    }
+    # P x A x (K + 2) tensor of thresholds, readable as the old nested dict
+    threshold_matrix = ThresholdTensor.random([f'P{p}' for p in range(NUM_PATHWAYS)], list(actions), IDEAL_CLINICAL_VALUES, rng)
 
-    transition_matrix = generate_transition_matrix(
-        NUM_PATHWAYS, NUM_ACTIONS, input_actions, output_actions
-    )
+    # Drawn straight into compiled form (see TransitionTable.random); the dict generate_transition_matrix builds is a view of it
+    transition_matrix = TransitionTable.random([f'P{p}' for p in range(NUM_PATHWAYS)], list(actions), input_actions, output_actions, rng)
 
     pathways = [Pathway(f'P{i}', transition_matrix, threshold_matrix) for i in range(NUM_PATHWAYS)]
     
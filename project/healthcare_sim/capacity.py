@@ -0,0 +1,165 @@
+import csv
+import numpy as np
+from healthcare_sim.rng import get_rng
+
+"""
+Capacity calendars: the capacity of every action at every step, precomputed as one actions x steps integer array.
+
+Without a calendar, run_simulation calls Action.update_capacity for every action on every step, which applies the
+weekend rule and draws a fresh fluctuation each time. A CapacityCalendar is built once, either from profiles or from a
+CSV of a real staffing rota, and the step loop only looks up the step's column (see run_simulation's `capacity`).
+
+A profile is any callable profile(action_names, NUM_STEPS, rng) returning capacity factors that broadcast to
+actions x steps. CapacityCalendar.from_profiles multiplies each action's base capacity by the product of its profiles'
+factors and rounds down, as update_capacity does. The profiles here are:
+
+- weekly: a weekend factor on weekend days and a uniform fluctuation on weekdays. weekly() with its defaults is the
+  rule update_capacity applies, so a calendar built from it alone has the same distribution as the per-step draws.
+- seasonal: a cosine over a period of steps (e.g. a winter peak in demand on staff).
+- closures: capacity 0 for given actions over given step ranges (e.g. planned closures or refurbishment).
+
+Calendars shorter than the run are indexed modulo their length, so a weekly or yearly rota can be replayed over any
+horizon.
+
+CSV format: a header 'step,<action>,<action>,...' and one row per step, with steps 0, 1, 2, ... in order.
+"""
+
+WEEKEND_DAYS = (5, 6)
+
+
+# --- Profiles ---
+def weekly(weekend=0.7, weekend_days=WEEKEND_DAYS, fluctuation=(0.8, 1.2), days_per_week=7):
+    """
+    Profile of a weekday/weekend pattern: weekend days get a fixed factor and weekdays a factor drawn uniformly from
+    `fluctuation` for each action and step (None for no fluctuation).
+    """
+    def profile(action_names, NUM_STEPS, rng):
+        weekend_steps = np.isin(np.arange(NUM_STEPS) % days_per_week, weekend_days)
+        if fluctuation is None:
+            weekday = np.ones((len(action_names), NUM_STEPS))
+        else:
+            weekday = rng.uniform(fluctuation[0], fluctuation[1], size=(len(action_names), NUM_STEPS))
+        return np.where(weekend_steps, weekend, weekday)
+    return profile
+
+
+def seasonal(amplitude=0.1, period=365, peak=0):
+    """
+    Profile of a seasonal cycle: 1 + amplitude * cos(2 pi (step - peak) / period), the same for every action.
+    """
+    def profile(action_names, NUM_STEPS, rng):
+        steps = np.arange(NUM_STEPS)
+        return (1 + amplitude * np.cos(2 * np.pi * (steps - peak) / period))[None, :]
+    return profile
+
+
+def closures(periods):
+    """
+    Profile of planned closures: capacity 0 over each period.
+
+    Args:
+        periods (list): (start, stop, actions) tuples; the actions in `actions` (all if None) are closed for steps
+            start <= step < stop.
+    """
+    def profile(action_names, NUM_STEPS, rng):
+        factor = np.ones((len(action_names), NUM_STEPS))
+        for start, stop, closed in periods:
+            rows = slice(None) if closed is None else np.isin(action_names, closed)
+            factor[rows, start:stop] = 0
+        return factor
+    return profile
+
+
+class CapacityCalendar:
+    """
+    Capacity of each action at each step.
+
+    Attributes:
+        action_names (list): Action names, in row order.
+        capacity (np.ndarray): A x S integer array of capacities.
+    """
+
+    def __init__(self, action_names, capacity):
+        self.action_names = list(action_names)
+        self.capacity = np.asarray(capacity, dtype=np.int64).reshape(len(self.action_names), -1)
+        if not self.capacity.shape[1]:
+            raise ValueError("A capacity calendar needs at least one step")
+        self._columns = self.capacity.T.tolist()  # Per-step rows of Python ints, so a lookup is one list index
+
+    @classmethod
+    def from_profiles(cls, actions, NUM_STEPS, profiles=None, rng=None):
+        """
+        Builds a calendar from the actions' base capacities and a list of profiles (default: [weekly()]), drawing any
+        random factors for all actions and steps at once.
+
+        Args:
+            actions (dict): Action name -> Action.
+            NUM_STEPS (int): Length of the calendar in steps.
+            profiles (list, optional): Profiles to combine (see the module docstring).
+            rng (np.random.Generator, optional): Source of random numbers.
+        """
+        rng = get_rng(rng)
+        action_names = list(actions)
+        base_capacity = np.array([act.base_capacity for act in actions.values()], dtype=float)
+        factor = np.ones((len(action_names), NUM_STEPS))
+        for profile in ([weekly()] if profiles is None else profiles):
+            factor = factor * profile(action_names, NUM_STEPS, rng)
+        return cls(action_names, (base_capacity[:, None] * factor).astype(np.int64))
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Loads a calendar from a CSV file (see the module docstring for the format).
+        """
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        if not rows or rows[0][0] != 'step':
+            raise ValueError(f"{path}: expected a header starting with 'step'")
+        steps = [int(row[0]) for row in rows[1:]]
+        if steps != list(range(len(steps))):
+            raise ValueError(f"{path}: steps must be 0, 1, 2, ... in order")
+        capacity = np.array([[int(value) for value in row[1:]] for row in rows[1:]], dtype=np.int64)
+        return cls(rows[0][1:], capacity.T)
+
+    def to_csv(self, path):
+        """
+        Writes the calendar to a CSV file that from_csv reads back.
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(['step'] + self.action_names)
+            for step, column in enumerate(self._columns):
+                writer.writerow([step] + column)
+
+    def __len__(self):
+        return self.capacity.shape[1]
+
+    def reindex(self, action_names):
+        """
+        Returns the calendar with its rows in the order of `action_names`.
+
+        Raises:
+            ValueError: If an action has no row in the calendar.
+        """
+        action_names = list(action_names)
+        if action_names == self.action_names:
+            return self
+        missing = [name for name in action_names if name not in self.action_names]
+        if missing:
+            raise ValueError(f"No capacity calendar for actions: {missing}")
+        rows = [self.action_names.index(name) for name in action_names]
+        return CapacityCalendar(action_names, self.capacity[rows])
+
+    def at(self, step):
+        """
+        Returns the capacity of every action at a step as a list of ints, wrapping around the calendar's length.
+        """
+        return self._columns[step % len(self._columns)]
+
+    def apply(self, actions, step):
+        """
+        Sets the capacity of each action for a step, in place of Action.update_capacity. The actions must be in
+        the calendar's row order (see reindex).
+        """
+        for act, capacity in zip(actions, self.at(step)):
+            act.capacity = capacity
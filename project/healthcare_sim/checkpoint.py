@@ -0,0 +1,365 @@
+import json
+import os
+import numpy as np
+from healthcare_sim.population import Population
+from healthcare_sim.activity_log import ActivityLog
+from healthcare_sim.snapshot import ActionsSnapshot, PathwaySnapshot
+from healthcare_sim.transitions import TransitionTable
+from healthcare_sim.thresholds import ThresholdTensor
+
+"""
+Checkpoint and resume for long runs.
+
+run_simulation(..., checkpoint_every=n, checkpoint_dir=d) writes a checkpoint at the start of every n-th step of each
+major step, before any of that step's random numbers are drawn. A checkpoint is a single .npz file of flat arrays:
+
+- Patients: clinical values, disease flags, comorbidities, sickness, queue time and outcomes as one array each; the
+  per-pathway (current, previous) action index as an N x P x 2 code array; histories as flat code arrays plus lengths.
+- Actions: every queue entry (action, priority, tiebreak, entry id, patient) and every in-progress patient
+  (action, patient, remaining time) as parallel arrays, each queue's next entry id, and the schedules as an
+  actions x steps matrix.
+- Run state: the cost so far, the penalty and queue length histories, the activity log rows, and the schedules,
+  costs and activity logs of major steps already completed.
+- Policy: the Q-table of a learning policy (see policy.py), if the run has one.
+- Sink: in streaming mode, the sink's state (see RecordSink.get_state), e.g. the number of the next chunk to write.
+
+A small JSON header stored alongside holds everything that does not grow with the cohort: the RNG's bit generator
+state, the StepRandom block sizes, the action parameters and the pathway matrices. Nothing
+is pickled, so writing a checkpoint costs a few array copies.
+
+Checkpoint.load rebuilds patients, actions, pathways and the Generator from a file; passing the result to
+run_simulation(..., resume=checkpoint) continues the run exactly where it was saved, giving bit-for-bit the same
+results as a run that was never interrupted.
+"""
+
+FORMAT_VERSION = 2
+
+
+def _rng_from_state(state):
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+
+def _log_arrays(activity_log):
+    return activity_log.to_numpy(), {'pathways': activity_log.pathway_labels, 'actions': activity_log.action_labels}
+
+
+def _code_dtype(num_codes):
+    """
+    Returns the integer dtype for codes 0 .. num_codes - 1 (and -1): int16 where it fits, int32 otherwise.
+    """
+    return np.int16 if num_codes <= np.iinfo(np.int16).max else np.int32
+
+
+def _costs_arrays(system_cost):
+    return np.array(list(system_cost.keys()), dtype=np.int64), np.array(list(system_cost.values()))
+
+
+class Checkpoint:
+    """
+    The complete state of a run at the start of a step.
+
+    run_simulation builds one and calls save() to write it; Checkpoint.load() reads one back with live patients,
+    actions, pathways and Generator, to be passed to run_simulation as `resume`.
+
+    Attributes:
+        patients (list or Population): The cohort.
+        actions (dict): Action name -> Action, with their queues, in-progress patients and schedules.
+        pathways (list): The pathways.
+        rng (np.random.Generator): The run's generator.
+        step_rng_state (dict): The StepRandom's block sizing state (see StepRandom.get_state).
+        major_step (int): Major step the run is in.
+        step (int): Step about to be run.
+        total_clinical_penalty (float): The SystemMetrics running total, kept exactly rather than re-summed.
+        sum_cost (int): Cost so far in this major step.
+        system_cost (dict): Step -> cumulative cost so far in this major step.
+        activity_log (ActivityLog): The current activity log.
+        clinical_penalty_history (list): Average clinical penalty per step so far.
+        queue_length_history (list): Average queue length per step so far.
+        actions_major (dict): Major step -> ActionsSnapshot, for completed major steps.
+        system_cost_major (dict): Major step -> system_cost, for completed major steps.
+        activity_log_major (dict): Major step -> ActivityLog, for completed major steps.
+        policy_state (dict or None): The policy's state (see QPolicy.get_state), if the run has a policy.
+        sink_state (dict or None): The sink's state (see RecordSink.get_state), if the run streams to a sink.
+    """
+
+    def __init__(self, patients, actions, pathways, rng, step_rng_state, major_step, step, total_clinical_penalty,
+            sum_cost, system_cost, activity_log, clinical_penalty_history, queue_length_history, actions_major,
+            system_cost_major, activity_log_major, policy_state=None, sink_state=None):
+        self.patients = patients
+        self.actions = actions
+        self.pathways = pathways
+        self.rng = rng
+        self.step_rng_state = step_rng_state
+        self.major_step = major_step
+        self.step = step
+        self.total_clinical_penalty = total_clinical_penalty
+        self.sum_cost = sum_cost
+        self.system_cost = system_cost
+        self.activity_log = activity_log
+        self.clinical_penalty_history = clinical_penalty_history
+        self.queue_length_history = queue_length_history
+        self.actions_major = actions_major
+        self.system_cost_major = system_cost_major
+        self.activity_log_major = activity_log_major
+        self.policy_state = policy_state
+        self.sink_state = sink_state
+
+    @property
+    def pathways_major(self):
+        return {major_step: [PathwaySnapshot(pw) for pw in self.pathways] for major_step in self.actions_major}
+
+    # --- Writing ---
+    def save(self, path):
+        """
+        Writes the checkpoint to `path` (a .npz file). The file is written under a temporary name and then moved
+        into place, so an interrupted write never leaves a truncated checkpoint behind.
+        """
+        patients = self.patients
+        population = isinstance(patients, Population)
+        action_names = list(self.actions.keys())
+        action_codes = {name: a for a, name in enumerate(action_names)}
+        pathway_names = [pw.name for pw in self.pathways]
+        pathway_codes = {name: j for j, name in enumerate(pathway_names)}
+        position = {id(p): i for i, p in enumerate(patients)}
+        action_dtype = _code_dtype(len(action_names))
+        pathway_dtype = _code_dtype(len(pathway_names))
+        arrays = {}
+
+        # Patients
+        if population:
+            clinical_keys = patients.clinical_keys
+            arrays.update(
+                pid=np.arange(len(patients)), age=patients.age, sex=patients.sex, clinical=patients.clinical,
+                diseases=patients.diseases, comorbidities=patients.comorbidities, sickness=patients.sickness,
+                queue_time=patients.queue_time, queue_penalty=patients.queue_penalty,
+                clinical_penalty=patients.clinical_penalty,
+            )
+        else:
+            clinical_keys = list(patients[0].clinical.keys()) if patients else []
+            arrays.update(
+                pid=np.array([p.pid for p in patients], dtype=np.int64),
+                age=np.array([p.age for p in patients], dtype=np.int64),
+                sex=np.array([p.sex for p in patients], dtype=str),
+                clinical=np.array([[p.clinical[k] for k in clinical_keys] for p in patients], dtype=float),
+                diseases=np.array([[p.diseases[name] for name in pathway_names] for p in patients], dtype=bool),
+                comorbidities=np.array([p.comorbidities for p in patients], dtype=np.int64),
+                sickness=np.array([p.sickness for p in patients], dtype=np.int8),
+                queue_time=np.array([p.queue_time for p in patients], dtype=np.int64),
+                queue_penalty=np.array([p.outcomes['queue_penalty'] for p in patients], dtype=np.int64),
+                clinical_penalty=np.array([p.outcomes['clinical_penalty'] for p in patients], dtype=float),
+            )
+        index = np.full((len(patients), len(pathway_names), 2), -1, dtype=action_dtype)
+        history_length = np.zeros(len(patients), dtype=np.int64)
+        history_action, history_pathway = [], []
+        for i, p in enumerate(patients):
+            for name, (current, previous) in p.pathway_actions.items():
+                j = pathway_codes[name]
+                index[i, j, 0] = action_codes[current]
+                index[i, j, 1] = action_codes[previous] if previous is not None else -1
+            history_length[i] = len(p.history)
+            for action, pathway in p.history:
+                history_action.append(action_codes[action])
+                history_pathway.append(pathway_codes[pathway])
+        arrays.update(
+            pathway_actions=index, history_length=history_length,
+            history_action=np.array(history_action, dtype=action_dtype),
+            history_pathway=np.array(history_pathway, dtype=pathway_dtype),
+        )
+
+        # Actions
+        queue = [(a, entry) for a, act in enumerate(self.actions.values()) for entry in act.queue.entries()]
+        progress = [(a, p, r) for a, act in enumerate(self.actions.values()) for p, r in act.in_progress]
+        arrays.update(
+            queue_action=np.array([a for a, _ in queue], dtype=action_dtype),
+            queue_priority=np.array([e[0] for _, e in queue], dtype=float),
+            queue_tiebreak=np.array([e[1] for _, e in queue], dtype=np.int64),
+            queue_entry_id=np.array([e[2] for _, e in queue], dtype=np.int64),
+            queue_patient=np.array([position[id(e[3])] for _, e in queue], dtype=np.int64),
+            queue_next_id=np.array([act.queue.next_id for act in self.actions.values()], dtype=np.int64),
+            progress_action=np.array([a for a, _, _ in progress], dtype=action_dtype),
+            progress_patient=np.array([position[id(p)] for _, p, _ in progress], dtype=np.int64),
+            progress_remaining=np.array([r for _, _, r in progress], dtype=np.int64),
+            schedule=np.array([act.schedule for act in self.actions.values()], dtype=np.int64).reshape(len(action_names), -1),
+        )
+
+        # Run state
+        arrays['system_cost_steps'], arrays['system_cost_values'] = _costs_arrays(self.system_cost)
+        arrays['activity_log'], log_labels = _log_arrays(self.activity_log)
+        arrays['clinical_penalty_history'] = np.array(self.clinical_penalty_history, dtype=float)
+        arrays['queue_length_history'] = np.array(self.queue_length_history, dtype=float)
+        major_log_labels = {}
+        for major_step, snapshot in self.actions_major.items():
+            arrays[f'major{major_step}_schedule'] = snapshot.schedule
+            steps, values = _costs_arrays(self.system_cost_major[major_step])
+            arrays[f'major{major_step}_system_cost_steps'] = steps
+            arrays[f'major{major_step}_system_cost_values'] = values
+            arrays[f'major{major_step}_activity_log'], major_log_labels[major_step] = _log_arrays(self.activity_log_major[major_step])
+
+        if self.policy_state is not None:
+            arrays['policy_q'] = self.policy_state['q']
+
+        # Pathway matrices are usually shared by every pathway, so each distinct pair is stored once
+        matrices, matrix_index = [], []
+        for pw in self.pathways:
+            for m, (transitions, thresholds) in enumerate(matrices):
+                if pw.transitions is transitions and pw.thresholds is thresholds:
+                    break
+            else:
+                matrices.append((pw.transitions, pw.thresholds))
+                m = len(matrices) - 1
+            matrix_index.append(m)
+
+        header = {
+            'version': FORMAT_VERSION,
+            'population': population,
+            'major_step': self.major_step,
+            'step': self.step,
+            'sum_cost': self.sum_cost,
+            'total_clinical_penalty': self.total_clinical_penalty,
+            'rng': self.rng.bit_generator.state,
+            'step_rng': self.step_rng_state,
+            'clinical_keys': clinical_keys,
+            'ideal': patients.ideal.tolist() if population else None,
+            'actions': [
+                {'name': act.name, 'base_capacity': act.base_capacity, 'effect': act.effect, 'cost': act.cost, 'duration': act.duration}
+                for act in self.actions.values()
+            ],
+            'pathways': pathway_names,
+            'pathway_matrix_index': matrix_index,
+            'pathway_matrices': [
+                {
+                    'transitions': t.to_dict() if isinstance(t, TransitionTable) else t,
+                    'compiled_actions': t.action_names if isinstance(t, TransitionTable) else None,
+                    'thresholds': th.to_dict() if isinstance(th, ThresholdTensor) else th,
+                    'thresholds_compiled': isinstance(th, ThresholdTensor),
+                }
+                for t, th in matrices
+            ],
+            'activity_log_labels': log_labels,
+            'completed_major_steps': list(self.actions_major.keys()),
+            'policy_episode': self.policy_state['episode'] if self.policy_state is not None else None,
+            'major_activity_log_labels': {str(m): labels for m, labels in major_log_labels.items()},
+            'sink_state': self.sink_state,
+        }
+        arrays['header'] = np.array(json.dumps(header))
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    # --- Reading ---
+    @classmethod
+    def load(cls, path, Patient, Action, Pathway, IDEAL_CLINICAL_VALUES=None):
+        """
+        Reads a checkpoint written by save() and rebuilds the run's objects.
+
+        Args:
+            path (str): The checkpoint file.
+            Patient, Action, Pathway: The classes to rebuild the cohort, actions and pathways with.
+            IDEAL_CLINICAL_VALUES (dict, optional): Ideal clinical values, needed to rebuild a list of Patient objects.
+
+        Returns:
+            Checkpoint: The restored state, to be passed to run_simulation as `resume`.
+        """
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        header = json.loads(str(arrays['header']))
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {header['version']}")
+
+        pathway_names = header['pathways']
+        clinical_keys = header['clinical_keys']
+        num_pathways = len(pathway_names)
+
+        # Pathways and actions
+        matrices = header['pathway_matrices']
+        for matrix in matrices:
+            if matrix['compiled_actions'] is not None:
+                matrix['transitions'] = TransitionTable.from_dict(matrix['transitions'], matrix['compiled_actions'])
+            if matrix['thresholds_compiled']:
+                matrix['thresholds'] = ThresholdTensor.from_dict(matrix['thresholds'])
+        pathways = [
+            Pathway(name, matrices[m]['transitions'], matrices[m]['thresholds'])
+            for name, m in zip(pathway_names, header['pathway_matrix_index'])
+        ]
+        actions = {
+            spec['name']: Action(spec['name'], spec['base_capacity'], spec['effect'], spec['cost'], spec['duration'])
+            for spec in header['actions']
+        }
+        action_names = list(actions.keys())
+
+        # Patients
+        if header['population']:
+            ideal_values = dict(zip(clinical_keys, header['ideal']))
+            patients = Population(arrays['age'], arrays['sex'], arrays['clinical'], num_pathways, ideal_values)
+            patients.diseases[:] = arrays['diseases']
+            patients.comorbidities[:] = arrays['comorbidities']
+            patients.sickness[:] = arrays['sickness']
+            patients.queue_time[:] = arrays['queue_time']
+            patients.queue_penalty[:] = arrays['queue_penalty']
+            patients.clinical_penalty[:] = arrays['clinical_penalty']
+        else:
+            if IDEAL_CLINICAL_VALUES is None:
+                raise ValueError("IDEAL_CLINICAL_VALUES is needed to rebuild Patient objects")
+            patients = []
+            for i, pid in enumerate(arrays['pid'].tolist()):
+                p = Patient(pid, num_pathways, IDEAL_CLINICAL_VALUES, age=int(arrays['age'][i]), sex=str(arrays['sex'][i]),
+                    clinical=arrays['clinical'][i].tolist())
+                p.clinical = dict(zip(clinical_keys, arrays['clinical'][i].tolist()))  # Keyed as saved
+                p.diseases = dict(zip(pathway_names, arrays['diseases'][i].tolist()))  # Comorbidities follow from these
+                p.sickness = int(arrays['sickness'][i])
+                p.queue_time = int(arrays['queue_time'][i])
+                p.queue_penalty = int(arrays['queue_penalty'][i])
+                p.clinical_penalty = float(arrays['clinical_penalty'][i])
+                patients.append(p)
+
+        index = arrays['pathway_actions'].tolist()
+        history_action = [action_names[a] for a in arrays['history_action'].tolist()]
+        history_pathway = [pathway_names[j] for j in arrays['history_pathway'].tolist()]
+        start = 0
+        for p, rows, length in zip(patients, index, arrays['history_length'].tolist()):
+            p.pathway_actions = {
+                pathway_names[j]: (action_names[current], action_names[previous] if previous >= 0 else None)
+                for j, (current, previous) in enumerate(rows) if current >= 0
+            }
+            p.history = list(zip(history_action[start:start + length], history_pathway[start:start + length]))
+            p.queue_entries = {}
+            start += length
+
+        # Queues, in-progress patients and schedules
+        queues = [[] for _ in actions]
+        for a, priority, tiebreak, entry_id, i in zip(
+                arrays['queue_action'].tolist(), arrays['queue_priority'].tolist(), arrays['queue_tiebreak'].tolist(),
+                arrays['queue_entry_id'].tolist(), arrays['queue_patient'].tolist()):
+            queues[a].append([priority, tiebreak, entry_id, patients[i]])
+        progress = [[] for _ in actions]
+        for a, i, remaining in zip(arrays['progress_action'].tolist(), arrays['progress_patient'].tolist(), arrays['progress_remaining'].tolist()):
+            progress[a].append((patients[i], remaining))
+        for act, queue, in_progress, schedule, next_id in zip(
+                actions.values(), queues, progress, arrays['schedule'].tolist(), arrays['queue_next_id'].tolist()):
+            act.restore(queue, in_progress, schedule, next_id)
+
+        # Run state
+        def log(key, labels):
+            return ActivityLog.from_arrays(arrays[key], labels['pathways'], labels['actions'])
+
+        def costs(prefix):
+            return dict(zip(arrays[f'{prefix}system_cost_steps'].tolist(), arrays[f'{prefix}system_cost_values'].tolist()))
+
+        actions_major, system_cost_major, activity_log_major = {}, {}, {}
+        for major_step in header['completed_major_steps']:
+            actions_major[major_step] = ActionsSnapshot(actions, arrays[f'major{major_step}_schedule'])
+            system_cost_major[major_step] = costs(f'major{major_step}_')
+            activity_log_major[major_step] = log(f'major{major_step}_activity_log', header['major_activity_log_labels'][str(major_step)])
+
+        return cls(
+            patients, actions, pathways, _rng_from_state(header['rng']), header['step_rng'], header['major_step'],
+            header['step'], header['total_clinical_penalty'], header['sum_cost'], costs(''),
+            log('activity_log', header['activity_log_labels']), arrays['clinical_penalty_history'].tolist(),
+            arrays['queue_length_history'].tolist(), actions_major, system_cost_major, activity_log_major,
+            {'q': arrays['policy_q'], 'episode': header['policy_episode']} if 'policy_q' in arrays else None,
+            header.get('sink_state'),
+        )
@@ -2,6 +2,7 @@ NUM_PATIENTS = 10
 NUM_PATHWAYS = 10
 NUM_ACTIONS = 10
 NUM_STEPS = 30
+NUM_EPISODES = 2  # Major steps; each is one learning episode for a policy (first vs last compares raw and learnt)
 BASE_CAPACITY = 10
 AGE_THRESHOLD = 60
 PROBABILITY_OF_DISEASE = 0.15
@@ -18,5 +19,4 @@ IDEAL_CLINICAL_VALUES = {
 INPUT_ACTIONS = ['a0', 'a1']  # Two standard input actions
 OUTPUT_ACTIONS = 'a9'       # Standard output action
 
-#np.random.seed(0)
-#random.seed(0)
+SEED = None  # Set to an integer for reproducible results
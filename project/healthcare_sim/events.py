@@ -0,0 +1,175 @@
+import heapq
+import math
+import time
+import numpy as np
+from healthcare_sim.population import Population
+from healthcare_sim.metrics import SystemMetrics
+from healthcare_sim.activity_log import ActivityLog
+from healthcare_sim.snapshot import ActionsSnapshot, PathwaySnapshot
+from healthcare_sim.rng import StepRandom, get_rng
+
+"""
+Discrete-event alternative to the fixed-step loop in run.py.
+
+run_simulation visits every patient x pathway pair and every action on every step. run_event_simulation gives the
+same model (same Action, Pathway and Patient methods, same per-step semantics) but only does work when something
+happens, driven by one global heap of events:
+
+- ONSET: a disease starts on a (patient, pathway) pair. Rather than a Bernoulli draw per idle pair per step, the
+  step of the next onset is drawn once from the matching geometric distribution, and only onsets inside the horizon
+  are put on the heap.
+- TRANSITION: an active pair decays and moves to its next action, one step after onset and then every step until it
+  reaches the output action, after which its next onset is drawn.
+- SERVICE: an action with patients queued or in progress refreshes its capacity for the day and executes. Idle
+  actions are never visited; their schedule is 0 for those steps.
+
+Within a step all pair events are handled (in patient, then pathway order, as in run_simulation) before any service
+event, and the penalty and queue length histories are sampled in between. Steps with no events are skipped and their
+history and cost values carried forward. For sparse, low-prevalence scenarios with long horizons this removes almost
+all of the per-step work.
+"""
+
+PAIR, SERVICE = 0, 1
+ONSET, TRANSITION = 0, 1
+
+
+def _next_onset(step, PROBABILITY_OF_DISEASE, rng):
+    """
+    Returns the step of the next disease onset for an idle pair checked from `step` onwards (geometric waiting time).
+    """
+    if PROBABILITY_OF_DISEASE <= 0:
+        return math.inf
+    if PROBABILITY_OF_DISEASE >= 1:
+        return step
+    u = 1.0 - rng.random()  # In (0, 1]
+    return step + int(math.log(u) / math.log(1.0 - PROBABILITY_OF_DISEASE))
+
+
+def run_event_simulation(Patient, patients, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, PROBABILITY_OF_DISEASE,
+        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES, rng=None, NUM_EPISODES=2, capacity=None):
+    """
+    Runs the simulation as a discrete-event model. Takes the same arguments and returns the same results as
+    run_simulation (see run.py). With a CapacityCalendar as `capacity`, a SERVICE event looks up the action's
+    capacity for the day instead of redrawing it.
+    """
+    actions_major = {}
+    pathways_major = {}
+    system_cost_major = {}
+    activity_log_major = {}
+    clinical_penalty_history = []
+    queue_length_history = []
+
+    population = isinstance(patients, Population)
+    rng = get_rng(rng)
+    step_rng = StepRandom(rng)
+    action_list = list(actions.values())
+    action_index = {name: i for i, name in enumerate(actions)}
+    num_pathways = len(pathways)
+    if capacity is not None:
+        capacity = capacity.reindex(list(actions))
+
+    print("Running event simulation...")
+    start_time = time.time()
+
+    for major_step in range(NUM_EPISODES):
+        activity_log = ActivityLog()
+        if population:
+            patients.reset_diseases()
+        else:
+            for p in patients:
+                p.disease_mask = 0
+        metrics = SystemMetrics(patients, actions)
+        for act in action_list:
+            act.metrics = metrics
+
+        step_cost = np.zeros(NUM_STEPS)
+        schedule = np.zeros((len(action_list), NUM_STEPS), dtype=np.int64)
+        clinical_penalty = np.full(NUM_STEPS, np.nan)
+        queue_length = np.full(NUM_STEPS, np.nan)
+        service_due = [-1] * len(action_list)  # Step for which each action already has a SERVICE event
+        initial_clinical_penalty = metrics.avg_clinical_penalty
+        initial_queue_length = metrics.avg_queue_length
+
+        # First onset for every pair, drawn in one vectorized call; pairs with no onset inside the horizon never enter the heap
+        if 0 < PROBABILITY_OF_DISEASE:
+            first = rng.geometric(min(PROBABILITY_OF_DISEASE, 1.0), size=(len(patients), num_pathways)) - 1
+        else:
+            first = np.full((len(patients), num_pathways), NUM_STEPS)
+        events = [
+            (int(first[i, j]), PAIR, int(i) * num_pathways + int(j), ONSET)
+            for i, j in zip(*np.nonzero(first < NUM_STEPS))
+        ]
+        heapq.heapify(events)
+
+        def request_service(action_name, step):
+            a = action_index[action_name]
+            if service_due[a] != step:
+                service_due[a] = step
+                heapq.heappush(events, (step, SERVICE, a, None))
+
+        while events and events[0][0] < NUM_STEPS:
+            step = events[0][0]
+            step_rng.next_step()
+
+            # Onsets and transitions for this step
+            while events and events[0][0] == step and events[0][1] == PAIR:
+                _, _, key, kind = heapq.heappop(events)
+                p = patients[key // num_pathways]
+                pw = pathways[key % num_pathways]
+                if kind == ONSET:
+                    Patient.start_disease(p, pw.name, actions, INPUT_ACTIONS, step_rng)
+                    if population:
+                        p.comorbidities = sum(p.diseases.values())
+                    request_service(pw.get_current_action_on_pathway(p), step)
+                    heapq.heappush(events, (step + 1, PAIR, key, TRANSITION))
+                    continue
+                Patient.clinical_decay(p, IDEAL_CLINICAL_VALUES, step_rng)
+                next_a = pw.next_action(p, actions, major_step, step, activity_log, metrics.system_state, step_rng)
+                if next_a is not None:
+                    request_service(next_a, step)
+                if next_a == OUTPUT_ACTIONS:
+                    p.diseases[pw.name] = False # Remove disease flag as pathway finished
+                    if population:
+                        p.comorbidities = sum(p.diseases.values())
+                    onset = _next_onset(step + 1, PROBABILITY_OF_DISEASE, step_rng)
+                    if onset < NUM_STEPS:
+                        heapq.heappush(events, (onset, PAIR, key, ONSET))
+                else:
+                    heapq.heappush(events, (step + 1, PAIR, key, TRANSITION))
+
+            clinical_penalty[step] = metrics.avg_clinical_penalty
+            queue_length[step] = metrics.avg_queue_length
+
+            # Actions with work to do this step
+            while events and events[0][0] == step:
+                _, _, a, _ = heapq.heappop(events)
+                act = action_list[a]
+                if capacity is not None:
+                    act.capacity = capacity.at(step)[a]
+                else:
+                    act.update_capacity(step, step_rng)
+                _, cost = act.execute(IDEAL_CLINICAL_VALUES)
+                step_cost[step] += cost
+                schedule[a, step] = act.schedule[-1]
+                if act.queue or act.occupancy:
+                    request_service(act.name, step + 1)
+
+        # Carry values forward over steps where nothing happened
+        for t in range(NUM_STEPS):
+            if np.isnan(clinical_penalty[t]):
+                clinical_penalty[t] = clinical_penalty[t - 1] if t else initial_clinical_penalty
+                queue_length[t] = queue_length[t - 1] if t else initial_queue_length
+        clinical_penalty_history.extend(clinical_penalty.tolist())
+        queue_length_history.extend(queue_length.tolist())
+
+        for a, act in enumerate(action_list):
+            act.schedule = schedule[a].tolist()
+        actions_major[major_step] = ActionsSnapshot(actions)
+        pathways_major[major_step] = [PathwaySnapshot(pw) for pw in pathways]
+        system_cost_major[major_step] = dict(enumerate(np.cumsum(step_cost).tolist()))
+        activity_log_major[major_step] = activity_log
+        for act in action_list:
+            act.reset()
+    end_time = time.time()
+    print(f"Run completed in {end_time - start_time:.2f} seconds")
+    return actions_major, pathways_major, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history
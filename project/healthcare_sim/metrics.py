@@ -0,0 +1,47 @@
+import numpy as np
+from healthcare_sim.population import Population
+
+
+class SystemMetrics:
+    """
+    Running totals of system-wide quantities, kept up to date as state changes rather than recomputed.
+
+    Action.assign and Action.execute report queue length changes and Patient.score_outcomes reports changes to a
+    patient's clinical penalty, so every read below is O(1).
+
+    Attributes:
+        total_queue (int): Number of entries currently waiting across all action queues.
+        total_clinical_penalty (float): Sum of clinical penalties over the cohort.
+        num_actions (int): Number of actions in the system.
+        num_patients (int): Number of patients in the cohort.
+    """
+
+    def __init__(self, patients, actions):
+        self.num_actions = len(actions)
+        self.num_patients = len(patients)
+        self.total_queue = sum(len(act.queue) for act in actions.values())
+        if isinstance(patients, Population):
+            # Summed in order, as for Patient objects, so both cohorts start from the same total to the last bit
+            self.total_clinical_penalty = float(sum(patients.clinical_penalty.tolist()))
+        else:
+            self.total_clinical_penalty = float(sum(p.clinical_penalty for p in patients))
+
+    def queue_changed(self, delta):
+        self.total_queue += delta
+
+    def clinical_penalty_changed(self, old, new):
+        # Population rows report NumPy scalars; the total stays a Python float so the histories sampled from it do too
+        self.total_clinical_penalty += float(new - old)
+
+    @property
+    def system_state(self):
+        """Total number of patients queued across all actions."""
+        return self.total_queue
+
+    @property
+    def avg_queue_length(self):
+        return self.total_queue / self.num_actions if self.num_actions else np.nan
+
+    @property
+    def avg_clinical_penalty(self):
+        return self.total_clinical_penalty / self.num_patients if self.num_patients else np.nan
@@ -1,3 +1,6 @@
+from healthcare_sim.rng import get_rng
+
+
 class Pathway:
     """
     Represents a healthcare pathway with transitions and thresholds.
@@ -15,73 +18,71 @@ class Pathway:
         self.thresholds = thresholds
         
     
-    def next_action(self, patient, actions, major_step, step, activity_log, system_state):
+    def next_action(self, patient, actions, major_step, step, activity_log, system_state, rng=None, choice=None):
         """
-        Determines and assigns the next action for a patient within this pathway using an epsilon-greedy Q-learning policy.
+        Determines and assigns the next action for a patient within this pathway.
 
         This method:
             - Identifies the patient's current action on the pathway.
-            - Retrieves valid next actions based on the pathway's transition matrix.
-            - Selects the next action using an epsilon-greedy strategy:
-                * With probability `epsilon`, selects a random valid action (exploration).
-                * Otherwise, selects the action with the highest Q-value for the current state (exploitation).
+            - Uses `choice` if the next action has already been chosen for this step, either by the batched uniform
+              sampler (transitions.sample_next_actions) or epsilon-greedily by a Q-learning policy
+              (policy.QPolicy.choose_next_actions).
+            - Otherwise picks one of the valid next actions from the pathway's transition matrix uniformly at random.
             - Assigns the patient to the chosen action and updates the activity log and patient history.
 
         Args:
             patient (Patient): The patient object whose next action is being determined.
-            q_table (defaultdict): The Q-table mapping states to action values for Q-learning.
-            epsilon (float): The probability of choosing a random action (exploration rate).
+            actions (dict): Action name -> Action.
             major_step (int): The current major step or episode in the simulation.
+            step (int): The current step.
+            activity_log (ActivityLog): The log the transition is recorded in.
+            system_state (int): Total number of patients queued across all actions.
+            rng (np.random.Generator or StepRandom, optional): Source of random numbers.
+            choice (str, optional): The next action if already chosen for this step.
 
         Returns:
-            tuple or None:
-                - (next_action, q_state): The chosen next action (str) and the Q-learning state tuple.
-                - None if no valid next action is available or the patient is not active on this pathway.
+            str or None: The chosen next action, or None if no valid next action is available or the patient is not
+                active on this pathway.
         """  
-        import numpy as np
-        import random 
+        rng = get_rng(rng)
                 
         current_action = self.get_current_action_on_pathway(patient)
-        if current_action is None or self.name not in patient.diseases or not patient.diseases[self.name]:
-            return None
-
-        valid_actions = []
-        if self.name in self.transitions and current_action in self.transitions[self.name]:
-            valid_actions = self.transitions[self.name][current_action]
-        if not valid_actions:
+        if current_action is None or not patient.has_disease(self.name):
             return None
 
-      
-        next_a = random.choice(valid_actions)
+        if choice is not None:
+            next_a = choice
+        else:
+            valid_actions = []
+            if self.name in self.transitions and current_action in self.transitions[self.name]:
+                valid_actions = self.transitions[self.name][current_action]
+            if not valid_actions:
+                return None
+            next_a = valid_actions[rng.integers(len(valid_actions))]
 
         # Assign patient to the chosen action and update log/history
         actions[next_a].assign(patient)
         actions[next_a].update_log(patient, self, current_action, step, activity_log)
-        patient.history.append((next_a, self.name))
+        patient.record_action(next_a, self.name)
         return next_a
     
     def get_last_action_on_pathway(self, patient):
         """
         Returns the last action taken by the patient on the specified pathway.
         If no such action exists, returns None.
+        Reads the patient's per-pathway index, so this is O(1) however long the history grows.
         """
-        found_current = False
-        for action, pw in reversed(patient.history):
-            if pw == self.name:
-                if found_current:
-                    return action
-                found_current = True
-        return None
+        entry = patient.pathway_actions.get(self.name)
+        return entry[1] if entry else None
 
     def get_current_action_on_pathway(self, patient):
         """
         Returns the most recent (current) action taken by the patient on the specified pathway.
         If no such action exists, returns None.
+        Reads the patient's per-pathway index, so this is O(1) however long the history grows.
         """
-        for action, pw in reversed(patient.history):
-            if pw == self.name:
-                return action
-        return None
+        entry = patient.pathway_actions.get(self.name)
+        return entry[0] if entry else None
     
     def reset(self):
         """
@@ -1,41 +1,187 @@
+from collections.abc import MutableMapping
+from functools import lru_cache
+import numpy as np
+from healthcare_sim.rng import get_rng
+
+
+@lru_cache(maxsize=None)
+def pathway_names(NUM_PATHWAYS):
+    """
+    Returns the pathway codes ('P0', 'P1', ...) as a tuple, built once per NUM_PATHWAYS.
+    """
+    return tuple(f'P{p}' for p in range(NUM_PATHWAYS))
+
+
+@lru_cache(maxsize=None)
+def pathway_index(NUM_PATHWAYS):
+    """
+    Returns pathway code -> integer pathway id ({'P0': 0, 'P1': 1, ...}), built once per NUM_PATHWAYS.
+    """
+    return {name: j for j, name in enumerate(pathway_names(NUM_PATHWAYS))}
+
+
+class _DiseaseView(MutableMapping):
+    """
+    Dict-like view of a patient's disease bitmask, keyed by pathway code ({'P0': False, ...}).
+    Reads and writes go straight through to the bitmask.
+    """
+    __slots__ = ('_patient',)
+
+    def __init__(self, patient):
+        self._patient = patient
+
+    def __getitem__(self, pathway):
+        return bool(self._patient.disease_mask >> self._patient._pathways[pathway] & 1)
+
+    def __setitem__(self, pathway, flag):
+        patient = self._patient
+        bit = 1 << patient._pathways[pathway]
+        patient.disease_mask = patient.disease_mask | bit if flag else patient.disease_mask & ~bit
+
+    def __delitem__(self, pathway):
+        raise TypeError("Pathways cannot be deleted")
+
+    def __contains__(self, pathway):
+        return pathway in self._patient._pathways
+
+    def __iter__(self):
+        return iter(self._patient._pathways)
+
+    def __len__(self):
+        return len(self._patient._pathways)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _OutcomesView(MutableMapping):
+    """
+    Dict-like view of a patient's outcome metrics, backed by the patient's queue_penalty and clinical_penalty.
+    """
+    __slots__ = ('_patient',)
+
+    KEYS = ('queue_penalty', 'clinical_penalty')
+
+    def __init__(self, patient):
+        self._patient = patient
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self._patient, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        setattr(self._patient, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Outcome metrics cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class Patient:
     """
     Represents a patient in the healthcare simulation.
 
+    Patients are held in __slots__ rather than a per-instance __dict__, and disease flags are one int bitmask (bit j
+    set when the patient has a disease on pathway j, see pathway_index). `diseases` and `outcomes` are dict-like views
+    for code that reads them by name; the step loop uses has_disease and the penalty attributes directly.
+
     Attributes:
         pid (int): Unique identifier for the patient.
         age (int): Age of the patient.
         sex (str): Gender of the patient ('M' or 'F').
-        diseases (dict): Dictionary indicating the presence of diseases across pathways.
+        disease_mask (int): Bitmask of the pathways the patient has a disease on.
+        diseases (MutableMapping): View of disease_mask as pathway code -> bool.
+        comorbidities (int): Number of active diseases (the popcount of disease_mask).
         clinical (dict): Clinical variables and their current values.
-        outcomes (dict): Metrics for queue and clinical penalties.
+        queue_penalty (int): Queue penalty, reduced by time spent in queues.
+        clinical_penalty (float): Total distance of the clinical variables from their ideal values.
+        outcomes (MutableMapping): View of the two penalties as {'queue_penalty': ..., 'clinical_penalty': ...}.
         history (list): List of actions the patient has undergone.
+        pathway_actions (dict): Index of the (current, previous) action on each pathway, kept in step with history.
+        queue_entries (dict): The patient's entries in action queues, as (Action, entry id) keys (entry ids are per queue).
         queue_time (int): Total time the patient has spent in queues.
     """
-    
-    def __init__(self, pid, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES):
-        import numpy as np
+    __slots__ = ('pid', 'age', 'age_group', 'sex', 'disease_mask', 'clinical', 'sickness', 'queue_penalty',
+                 'clinical_penalty', 'history', 'pathway_actions', 'queue_entries', 'queue_time', '_pathways')
+
+    def __init__(self, pid, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, rng=None, age=None, sex=None, clinical=None):
+        """
+        Age, sex and clinical values are drawn from `rng` unless given (e.g. pre-drawn for a whole cohort at once,
+        see build.initialize_patients); `clinical` is then a sequence in IDEAL_CLINICAL_VALUES order.
+        """
+        if age is None or sex is None or clinical is None:
+            rng = get_rng(rng)
         
         self.pid = pid
-        self.age = np.random.randint(18, 90)
+        self.age = int(rng.integers(18, 90)) if age is None else age
         if 18 <= self.age < 45:
             self.age_group = 'young'
         elif 45 <= self.age <= 65:
             self.age_group = 'middle'
         else:
             self.age_group = 'elderly'
-        self.sex = np.random.choice(['M', 'F'])
-        self.diseases = {f'P{p}': False for p in range(NUM_PATHWAYS)}
-        self.comorbidities = 0
-        self.clinical = {k: np.random.normal(v, 0.4*v) for k, v in IDEAL_CLINICAL_VALUES.items()}
+        self.sex = str(rng.choice(['M', 'F'])) if sex is None else sex
+        self._pathways = pathway_index(NUM_PATHWAYS)
+        self.disease_mask = 0
+        if clinical is None:
+            self.clinical = {k: float(rng.normal(v, 0.4*v)) for k, v in IDEAL_CLINICAL_VALUES.items()}
+        else:
+            self.clinical = dict(zip(IDEAL_CLINICAL_VALUES, clinical))
         self.sickness = 0
-        self.outcomes = {'queue_penalty': 1000000, 'clinical_penalty': 100}
+        self.queue_penalty = 1000000
+        self.clinical_penalty = 100
         self.history = []
+        self.pathway_actions = {}
+        self.queue_entries = {}
         self.queue_time = 0
+
+    @property
+    def diseases(self):
+        return _DiseaseView(self)
+
+    @diseases.setter
+    def diseases(self, flags):
+        pathways = self._pathways
+        mask = 0
+        for name, flag in flags.items():
+            if flag:
+                mask |= 1 << pathways[name]
+        self.disease_mask = mask
+
+    def has_disease(self, pathway):
+        """
+        Returns whether the patient has a disease on a pathway (False for a pathway code outside the cohort's).
+        """
+        j = self._pathways.get(pathway)
+        return j is not None and bool(self.disease_mask >> j & 1)
+
+    @property
+    def comorbidities(self):
+        return self.disease_mask.bit_count()
+
+    @property
+    def outcomes(self):
+        return _OutcomesView(self)
+
+    @outcomes.setter
+    def outcomes(self, outcomes):
+        self.queue_penalty = outcomes['queue_penalty']
+        self.clinical_penalty = outcomes['clinical_penalty']
             
     # --- Patient disease occurrence ---
     @staticmethod
-    def progress_diseases(patient, pathway, actions, input_actions, PROBABILITY_OF_DISEASE):
+    def progress_diseases(patient, pathway, actions, input_actions, PROBABILITY_OF_DISEASE, rng=None):
         """
         Simulates disease occurrence for a patient in a given pathway.
 
@@ -47,37 +193,86 @@ class Patient:
         Args:
             patient (Patient): The patient object whose state is being updated.
             pathway (str): The pathway code (e.g., 'P0', 'P1', etc.) to check for disease progression.
+            rng (np.random.Generator or StepRandom, optional): Source of random numbers.
+        """
+        rng = get_rng(rng)
+
+        if not patient.has_disease(pathway) and rng.random() < PROBABILITY_OF_DISEASE:
+            Patient.start_disease(patient, pathway, actions, input_actions, rng)
+        if not isinstance(patient, Patient):
+            patient.comorbidities = sum(patient.diseases.values())  # A Patient's count is read from its bitmask
+
+    @staticmethod
+    def start_disease(patient, pathway, actions, input_actions, rng=None):
         """
-        import numpy as np
-        import random
+        Starts a disease on a pathway: sets the disease flag, assigns a random input action and records it in the patient's history.
+        """
+        rng = get_rng(rng)
+
+        patient.diseases[pathway] = True
+        start_action = input_actions[rng.integers(len(input_actions))]
+        actions[start_action].assign(patient)
+        patient.record_action(start_action, pathway)
+
+    @staticmethod
+    def draw_onsets(active, PROBABILITY_OF_DISEASE, num_input_actions, rng=None):
+        """
+        Vectorized counterpart of progress_diseases for the whole cohort: one Bernoulli draw per inactive
+        (patient, pathway) pair and one uniform choice of input action per new disease, each in one call.
+
+        Args:
+            active (np.ndarray): N x P boolean matrix of the pairs with a disease at the start of the step.
+            num_input_actions (int): Number of input actions to choose from.
+            rng (np.random.Generator, optional): Source of random numbers.
+
+        Returns:
+            tuple: Arrays of the patient position, pathway position and input action position of each new disease,
+                in patient then pathway order.
+        """
+        rng = get_rng(rng)
+        onset = ~active & (rng.random(active.shape) < PROBABILITY_OF_DISEASE)
+        rows, cols = np.nonzero(onset)
+        return rows, cols, rng.integers(num_input_actions, size=len(rows))
 
-        if patient.diseases[pathway] == False and np.random.rand() < PROBABILITY_OF_DISEASE:
+    @staticmethod
+    def start_diseases(patients, pathways, rows, cols, starts, actions, input_actions):
+        """
+        Starts the diseases drawn by draw_onsets: sets each disease flag and records the input action in the patient's
+        history (as start_disease does), then admits each input action's new patients to its queue in one
+        assign_many call.
+        """
+        arrivals = {}
+        for i, j, s in zip(rows.tolist(), cols.tolist(), starts.tolist()):
+            patient = patients[i]
+            pathway = pathways[j].name
+            start_action = input_actions[s]
             patient.diseases[pathway] = True
-            start_action = random.choice(input_actions)
-            actions[start_action].assign(patient)
-            patient.history.append((start_action,pathway))  
-        patient.comorbidities = sum(patient.diseases.values())
+            patient.record_action(start_action, pathway)
+            arrivals.setdefault(start_action, []).append(patient)
+        for start_action, new_patients in arrivals.items():
+            actions[start_action].assign_many(new_patients)
       
             
     # --- Patient clinical variable updates ---
     @staticmethod
-    def clinical_decay(patient, IDEAL_CLINICAL_VALUES):
+    def clinical_decay(patient, IDEAL_CLINICAL_VALUES, rng=None):
         """
         Simulates the natural decay of clinical variables over time.
         This method reduces each clinical variable by a small amount, simulating the natural decline in health metrics.
         Args:
             patient (Patient): The patient object whose clinical variables are being updated.
+            rng (np.random.Generator or StepRandom, optional): Source of random numbers.
         """
-        import numpy as np
+        rng = get_rng(rng)
         
         for k in patient.clinical:
             ideal = IDEAL_CLINICAL_VALUES[k]
             current = patient.clinical[k]
             # Determine direction away from ideal
             if current >= ideal:
-                patient.clinical[k] += abs(np.random.normal(0.5, 0.1)) # Move further above ideal
+                patient.clinical[k] += abs(rng.normal(0.5, 0.1)) # Move further above ideal
             else:
-                patient.clinical[k] -= abs(np.random.normal(0.5, 0.1)) # Move further below ideal
+                patient.clinical[k] -= abs(rng.normal(0.5, 0.1)) # Move further below ideal
         
         # Ensure clinical variables remain within a reasonable range
         for k in patient.clinical:
@@ -86,6 +281,19 @@ class Patient:
         
 
     # --- Patient actions and outcomes ---
+    def record_action(self, action, pathway):
+        """
+        Records that the patient has been assigned an action on a pathway.
+        Appends to the history and updates the per-pathway index of current and previous actions.
+
+        Args:
+            action (str): The action name.
+            pathway (str): The pathway code.
+        """
+        self.history.append((action, pathway))
+        current = self.pathway_actions.get(pathway)
+        self.pathway_actions[pathway] = (action, current[0] if current else None)
+
     def apply_action(self, effect, IDEAL_CLINICAL_VALUES):
         """
         Applies the effects of an action to the patient's clinical variables.
@@ -101,19 +309,23 @@ class Patient:
                     self.clinical[k] = self.clinical[k] - v
 
     # --- Patient scoring and outcome calculation ---
-    def score_outcomes(self, IDEAL_CLINICAL_VALUES):
+    def score_outcomes(self, IDEAL_CLINICAL_VALUES, metrics=None):
         """
         Updates the patient's outcome metrics based on their current state. 
         The queue penalty is reduced based on the time spent in the queue, and the clinical penalty is calculated based on the clinical variables vs user set ideal clinical variables.
+        If a SystemMetrics aggregator is given it is told about the change in clinical penalty.
         """
         
-        self.outcomes['queue_penalty'] = max(0, self.outcomes['queue_penalty'] - self.queue_time)
-        self.outcomes['clinical_penalty'] = sum(
+        old_clinical_penalty = self.clinical_penalty
+        self.queue_penalty = max(0, self.queue_penalty - self.queue_time)
+        self.clinical_penalty = sum(
         abs(self.clinical[k] - IDEAL_CLINICAL_VALUES[k]) for k in self.clinical if k in IDEAL_CLINICAL_VALUES)
-        if 0 <= self.outcomes['clinical_penalty'] < 110:
+        if 0 <= self.clinical_penalty < 110:
             self.sickness = 0
-        elif 110 <= self.outcomes['clinical_penalty'] <= 160:
+        elif 110 <= self.clinical_penalty <= 160:
             self.sickness = 1
         else:
             self.sickness = 2
+        if metrics is not None:
+            metrics.clinical_penalty_changed(old_clinical_penalty, self.clinical_penalty)
     
\ No newline at end of file
@@ -0,0 +1,180 @@
+import numpy as np
+from healthcare_sim.transitions import active_pairs
+
+"""
+Tabular Q-learning policy for choosing next actions.
+
+A QPolicy keeps a dense NumPy Q-table indexed by (pathway, current action, state, next action), where the state
+is the patient's sickness band (0, 1 or 2) combined with a band of the average queue length per action
+(QUEUE_BINS). Entries for next actions that are not valid transitions are never read or written.
+
+Passed to run_simulation(..., policy=...), it replaces uniform sampling of next actions:
+
+- At the start of each step the next action of every active (patient, pathway) pair is chosen in one batch,
+  epsilon-greedily: with probability epsilon a valid next action at random, otherwise the valid next action with the
+  highest Q-value for the pair's state.
+- After the step's actions have executed, the rewards run_simulation computed for those pairs are applied as one
+  batch of TD updates, Q += alpha * (reward + gamma * max Q(next state) - Q), with next actions that have no
+  successors (e.g. the output action) treated as terminal. Pairs that share a table entry are averaged, so a step
+  moves each entry by at most one alpha-sized update however many patients made the same choice.
+
+Each major step of run_simulation is one training episode; epsilon decays by `epsilon_decay` per episode.
+
+The table holds P * A * S * A values (S = 3 * (len(QUEUE_BINS) + 1)), so 1,000 pathways of 100 actions with the
+default bands is 120M entries; it is float32 by default to keep that to 480MB.
+"""
+
+QUEUE_BINS = (1, 5, 20)  # Band edges of the average queue length per action
+NUM_SICKNESS = 3
+
+
+class QPolicy:
+    """
+    Epsilon-greedy policy over a dense Q-table, trained with batched TD updates.
+
+    Attributes:
+        table (TransitionTable): The transitions, whose pathway and action codes index the Q-table.
+        q (np.ndarray): P x A x S x A array of Q-values.
+        valid (np.ndarray): P x A x A boolean mask of valid next actions.
+        terminal (np.ndarray): P x A boolean mask of actions with no successors.
+        alpha (float): Learning rate.
+        gamma (float): Discount factor.
+        epsilon (float): Exploration rate of the current episode.
+        queue_bins (np.ndarray): Band edges of the average queue length per action.
+    """
+
+    def __init__(self, table, alpha=0.1, gamma=0.9, epsilon=0.1, epsilon_decay=1.0, min_epsilon=0.0,
+                 queue_bins=QUEUE_BINS, dtype=np.float32):
+        self.table = table
+        self.alpha = alpha
+        self.gamma = gamma
+        self.initial_epsilon = epsilon
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.min_epsilon = min_epsilon
+        self.queue_bins = np.asarray(queue_bins, dtype=float)
+        self.num_states = NUM_SICKNESS * (len(self.queue_bins) + 1)
+        self.episode = 0
+
+        num_pathways, num_actions = len(table.pathway_names), len(table.action_names)
+        self.q = np.zeros((num_pathways, num_actions, self.num_states, num_actions), dtype=dtype)
+        self.valid = np.zeros((num_pathways * num_actions, num_actions), dtype=bool)
+        self.valid[np.repeat(np.arange(num_pathways * num_actions), table.counts.ravel()), table.indices] = True
+        self.valid = self.valid.reshape(num_pathways, num_actions, num_actions)
+        self.terminal = table.counts == 0
+        self._pending = None
+
+    def start_episode(self, episode):
+        """
+        Sets epsilon for an episode (major step): initial epsilon * epsilon_decay ** episode, floored at min_epsilon.
+        """
+        self.episode = episode
+        self.epsilon = max(self.min_epsilon, self.initial_epsilon * self.epsilon_decay ** episode)
+
+    def states(self, sickness, system_state):
+        """
+        Returns the state code of each pair from its patient's sickness band and the total queue length.
+        """
+        level = np.searchsorted(self.queue_bins, system_state / self.q.shape[1], side='right')
+        return np.asarray(sickness, dtype=np.int64) * (len(self.queue_bins) + 1) + level
+
+    def _best(self, pathway_codes, action_codes, state_codes):
+        """
+        Returns the best valid next action code of each pair (-1 if none) and its Q-value (0 if none).
+        """
+        values = np.where(self.valid[pathway_codes, action_codes], self.q[pathway_codes, action_codes, state_codes], -np.inf)
+        best = values.argmax(axis=1) if len(values) else np.zeros(0, dtype=np.int64)
+        value = values[np.arange(len(best)), best]
+        has_next = np.isfinite(value)
+        return np.where(has_next, best, -1), np.where(has_next, value, 0.0)
+
+    def choose(self, pathway_codes, action_codes, state_codes, rng):
+        """
+        Picks a next action for each pair epsilon-greedily, in one vectorized call.
+
+        Returns:
+            np.ndarray: The chosen next action code of each pair, or -1 where the action has no successors.
+        """
+        explore = rng.random(len(pathway_codes)) < self.epsilon
+        random_choice = self.table.sample(pathway_codes, action_codes, rng.random(len(pathway_codes)))
+        greedy, _ = self._best(pathway_codes, action_codes, state_codes)
+        return np.where(explore, random_choice, greedy)
+
+    def choose_next_actions(self, patients, pathways, system_state, rng):
+        """
+        Chooses the next action of every active (patient, pathway) pair and remembers the choices for update().
+
+        Returns:
+            list: The next action name (or None) of each active pair, in step loop order (see active_pairs).
+        """
+        positions, pathway_codes, action_codes = active_pairs(self.table, patients, pathways)
+        sickness = _sickness(patients)[positions]
+        state_codes = self.states(sickness, system_state)
+        chosen = self.choose(pathway_codes, action_codes, state_codes, rng)
+        self._pending = (positions, pathway_codes, action_codes, state_codes, chosen)
+        names = self.table.action_names
+        return [names[b] if b >= 0 else None for b in chosen.tolist()]
+
+    def update(self, rewards, patients, system_state):
+        """
+        Applies one batch of TD updates for the choices made by the last choose_next_actions call.
+
+        Args:
+            rewards (list): The reward of each active pair, in the same order as the choices.
+            patients (list or Population): The cohort, after the step's actions have executed.
+            system_state (int): The total queue length after the step's actions have executed.
+        """
+        if self._pending is None:
+            return
+        positions, pathway_codes, action_codes, state_codes, chosen = self._pending
+        self._pending = None
+        next_states = self.states(_sickness(patients)[positions], system_state)
+        self.learn(pathway_codes, action_codes, state_codes, chosen, rewards, next_states)
+
+    def learn(self, pathway_codes, action_codes, state_codes, chosen, rewards, next_state_codes):
+        """
+        Applies one batch of TD updates from arrays of transitions (one element per pair). Pairs with no next
+        action (chosen -1) are skipped; pairs that share a table entry are averaged.
+        """
+        learn = np.asarray(chosen) >= 0
+        if not learn.any():
+            return
+        pathway_codes, action_codes, state_codes, chosen, next_state_codes = (
+            pathway_codes[learn], action_codes[learn], state_codes[learn], chosen[learn], next_state_codes[learn])
+        rewards = np.asarray(rewards, dtype=float)[learn]
+
+        _, next_value = self._best(pathway_codes, chosen, next_state_codes)
+        target = rewards + self.gamma * np.where(self.terminal[pathway_codes, chosen], 0.0, next_value)
+        index = np.ravel_multi_index((pathway_codes, action_codes, state_codes, chosen), self.q.shape)
+        td_error = target - self.q.ravel()[index]
+        entries, inverse = np.unique(index, return_inverse=True)
+        mean_error = np.bincount(inverse, weights=td_error) / np.bincount(inverse)
+        self.q.ravel()[entries] += (self.alpha * mean_error).astype(self.q.dtype)
+
+    def greedy_actions(self, pathway, action, sickness=0, queue_level=0):
+        """
+        Returns the valid next actions of an action on a pathway, best first, for one state.
+        """
+        j = self.table.pathway_index[pathway]
+        a = self.table.action_index[action]
+        s = sickness * (len(self.queue_bins) + 1) + queue_level
+        candidates = np.flatnonzero(self.valid[j, a])
+        order = np.argsort(-self.q[j, a, s, candidates], kind='stable')
+        return [self.table.action_names[b] for b in candidates[order]]
+
+    def get_state(self):
+        """
+        Returns what a checkpoint needs to restore the policy: the Q-table and the episode.
+        """
+        return {'q': self.q, 'episode': self.episode}
+
+    def set_state(self, state):
+        self.q[...] = state['q']
+        self.start_episode(state['episode'])
+
+
+def _sickness(patients):
+    sickness = getattr(patients, 'sickness', None)
+    if isinstance(sickness, np.ndarray):
+        return sickness
+    return np.array([p.sickness for p in patients], dtype=np.int64)
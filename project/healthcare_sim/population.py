@@ -0,0 +1,449 @@
+import numpy as np
+from collections.abc import MutableMapping
+from healthcare_sim.rng import get_rng
+
+
+class _RowView(MutableMapping):
+    """
+    Dict-like view of one row of a population matrix, keyed by column name.
+    Reads and writes go straight through to the underlying array.
+    """
+    __slots__ = ('_row', '_index')
+
+    def __init__(self, row, index):
+        self._row = row
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._row[self._index[key]].item()
+
+    def __setitem__(self, key, value):
+        self._row[self._index[key]] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Population columns cannot be deleted")
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _DiseaseView(_RowView):
+    """
+    Dict-like view of a patient's disease flags, keyed by pathway code. Writes also update the patient's
+    comorbidity count, as Patient's count follows its disease bitmask.
+    """
+    __slots__ = ('_pop', '_i')
+
+    def __init__(self, pop, i):
+        super().__init__(pop.diseases[i], pop.pathway_index)
+        self._pop = pop
+        self._i = i
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._pop.comorbidities[self._i] = np.count_nonzero(self._row)
+
+
+class _OutcomesView(MutableMapping):
+    """
+    Dict-like view of a patient's outcome metrics, backed by the population's outcome vectors.
+    """
+    __slots__ = ('_pop', '_i')
+
+    KEYS = ('queue_penalty', 'clinical_penalty')
+
+    def __init__(self, pop, i):
+        self._pop = pop
+        self._i = i
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self._pop, key)[self._i].item()
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        getattr(self._pop, key)[self._i] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Outcome metrics cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _PathwayActionsView(MutableMapping):
+    """
+    Dict-like view of a patient's (current, previous) action on each pathway, backed by the population's
+    action code matrices. Pathways the patient has not been on are absent, as in Patient.pathway_actions.
+    """
+    __slots__ = ('_pop', '_i')
+
+    def __init__(self, pop, i):
+        self._pop = pop
+        self._i = i
+
+    def __getitem__(self, pathway):
+        j = self._pop.pathway_index.get(pathway)
+        current = self._pop.current_action[self._i, j] if j is not None else -1
+        if current < 0:
+            raise KeyError(pathway)
+        previous = self._pop.previous_action[self._i, j]
+        names = self._pop.action_names
+        return names[current], names[previous] if previous >= 0 else None
+
+    def __setitem__(self, pathway, value):
+        current, previous = value
+        j = self._pop.pathway_index[pathway]
+        self._pop.current_action[self._i, j] = self._pop.action_code(current)
+        self._pop.previous_action[self._i, j] = self._pop.action_code(previous) if previous is not None else -1
+
+    def __delitem__(self, pathway):
+        j = self._pop.pathway_index[pathway]
+        if self._pop.current_action[self._i, j] < 0:
+            raise KeyError(pathway)
+        self._pop.current_action[self._i, j] = -1
+        self._pop.previous_action[self._i, j] = -1
+
+    def __iter__(self):
+        names = self._pop.pathway_names
+        return (names[j] for j in np.flatnonzero(self._pop.current_action[self._i] >= 0).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self._pop.current_action[self._i] >= 0))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class PatientView:
+    """
+    A single patient within a Population.
+
+    Exposes the same attributes and methods as Patient (pid, clinical, diseases, outcomes, history, queue_time, ...)
+    so that Action and Pathway can work with population rows unchanged. All numeric state lives in the
+    population arrays, including the per-pathway (current, previous) action index; only the per-patient history
+    and queue entries are held on the view itself.
+    """
+    __slots__ = ('_pop', 'pid', 'history', 'queue_entries')
+
+    def __init__(self, pop, pid):
+        self._pop = pop
+        self.pid = pid
+        self.history = []
+        self.queue_entries = {}
+
+    @property
+    def age(self):
+        return int(self._pop.age[self.pid])
+
+    @property
+    def age_group(self):
+        return Population.age_group_of(self.age)
+
+    @property
+    def sex(self):
+        return str(self._pop.sex[self.pid])
+
+    @property
+    def clinical(self):
+        return _RowView(self._pop.clinical[self.pid], self._pop.clinical_index)
+
+    @property
+    def diseases(self):
+        return _DiseaseView(self._pop, self.pid)
+
+    @diseases.setter
+    def diseases(self, flags):
+        row = self._pop.diseases[self.pid]
+        row[:] = False
+        for name, flag in flags.items():
+            row[self._pop.pathway_index[name]] = flag
+        self._pop.comorbidities[self.pid] = np.count_nonzero(row)
+
+    @property
+    def disease_mask(self):
+        """
+        This patient's disease flags as a bitmask (bit j for pathway j, as Patient.disease_mask).
+        """
+        return sum(1 << j for j in np.flatnonzero(self._pop.diseases[self.pid]).tolist())
+
+    def has_disease(self, pathway):
+        """
+        Returns whether this patient has a disease on a pathway (see Patient.has_disease).
+        """
+        j = self._pop.pathway_index.get(pathway)
+        return j is not None and bool(self._pop.diseases[self.pid, j])
+
+    @property
+    def outcomes(self):
+        return _OutcomesView(self._pop, self.pid)
+
+    @property
+    def pathway_actions(self):
+        return _PathwayActionsView(self._pop, self.pid)
+
+    @pathway_actions.setter
+    def pathway_actions(self, index):
+        self._pop.current_action[self.pid] = -1
+        self._pop.previous_action[self.pid] = -1
+        view = _PathwayActionsView(self._pop, self.pid)
+        for pathway, entry in index.items():
+            view[pathway] = entry
+
+    @property
+    def queue_penalty(self):
+        return int(self._pop.queue_penalty[self.pid])
+
+    @property
+    def clinical_penalty(self):
+        return float(self._pop.clinical_penalty[self.pid])
+
+    @property
+    def comorbidities(self):
+        return int(self._pop.comorbidities[self.pid])
+
+    @comorbidities.setter
+    def comorbidities(self, value):
+        self._pop.comorbidities[self.pid] = value
+
+    @property
+    def sickness(self):
+        return int(self._pop.sickness[self.pid])
+
+    @property
+    def queue_time(self):
+        return int(self._pop.queue_time[self.pid])
+
+    @queue_time.setter
+    def queue_time(self, value):
+        self._pop.queue_time[self.pid] = value
+
+    def record_action(self, action, pathway):
+        """
+        Records that the patient has been assigned an action on a pathway (see Patient.record_action).
+        """
+        self.history.append((action, pathway))
+        pop, j = self._pop, self._pop.pathway_index[pathway]
+        pop.previous_action[self.pid, j] = pop.current_action[self.pid, j]
+        pop.current_action[self.pid, j] = pop.action_code(action)
+
+    def apply_action(self, effect, IDEAL_CLINICAL_VALUES=None):
+        """
+        Applies the effects of an action to this patient's clinical variables (see Patient.apply_action).
+        """
+        self._pop.apply_action([self.pid], effect)
+
+    def score_outcomes(self, IDEAL_CLINICAL_VALUES=None, metrics=None):
+        """
+        Updates this patient's outcome metrics (see Patient.score_outcomes).
+        """
+        self._pop.score_outcomes([self.pid], metrics)
+
+
+class Population:
+    """
+    Struct-of-arrays representation of a whole patient cohort.
+
+    Holds the same state as a list of Patient objects, but as NumPy arrays with one row per patient so that
+    decay, clamping and scoring can be applied to the whole cohort in a handful of vectorized calls.
+    Indexing or iterating a Population yields PatientView objects which behave like Patient; views are created
+    on first access, so building even a very large cohort only allocates arrays.
+
+    Attributes:
+        clinical_keys (list): Names of the clinical variables, in column order.
+        pathway_names (list): Pathway codes, in column order.
+        ideal (np.ndarray): Ideal clinical values, in column order.
+        age (np.ndarray): Age of each patient.
+        sex (np.ndarray): Gender of each patient ('M' or 'F').
+        clinical (np.ndarray): N x K matrix of clinical variables.
+        diseases (np.ndarray): N x P boolean matrix of disease flags per pathway.
+        comorbidities (np.ndarray): Number of active diseases per patient.
+        sickness (np.ndarray): Sickness band (0, 1 or 2) per patient.
+        queue_time (np.ndarray): Total time each patient has spent in queues.
+        queue_penalty (np.ndarray): Queue penalty per patient.
+        clinical_penalty (np.ndarray): Clinical penalty per patient.
+        action_names (list): Action names, indexed by the codes in current_action and previous_action, in the order
+            they were first recorded.
+        current_action (np.ndarray): N x P matrix of each patient's current action code per pathway, -1 if none.
+        previous_action (np.ndarray): N x P matrix of the action before the current one per pathway, -1 if none.
+    """
+
+    def __init__(self, age, sex, clinical, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES):
+        n = len(age)
+        self.clinical_keys = list(IDEAL_CLINICAL_VALUES.keys())
+        self.clinical_index = {k: j for j, k in enumerate(self.clinical_keys)}
+        self.pathway_names = [f'P{p}' for p in range(NUM_PATHWAYS)]
+        self.pathway_index = {name: j for j, name in enumerate(self.pathway_names)}
+        self.ideal = np.array([IDEAL_CLINICAL_VALUES[k] for k in self.clinical_keys], dtype=float)
+        self.lower = 0.4 * self.ideal
+        self.upper = 1.6 * self.ideal
+
+        self.age = np.asarray(age, dtype=np.int64)
+        self.sex = np.asarray(sex)
+        self.clinical = np.asarray(clinical, dtype=float).reshape(n, len(self.clinical_keys))
+        self.diseases = np.zeros((n, NUM_PATHWAYS), dtype=bool)
+        self.comorbidities = np.zeros(n, dtype=np.int64)
+        self.sickness = np.zeros(n, dtype=np.int8)
+        self.queue_time = np.zeros(n, dtype=np.int64)
+        self.queue_penalty = np.full(n, 1000000, dtype=np.int64)
+        self.clinical_penalty = np.full(n, 100, dtype=float)
+        self.action_names = []
+        self.action_index = {}
+        self.current_action = np.full((n, NUM_PATHWAYS), -1, dtype=np.int64)
+        self.previous_action = np.full((n, NUM_PATHWAYS), -1, dtype=np.int64)
+        self._views = [None] * n  # PatientViews, created on first access
+
+    @staticmethod
+    def draw_attributes(NUM_PATIENTS, IDEAL_CLINICAL_VALUES, rng=None):
+        """
+        Draws age, sex and clinical values for a whole cohort with the same distributions as Patient.__init__,
+        one vectorized call per attribute.
+
+        Returns:
+            tuple: (age, sex, clinical) arrays, the last N x K in IDEAL_CLINICAL_VALUES order.
+        """
+        rng = get_rng(rng)
+        ideal = np.array(list(IDEAL_CLINICAL_VALUES.values()), dtype=float)
+        age = rng.integers(18, 90, size=NUM_PATIENTS)
+        sex = rng.choice(['M', 'F'], size=NUM_PATIENTS)
+        clinical = rng.normal(ideal, 0.4 * ideal, size=(NUM_PATIENTS, len(ideal)))
+        return age, sex, clinical
+
+    @classmethod
+    def random(cls, NUM_PATIENTS, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, rng=None):
+        """
+        Draws a random cohort (see draw_attributes).
+        """
+        age, sex, clinical = cls.draw_attributes(NUM_PATIENTS, IDEAL_CLINICAL_VALUES, rng)
+        return cls(age, sex, clinical, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES)
+
+    @classmethod
+    def from_patients(cls, patients, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES):
+        """
+        Builds a Population holding the same state as a list of Patient objects.
+        """
+        keys = list(IDEAL_CLINICAL_VALUES.keys())
+        pop = cls(
+            [p.age for p in patients],
+            [p.sex for p in patients],
+            [[p.clinical[k] for k in keys] for p in patients],
+            NUM_PATHWAYS,
+            IDEAL_CLINICAL_VALUES,
+        )
+        for view, p in zip(pop, patients):
+            view.diseases = p.diseases
+            view.history = list(p.history)
+            view.pathway_actions = dict(p.pathway_actions)
+        pop.comorbidities[:] = [p.comorbidities for p in patients]
+        pop.sickness[:] = [p.sickness for p in patients]
+        pop.queue_time[:] = [p.queue_time for p in patients]
+        pop.queue_penalty[:] = [p.outcomes['queue_penalty'] for p in patients]
+        pop.clinical_penalty[:] = [p.outcomes['clinical_penalty'] for p in patients]
+        return pop
+
+    @staticmethod
+    def age_group_of(age):
+        if 18 <= age < 45:
+            return 'young'
+        elif 45 <= age <= 65:
+            return 'middle'
+        return 'elderly'
+
+    def __len__(self):
+        return len(self._views)
+
+    def __getitem__(self, i):
+        view = self._views[i]
+        if view is None:
+            pid = i % len(self._views)  # Allows negative indices
+            view = self._views[pid] = PatientView(self, pid)
+        return view
+
+    def __iter__(self):
+        views = self._views
+        for i, view in enumerate(views):
+            if view is None:
+                view = views[i] = PatientView(self, i)
+            yield view
+
+    def action_code(self, name):
+        """
+        Returns the code of an action name in current_action and previous_action, adding it if it is new.
+        """
+        code = self.action_index.get(name)
+        if code is None:
+            code = self.action_index[name] = len(self.action_names)
+            self.action_names.append(name)
+        return code
+
+    def reset_diseases(self):
+        """
+        Clears every disease flag, as at the start of a major step.
+        """
+        self.diseases[:] = False
+        self.comorbidities[:] = 0
+
+    # --- Cohort clinical variable updates ---
+    def clinical_decay(self, IDEAL_CLINICAL_VALUES=None, rng=None):
+        """
+        Vectorized equivalent of Patient.clinical_decay for the whole cohort.
+
+        The object model decays a patient once per active pathway, each time drawing one N(0.5, 0.1) step per
+        clinical variable, moving it away from ideal and clamping to [0.4, 1.6] x ideal. Here all the steps are drawn
+        in one call, in the order the step loop would draw them (patients, then pathways, then variables), and applied
+        in rounds, one per active pathway, so a run with the same rng gives the same values as with Patient objects.
+
+        Args:
+            rng (np.random.Generator or StepRandom, optional): Source of random numbers.
+        """
+        rng = get_rng(rng)
+        counts = self.diseases.sum(axis=1)
+        total = int(counts.sum())
+        if not total:
+            return
+        drift = np.abs(0.5 + 0.1 * np.asarray(rng.standard_normal(total * len(self.ideal))).reshape(total, -1))
+        starts = np.cumsum(counts) - counts  # First drift row of each patient
+        for t in range(int(counts.max())):
+            rows = np.flatnonzero(counts > t)
+            clinical = self.clinical[rows]
+            step = drift[starts[rows] + t]
+            self.clinical[rows] = np.clip(np.where(clinical >= self.ideal, clinical + step, clinical - step),
+                                          self.lower, self.upper)
+
+    # --- Cohort actions and outcomes ---
+    def apply_action(self, rows, effect):
+        """
+        Applies the effects of an action to the clinical variables of the given rows (see Patient.apply_action).
+
+        Args:
+            rows (array-like): Patient ids to apply the action to.
+            effect (dict): Dictionary of clinical variable changes.
+        """
+        delta = np.array([effect.get(k, 0) for k in self.clinical_keys], dtype=float)
+        clinical = self.clinical[rows]
+        self.clinical[rows] = np.where(clinical < self.ideal, clinical + delta, clinical - delta)
+
+    def score_outcomes(self, rows=slice(None), metrics=None):
+        """
+        Updates outcome metrics and sickness bands for the given rows (default: whole cohort) (see Patient.score_outcomes).
+        """
+        self.queue_penalty[rows] = np.maximum(0, self.queue_penalty[rows] - self.queue_time[rows])
+        penalty = np.abs(self.clinical[rows] - self.ideal).sum(axis=1)
+        if metrics is not None:
+            metrics.clinical_penalty_changed(self.clinical_penalty[rows].sum(), penalty.sum())
+        self.clinical_penalty[rows] = penalty
+        self.sickness[rows] = np.where(penalty < 110, 0, np.where(penalty <= 160, 1, 2))
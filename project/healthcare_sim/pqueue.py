@@ -0,0 +1,162 @@
+import heapq
+import numpy as np
+
+
+class IndexedPriorityQueue:
+    """
+    Binary min-heap with a position index, so an entry's priority can be changed in O(log n) after it was queued.
+
+    Each entry is a list [priority, tiebreak, entry_id, item]. Entry ids are numbered in push order within each queue
+    and are unique in it, so entries compare on (priority, tiebreak, entry_id) and items themselves are never compared.
+    The lowest priority is served first, and entries with equal priority and tiebreak in the order they were queued.
+
+    Attributes:
+        next_id (int): The id the next queued entry will get.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._pos = {}  # entry_id -> index in self._heap
+        self.next_id = 0
+
+    @classmethod
+    def from_entries(cls, entries, next_id=None):
+        """
+        Builds a queue from existing [priority, tiebreak, entry_id, item] entries, keeping their ids (e.g. when resuming from a checkpoint).
+        Entries queued later are numbered from next_id (default: one more than the largest id given).
+        """
+        queue = cls()
+        queue._heap = [list(entry) for entry in entries]
+        heapq.heapify(queue._heap)
+        queue._reindex()
+        queue.next_id = max((entry[2] + 1 for entry in queue._heap), default=0) if next_id is None else next_id
+        return queue
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def entries(self):
+        """
+        Returns the queued entries ([priority, tiebreak, entry_id, item]) in heap order.
+        """
+        return list(self._heap)
+
+    # --- Heap maintenance ---
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][2]] = i
+        self._pos[heap[j][2]] = j
+
+    def _sift_up(self, i):
+        heap = self._heap
+        while i > 0:
+            parent = (i - 1) >> 1
+            if heap[i] < heap[parent]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i):
+        heap = self._heap
+        n = len(heap)
+        while True:
+            smallest = i
+            left = 2 * i + 1
+            right = left + 1
+            if left < n and heap[left] < heap[smallest]:
+                smallest = left
+            if right < n and heap[right] < heap[smallest]:
+                smallest = right
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
+
+    def _reindex(self):
+        self._pos = {entry[2]: i for i, entry in enumerate(self._heap)}
+
+    # --- Queue operations ---
+    def push(self, item, priority, tiebreak=0):
+        """
+        Queues an item and returns its entry id.
+        """
+        entry_id = self.next_id
+        self.next_id += 1
+        self._pos[entry_id] = len(self._heap)
+        self._heap.append([priority, tiebreak, entry_id, item])
+        self._sift_up(len(self._heap) - 1)
+        return entry_id
+
+    def push_many(self, items, priorities, tiebreaks):
+        """
+        Queues a batch of items (e.g. all arrivals of one step) and returns their entry ids.
+        Large batches are appended and the heap rebuilt in O(n) with heapify rather than sifted in one by one.
+        """
+        ids = list(range(self.next_id, self.next_id + len(items)))
+        self.next_id += len(ids)
+        if len(ids) < len(self._heap) // 4:
+            for entry_id, item, priority, tiebreak in zip(ids, items, priorities, tiebreaks):
+                self._pos[entry_id] = len(self._heap)
+                self._heap.append([priority, tiebreak, entry_id, item])
+                self._sift_up(len(self._heap) - 1)
+        else:
+            self._heap.extend([priority, tiebreak, entry_id, item] for entry_id, item, priority, tiebreak in zip(ids, items, priorities, tiebreaks))
+            heapq.heapify(self._heap)
+            self._reindex()
+        return ids
+
+    def pop(self):
+        """
+        Removes and returns the entry ([priority, tiebreak, entry_id, item]) with the lowest priority.
+        """
+        heap = self._heap
+        last = len(heap) - 1
+        if last > 0:
+            self._swap(0, last)
+        entry = heap.pop()
+        del self._pos[entry[2]]
+        if heap:
+            self._sift_down(0)
+        return entry
+
+    def pop_many(self, k):
+        """
+        Removes and returns the k entries with the lowest priorities, in priority order.
+
+        When k is a sizeable part of the queue the entries are ranked with one vectorized lexsort and the remainder,
+        being sorted, is already a valid heap; otherwise entries are popped one at a time.
+        """
+        n = len(self._heap)
+        k = min(max(k, 0), n)
+        if k == 0:
+            return []
+        if k * 8 < n:
+            return [self.pop() for _ in range(k)]
+        heap = self._heap
+        order = np.lexsort((
+            np.fromiter((e[2] for e in heap), dtype=np.int64, count=n),
+            np.fromiter((e[1] for e in heap), dtype=float, count=n),
+            np.fromiter((e[0] for e in heap), dtype=float, count=n),
+        ))
+        ranked = [heap[i] for i in order]
+        self._heap = ranked[k:]
+        self._reindex()
+        return ranked[:k]
+
+    def update(self, entry_id, priority):
+        """
+        Changes the priority of a queued entry, moving it up or down the heap as needed.
+        """
+        i = self._pos[entry_id]
+        entry = self._heap[i]
+        old = entry[0]
+        entry[0] = priority
+        if priority < old:
+            self._sift_up(i)
+        elif priority > old:
+            self._sift_down(i)
@@ -0,0 +1,140 @@
+import time
+
+"""
+Phase profiling for run_simulation.
+
+Passing a PhaseProfiler as run_simulation(..., profiler=...) times each phase of the step loop and counts what each
+action did. The loop calls profiler.lap(phase) at the end of each phase, which adds the time since the previous lap
+to that phase, so every hook costs one clock read. With no profiler (the default) each hook is a single
+`if profiler:` test.
+
+Phases, in loop order:
+
+- 'draw_random': Pre-drawing the step's random numbers (StepRandom.next_step).
+- 'update_capacity': Action.update_capacity for every action.
+- 'clinical_decay': Cohort decay (Population) or Patient.clinical_decay per active pathway.
+- 'progress_diseases': Disease onset, drawn for all inactive pairs at once and admitted in bulk (Patient.draw_onsets, Patient.start_diseases).
+- 'next_action': Pathway.next_action, including queue assignment and logging.
+- 'reward': Reward calculation.
+- 'metrics': Sampling the average penalty and queue length.
+- 'execute': Action.execute for every action.
+- 'learn': The policy's TD updates (only with a policy).
+- 'record': Appending to the histories or writing to the sink.
+- 'checkpoint': Writing checkpoints.
+
+Counters, per major step and action: 'assigned' (patients added to the queue), 'admitted' (taken from the queue),
+'completed' (finished the action) and 'max_queue' (largest queue length seen before executing).
+
+Subclasses can override the hooks to observe a run in other ways (e.g. to stream timings elsewhere).
+"""
+
+PHASES = ['draw_random', 'update_capacity', 'clinical_decay', 'progress_diseases', 'next_action', 'reward', 'metrics',
+          'execute', 'learn', 'record', 'checkpoint']
+COUNTERS = ['assigned', 'admitted', 'completed', 'max_queue']
+
+
+class PhaseProfiler:
+    """
+    Collects per-step phase timings and per-action counters from run_simulation.
+
+    Attributes:
+        clock (callable): Returns the current time in seconds.
+        steps (list): One (major_step, step, {phase: seconds}) tuple per step run.
+        counters (dict): Major step -> action name -> {counter: value}.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.steps = []
+        self.counters = {}
+        self.major_step = None
+        self._step = None
+        self._row = None
+        self._last = 0.0
+        self._queued = {}
+
+    # --- Hooks called by run_simulation ---
+    def start_major_step(self, major_step, actions):
+        self.major_step = major_step
+        self.counters.setdefault(major_step, {name: dict.fromkeys(COUNTERS, 0) for name in actions})
+        self._queued = {name: len(act.queue) for name, act in actions.items()}
+
+    def start_step(self, step):
+        self._step = step
+        self._row = dict.fromkeys(PHASES, 0.0)
+        self._last = self.clock()
+
+    def lap(self, phase):
+        """
+        Adds the time since the previous lap (or the start of the step) to `phase`.
+        """
+        now = self.clock()
+        self._row[phase] = self._row.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def observe_action(self, name, queued_before, queued_after, completed):
+        """
+        Updates an action's counters after it has executed. Patients are only added to a queue between executes,
+        so the growth since the last execute is the number assigned.
+        """
+        counter = self.counters[self.major_step][name]
+        counter['assigned'] += queued_before - self._queued[name]
+        counter['admitted'] += queued_before - queued_after
+        counter['completed'] += completed
+        counter['max_queue'] = max(counter['max_queue'], queued_before)
+        self._queued[name] = queued_after
+
+    def end_step(self):
+        self.steps.append((self.major_step, self._step, self._row))
+
+    # --- Reports ---
+    def table(self, by='major_step'):
+        """
+        Returns the phase timings (seconds) as a DataFrame with one column per phase plus 'total'.
+
+        Args:
+            by (str): 'major_step' for one row per major step, or 'step' for one row per (major_step, step).
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(
+            [row for _, _, row in self.steps],
+            index=pd.MultiIndex.from_tuples([(m, s) for m, s, _ in self.steps], names=['major_step', 'step']),
+        )
+        if by == 'major_step':
+            frame = frame.groupby(level='major_step').sum()
+        elif by != 'step':
+            raise ValueError(f"Unknown grouping: {by}")
+        frame['total'] = frame.sum(axis=1)
+        return frame
+
+    def counter_table(self):
+        """
+        Returns the action counters as a DataFrame with one row per (major_step, action).
+        """
+        import pandas as pd
+
+        rows = [
+            {'major_step': major_step, 'action': name, **counter}
+            for major_step, actions in self.counters.items() for name, counter in actions.items()
+        ]
+        return pd.DataFrame(rows, columns=['major_step', 'action'] + COUNTERS).set_index(['major_step', 'action'])
+
+    def to_folded(self, path=None, per_step=False):
+        """
+        Returns the phase timings in the folded-stack format read by flamegraph.pl, speedscope and similar tools:
+        one 'run_simulation;major_step_<m>;<phase> <microseconds>' line per major step and phase (with a
+        'step_<s>' frame as well if per_step). Writes them to `path` if given.
+        """
+        totals = {}
+        for major_step, step, row in self.steps:
+            frames = f"run_simulation;major_step_{major_step}" + (f";step_{step}" if per_step else "")
+            for phase, seconds in row.items():
+                key = f"{frames};{phase}"
+                totals[key] = totals.get(key, 0.0) + seconds
+        lines = [f"{key} {round(seconds * 1e6)}" for key, seconds in totals.items() if seconds > 0]
+        text = "\n".join(lines) + "\n"
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
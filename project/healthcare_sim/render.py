@@ -0,0 +1,242 @@
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+from healthcare_sim.activity_log import ActivityLog
+
+"""
+Parallel, cached figure rendering.
+
+render_figures runs the vis_* functions concurrently in a process pool instead of one after another, and skips any
+figure whose inputs have not changed since it was last written to the output directory.
+
+Before rendering, each figure's arguments are reduced to the data the figure actually draws (e.g. just the schedules
+of the first and last major steps for vis_heatmaps, or the selected patients' rows of the activity log for vis_sankey). The
+reduced arguments are cheap to send to a worker, and their hash, together with the source of vis.py, is the
+figure's cache key. Keys of the figures already written are kept in a manifest (CACHE_FILE) in the output directory;
+a figure is only rendered again if its key has changed or one of its files is missing.
+
+Usage:
+
+    jobs = simulation_figures(actions_major, patients, system_cost_major, transition_matrix, activity_log_major)
+    render_figures(jobs)
+"""
+
+CACHE_FILE = ".render_cache.json"
+CACHE_VERSION = 1
+
+# Files written by each vis function
+FIGURE_FILES = {
+    'vis_heatmaps': ["heatmap.png"],
+    'vis_penalty': ["penalty.png"],
+    'vis_activity': ["activity.png"],
+    'vis_learning': ["learning.png"],
+    'vis_change': ["change.png"],
+    'vis_sankey': ["path.png", "sankey.png"],
+    'vis_net': ["net.png"],
+}
+
+SELECTED_PATHWAY = 'P0'  # The pathway drawn by vis_change and vis_net
+
+
+# --- Reducing arguments to the data each figure draws ---
+def _schedules(actions_major, major_steps, with_cost=False):
+    reduced = {}
+    for major_step in dict.fromkeys(major_steps):
+        reduced[major_step] = {
+            name: SimpleNamespace(schedule=np.asarray(act.schedule), **({'cost': act.cost} if with_cost else {}))
+            for name, act in actions_major[major_step].items()
+        }
+    return reduced
+
+
+def _pathway(transition_matrix):
+    if SELECTED_PATHWAY not in transition_matrix:
+        return {}
+    return {SELECTED_PATHWAY: {action: list(next_actions) for action, next_actions in transition_matrix[SELECTED_PATHWAY].items()}}
+
+
+def _activity_rows(activity_log, patient_ids):
+    if patient_ids is None:
+        return activity_log
+    patient_ids = [patient_ids] if isinstance(patient_ids, (int, np.integer)) else list(patient_ids)
+    if isinstance(activity_log, ActivityLog):
+        rows = activity_log.to_numpy()
+        return ActivityLog.from_arrays(rows[np.isin(rows['patient_id'], patient_ids)], activity_log.pathway_labels, activity_log.action_labels)
+    return [dict(entry) for entry in activity_log if entry['patient_id'] in patient_ids]
+
+
+def _penalties(patients):
+    return [SimpleNamespace(outcomes={'queue_penalty': p.outcomes['queue_penalty'], 'clinical_penalty': p.outcomes['clinical_penalty']}) for p in patients]
+
+
+REDUCERS = {
+    'vis_heatmaps': lambda actions_major, first, last: (_schedules(actions_major, [first, last]), first, last),
+    'vis_penalty': lambda patients: (_penalties(patients),),
+    'vis_activity': lambda actions_major, first, last: (_schedules(actions_major, [first, last]), first, last),
+    'vis_learning': lambda system_cost_major, first, last: ({m: dict(system_cost_major[m]) for m in (first, last)}, first, last),
+    'vis_change': lambda transition_matrix, actions_major, first, last: (_pathway(transition_matrix), _schedules(actions_major, [first, last], with_cost=True), first, last),
+    'vis_sankey': lambda activity_log, patient_ids=3, *rest: (_activity_rows(activity_log, patient_ids), patient_ids, *rest),
+    'vis_net': lambda transition_matrix: (_pathway(transition_matrix),),
+}
+
+
+# --- Cache keys ---
+def _update(h, obj):
+    """
+    Feeds a canonical encoding of obj (built from dicts, lists, tuples, NumPy arrays, SimpleNamespaces, ActivityLogs and
+    scalars) into the hash h. Dict order is kept, since it sets the order things are drawn in.
+    """
+    if isinstance(obj, np.ndarray):
+        h.update(f"nd{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, ActivityLog):
+        h.update(b"log")
+        _update(h, [obj.pathway_labels, obj.action_labels, obj.to_numpy()])
+    elif isinstance(obj, SimpleNamespace):
+        h.update(b"ns")
+        _update(h, vars(obj))
+    elif isinstance(obj, dict):
+        h.update(f"d{len(obj)}".encode())
+        for key, value in obj.items():
+            _update(h, key)
+            _update(h, value)
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"l{len(obj)}".encode())
+        for item in obj:
+            _update(h, item)
+    elif isinstance(obj, np.generic):
+        _update(h, obj.item())
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+
+
+def figure_key(name, args):
+    """
+    Returns the cache key of a figure: a hash of its reduced arguments and the source of the whole vis module, so a
+    change to a shared helper, constant or import also invalidates the figure.
+    """
+    from healthcare_sim import vis
+
+    h = hashlib.sha256(f"{CACHE_VERSION}:{name}".encode())
+    h.update(inspect.getsource(vis).encode())
+    _update(h, args)
+    return h.hexdigest()
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, CACHE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, CACHE_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+# --- Rendering ---
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_figure(name, args, output_dir="outputs"):
+    """
+    Renders one figure with its vis function (run in the worker processes).
+    """
+    import matplotlib.pyplot as plt
+    from healthcare_sim import vis
+
+    getattr(vis, name)(*args, output_dir=output_dir)
+    plt.close("all")
+    return name
+
+
+def simulation_figures(actions_major, patients, system_cost_major, transition_matrix, activity_log_major,
+                       first_major_step=None, last_major_step=None):
+    """
+    Returns the render_figures jobs for the figures main.build_simulation draws after a run.
+    """
+    first = min(actions_major.keys()) if first_major_step is None else first_major_step
+    last = max(actions_major.keys()) if last_major_step is None else last_major_step
+    return {
+        'vis_net': (transition_matrix,),
+        'vis_heatmaps': (actions_major, first, last),
+        'vis_penalty': (patients,),
+        'vis_activity': (actions_major, first, last),
+        'vis_learning': (system_cost_major, first, last),
+        'vis_change': (transition_matrix, actions_major, first, last),
+        'vis_sankey': (activity_log_major[last],),
+    }
+
+
+def render_figures(jobs, output_dir="outputs", workers=None, use_cache=True):
+    """
+    Renders figures concurrently, skipping those whose inputs are unchanged since they were last written.
+
+    Args:
+        jobs (dict): vis function name -> tuple of the arguments it would be called with (see simulation_figures).
+        output_dir (str): Directory the figures are written to (created if missing).
+        workers (int, optional): Number of worker processes (default: one per figure, up to one per CPU). With 1,
+            renders in this process.
+        use_cache (bool): Whether to skip unchanged figures. The manifest is updated either way.
+
+    Returns:
+        dict: vis function name -> 'cached' or 'rendered'.
+
+    Raises:
+        RuntimeError: If any figure failed to render, after the others have finished (their keys are still saved).
+    """
+    unknown = set(jobs) - set(REDUCERS)
+    if unknown:
+        raise ValueError(f"Unknown figures: {sorted(unknown)}")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+
+    reduced = {name: REDUCERS[name](*args) for name, args in jobs.items()}
+    keys = {name: figure_key(name, args) for name, args in reduced.items()}
+    status = {}
+    pending = []
+    for name in jobs:
+        files_exist = all(os.path.exists(os.path.join(output_dir, f)) for f in FIGURE_FILES[name])
+        if use_cache and manifest.get(name) == keys[name] and files_exist:
+            status[name] = 'cached'
+        else:
+            pending.append(name)
+
+    errors = {}
+    if pending and (workers == 1 or len(pending) == 1):
+        for name in pending:
+            try:
+                render_figure(name, reduced[name], output_dir)
+            except Exception as e:
+                errors[name] = e
+    elif pending:
+        workers = min(len(pending), workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {name: pool.submit(render_figure, name, reduced[name], output_dir) for name in pending}
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[name] = e
+
+    for name in pending:
+        if name in errors:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = keys[name]
+            status[name] = 'rendered'
+    _save_manifest(output_dir, manifest)
+    if errors:
+        raise RuntimeError("Failed to render " + ", ".join(f"{name} ({type(e).__name__}: {e})" for name, e in errors.items()))
+    return {name: status[name] for name in jobs}
@@ -0,0 +1,130 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from healthcare_sim import config
+
+"""
+Runs independent replications of the simulation across a process pool and summarises the spread of the results.
+
+Each replication gets its own child of a numpy.random.SeedSequence built from one root seed, so the results for a
+given root seed are the same however many workers are used and in whatever order the runs finish.
+"""
+
+# Two-sided 95% critical values of Student's t for 1-30 degrees of freedom; the normal value is used beyond that
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+METRICS = ['total_system_cost', 'avg_queue_penalty', 'avg_clinical_penalty', 'avg_wait_time']
+
+
+def default_parameters(**overrides):
+    """
+    Returns the simulation parameters from config.py, with any keyword overrides applied (e.g. NUM_PATIENTS=1000).
+    """
+    params = {
+        'NUM_PATIENTS': config.NUM_PATIENTS,
+        'NUM_PATHWAYS': config.NUM_PATHWAYS,
+        'NUM_ACTIONS': config.NUM_ACTIONS,
+        'NUM_STEPS': config.NUM_STEPS,
+        'BASE_CAPACITY': config.BASE_CAPACITY,
+        'PROBABILITY_OF_DISEASE': config.PROBABILITY_OF_DISEASE,
+        'IDEAL_CLINICAL_VALUES': config.IDEAL_CLINICAL_VALUES,
+        'INPUT_ACTIONS': config.INPUT_ACTIONS,
+        'OUTPUT_ACTIONS': config.OUTPUT_ACTIONS,
+    }
+    unknown = set(overrides) - set(params)
+    if unknown:
+        raise ValueError(f"Unknown simulation parameters: {sorted(unknown)}")
+    params.update(overrides)
+    return params
+
+
+def summarise_run(patients, system_cost_major, NUM_STEPS):
+    """
+    Reduces one run to the headline numbers printed by main.build_simulation.
+    """
+    last_major_step = max(system_cost_major.keys())
+    return {
+        'total_system_cost': float(sum(system_cost_major[last_major_step].values())),
+        'avg_queue_penalty': float(np.mean([p.outcomes['queue_penalty'] for p in patients])),
+        'avg_clinical_penalty': float(np.mean([p.outcomes['clinical_penalty'] for p in patients])),
+        'avg_wait_time': float(np.mean([p.queue_time / NUM_STEPS for p in patients])),
+    }
+
+
+def run_replication(seed_sequence, params):
+    """
+    Builds and runs one replication from its own seed stream and returns its summary (see summarise_run).
+
+    Args:
+        seed_sequence (np.random.SeedSequence): The replication's seed stream.
+        params (dict): Simulation parameters (see default_parameters).
+    """
+    from healthcare_sim.action import Action
+    from healthcare_sim.patient import Patient
+    from healthcare_sim.pathway import Pathway
+    from healthcare_sim.build import initialize_patients, initialize_simulation
+    from healthcare_sim.run import run_simulation
+
+    rng = np.random.default_rng(seed_sequence)
+
+    actions, pathways, transition_matrix = initialize_simulation(
+        Action, Pathway, params['NUM_PATIENTS'], params['NUM_PATHWAYS'], params['NUM_ACTIONS'], params['BASE_CAPACITY'],
+        params['IDEAL_CLINICAL_VALUES'], params['PROBABILITY_OF_DISEASE'], params['INPUT_ACTIONS'], params['OUTPUT_ACTIONS'], rng
+    )
+    patients = initialize_patients(Patient, params['NUM_PATHWAYS'], params['IDEAL_CLINICAL_VALUES'], params['NUM_PATIENTS'], rng)
+    _, _, system_cost_major, _, _, _ = run_simulation(
+        Patient, patients, pathways, actions, params['OUTPUT_ACTIONS'], params['INPUT_ACTIONS'], params['PROBABILITY_OF_DISEASE'],
+        params['NUM_PATHWAYS'], params['NUM_STEPS'], params['IDEAL_CLINICAL_VALUES'], rng
+    )
+    return summarise_run(patients, system_cost_major, params['NUM_STEPS'])
+
+
+def confidence_interval(values):
+    """
+    Returns (mean, standard deviation, lower, upper) of a 95% Student's t confidence interval for the mean.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, np.nan, np.nan, np.nan
+    std = float(values.std(ddof=1))
+    df = len(values) - 1
+    t = T_CRITICAL_95[df - 1] if df <= len(T_CRITICAL_95) else 1.96
+    half_width = t * std / float(np.sqrt(len(values)))
+    return mean, std, mean - half_width, mean + half_width
+
+
+def run_replications(NUM_REPLICATIONS, seed=None, workers=None, **overrides):
+    """
+    Runs NUM_REPLICATIONS independent simulations across a process pool and aggregates the results.
+
+    Args:
+        NUM_REPLICATIONS (int): Number of independent runs.
+        seed (int, optional): Root seed. Runs with the same root seed give the same results regardless of `workers`.
+        workers (int, optional): Number of worker processes (default: one per CPU). With 1, runs in this process.
+        **overrides: Simulation parameters to change from config.py (see default_parameters).
+
+    Returns:
+        dict:
+            - 'seed': The root seed's entropy (so an unseeded call can be repeated).
+            - 'runs': One summary dict per replication, in replication order.
+            - 'summary': For each metric, its mean, std and 95% confidence interval ('ci_low', 'ci_high').
+    """
+    params = default_parameters(**overrides)
+    root = np.random.SeedSequence(seed)
+    children = root.spawn(NUM_REPLICATIONS)
+
+    if workers == 1:
+        runs = [run_replication(child, params) for child in children]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(run_replication, children, [params] * NUM_REPLICATIONS))
+
+    summary = {}
+    for metric in METRICS:
+        mean, std, low, high = confidence_interval([run[metric] for run in runs])
+        summary[metric] = {'mean': mean, 'std': std, 'ci_low': low, 'ci_high': high}
+    return {'seed': root.entropy, 'runs': runs, 'summary': summary}
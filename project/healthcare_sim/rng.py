@@ -0,0 +1,142 @@
+import numpy as np
+
+"""
+Random number plumbing for the simulation.
+
+Every component takes an explicit numpy.random.Generator (`rng`). Components called without one fall back to a
+module-level default generator, which can be re-seeded with `seed()` for reproducible interactive runs.
+
+Hot paths draw one scalar at a time, so run_simulation wraps its generator in a StepRandom: a per-step batch
+provider that draws each step's normals and uniforms in one vectorized call and then serves them as scalars.
+"""
+
+_default_rng = np.random.default_rng()
+
+
+def seed(value=None):
+    """
+    Re-seeds the module-level default generator used by components called without an explicit rng.
+    """
+    global _default_rng
+    _default_rng = np.random.default_rng(value)
+
+
+def get_rng(rng=None):
+    """
+    Returns `rng` if given, otherwise the module-level default generator.
+    """
+    return _default_rng if rng is None else rng
+
+
+class StepRandom:
+    """
+    Per-step batch provider of random numbers.
+
+    next_step() is called at the start of every simulation step. It draws a block of standard normals and a block
+    of uniforms from the underlying Generator, one vectorized call each, sized from what the previous step used.
+    The scalar methods below, which mirror the numpy.random.Generator methods the model uses, then serve values from
+    these blocks without per-draw Generator overhead. If a step needs more than was drawn the block is topped up
+    with another vectorized call, so results depend only on the Generator's seed.
+
+    Attributes:
+        rng (np.random.Generator): The underlying generator.
+    """
+
+    def __init__(self, rng, normals=1024, uniforms=1024):
+        self.rng = rng
+        self._normal_block = normals
+        self._uniform_block = uniforms
+        self._normals = []
+        self._uniforms = []
+        self._n = 0
+        self._u = 0
+        self._normals_used = 0
+        self._uniforms_used = 0
+
+    def next_step(self):
+        """
+        Discards any values left from the previous step and pre-draws this step's batch.
+        """
+        if self._normals_used or self._uniforms_used:
+            self._normal_block = int(self._normals_used * 1.25) + 64
+            self._uniform_block = int(self._uniforms_used * 1.25) + 64
+        self._normals = self.rng.standard_normal(self._normal_block).tolist()
+        self._uniforms = self.rng.random(self._uniform_block).tolist()
+        self._n = 0
+        self._u = 0
+        self._normals_used = 0
+        self._uniforms_used = 0
+
+    def get_state(self):
+        """
+        Returns the block sizing state as a dict of ints. Together with the Generator's state this fixes every
+        value served after the next call to next_step(), so it is what a checkpoint needs to save.
+        """
+        return {
+            'normal_block': self._normal_block,
+            'uniform_block': self._uniform_block,
+            'normals_used': self._normals_used,
+            'uniforms_used': self._uniforms_used,
+        }
+
+    def set_state(self, state):
+        self._normal_block = state['normal_block']
+        self._uniform_block = state['uniform_block']
+        self._normals_used = state['normals_used']
+        self._uniforms_used = state['uniforms_used']
+
+    def _next_normal(self):
+        if self._n == len(self._normals):
+            self._normals = self.rng.standard_normal(self._normal_block).tolist()
+            self._n = 0
+        z = self._normals[self._n]
+        self._n += 1
+        self._normals_used += 1
+        return z
+
+    def _next_uniform(self):
+        if self._u == len(self._uniforms):
+            self._uniforms = self.rng.random(self._uniform_block).tolist()
+            self._u = 0
+        u = self._uniforms[self._u]
+        self._u += 1
+        self._uniforms_used += 1
+        return u
+
+    def standard_normal(self, size):
+        """
+        Returns `size` standard normals as an array: the same values, in the same order, as `size` calls of normal().
+        """
+        values = []
+        while len(values) < size:
+            if self._n == len(self._normals):
+                self._normals = self.rng.standard_normal(self._normal_block).tolist()
+                self._n = 0
+            take = min(size - len(values), len(self._normals) - self._n)
+            values.extend(self._normals[self._n:self._n + take])
+            self._n += take
+        self._normals_used += size
+        return np.array(values, dtype=float)
+
+    def normal(self, loc=0.0, scale=1.0):
+        return loc + scale * self._next_normal()
+
+    def random(self):
+        return self._next_uniform()
+
+    def uniform(self, low=0.0, high=1.0):
+        return low + (high - low) * self._next_uniform()
+
+    def integers(self, low, high=None):
+        """
+        Returns a random integer in [low, high), or in [0, low) if high is None.
+        """
+        if high is None:
+            low, high = 0, low
+        return low + int(self._next_uniform() * (high - low))
+
+    def choice(self, seq):
+        """
+        Returns a random element of a sequence.
+        """
+        return seq[int(self._next_uniform() * len(seq))]
@@ -1,25 +1,78 @@
 import numpy as np
 from collections import defaultdict
 from healthcare_sim.config import NUM_STEPS
-import copy
+from healthcare_sim.population import Population
+from healthcare_sim.patient import pathway_index
+from healthcare_sim.metrics import SystemMetrics
+from healthcare_sim.activity_log import ActivityLog
+from healthcare_sim.snapshot import ActionsSnapshot, PathwaySnapshot
+from healthcare_sim.rng import StepRandom, get_rng
+from healthcare_sim.checkpoint import Checkpoint
+from healthcare_sim.transitions import TransitionTable, sample_next_actions
+from collections import deque
+import os
 
 """
 This step simulates the flow of patients through the healthcare system. The simulation tracks the clinical variables of each patient, 
 determines their next actions based on predefined pathways, and executes those actions while calculating the associated costs.
 
 1. A loop runs for `NUM_STEPS`, representing each time step in the simulation.
-2. The `progress_disease()` method is called to simulate the natural decline in their clinical variables over time and occurence of diseases.
+2. Disease onset is drawn for every inactive (patient, pathway) pair in one vectorized call (`Patient.draw_onsets`), and the patient's
+   clinical variables decline once per active pathway.
 3. For each patient and each pathway in the `pathways` list:
     - The `next_action()` method is called to determine the next action for the patient based on their clinical variables and the pathway's thresholds.
     - If a valid next action is identified and exists in the `actions` dictionary, the patient is assigned to the action's queue, and the action is added to the patient's history.
+   New diseases then join their input actions' queues, one bulk assign per input action (`Patient.start_diseases`). Rewards
+   still see the queue length as if each had joined when the loop passed its pair.
 4. For each action in the `actions` dictionary:
     - The `execute()` method is called to process patients in the action's queue, apply the action's effects, and calculate the cost incurred.
     - The cost for the action is added to the `step_cost`.
 5. The total cost for the current time step (`step_cost`) is appended to the `system_cost` list.
 
+`patients` may be either a list of Patient objects or a Population. In population mode clinical decay and clamping
+are applied to the whole cohort in one vectorized call per step, with the same draws as the per-patient decay, so a
+seeded run gives the same results in either mode.
+
+System-wide quantities (total queue length, average clinical penalty, average queue length) are kept by a SystemMetrics
+aggregator that the actions and patients update as state changes. The penalty and queue length histories are sampled
+once per step, after all patients have been assigned and before the actions execute.
+
+All randomness comes from the `rng` Generator. Scalar draws in the per-patient loop are served from a StepRandom,
+which pre-draws each step's normals and uniforms in one vectorized call.
+
+Streaming mode: if a `sink` (see sinks.py) is given, nothing that grows with the horizon is kept in memory. Each step's
+cost, history values and action schedules are passed to the sink as one record, along with the activity log, which
+the sink clears when it writes it out. Patient histories are bounded to the last `history_limit` entries (default
+none; the per-pathway action index does not need them). The returned snapshots, costs and histories are then empty.
+
+Checkpointing: with `checkpoint_every` and `checkpoint_dir` set, the full run state is written to
+'checkpoint_<major_step>_<step>.npz' at the start of every `checkpoint_every`-th step (see checkpoint.py). To resume,
+load one with Checkpoint.load and pass it as `resume`, together with its patients, pathways, actions and rng. In
+streaming mode the sink is flushed before each checkpoint, so everything up to the checkpoint is on disk, and the
+sink's state is saved with it so that a resumed run writes on after those files rather than over them.
+
+Next actions: when the pathways share a compiled TransitionTable (as built by initialize_simulation), the next actions
+of all pairs active at the start of a step are sampled in one vectorized call (see transitions.sample_next_actions)
+and handed to Pathway.next_action, rather than each pair sampling its own.
+
+Learning: a QPolicy (see policy.py) passed as `policy` chooses the next actions of all active pairs in one batch
+instead of the uniform sampler, and learns from the reward computed for each pair with one batch of TD updates after
+the step's actions have executed. Each major step is one training episode; there are NUM_EPISODES of them (default 2,
+the first against the last being the raw versus learnt comparison the visualisations show).
+
+Capacity: by default each action redraws its capacity every step (Action.update_capacity). A CapacityCalendar (see
+capacity.py) passed as `capacity` replaces this with a lookup of the step's column in a precomputed calendar, built
+from profiles or loaded from a rota CSV. The calendar is an input like the actions and pathways, so pass the same one
+again when resuming from a checkpoint.
+
+Profiling: a PhaseProfiler (see profiling.py) passed as `profiler` is told when each phase of the step loop ends and
+what each action did, giving per-phase timings per step and per major step. With no profiler the hooks are skipped.
+
 """
 def run_simulation(Patient, patients, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, PROBABILITY_OF_DISEASE,
-        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES):
+        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES, rng=None, sink=None, history_limit=0,
+        checkpoint_every=None, checkpoint_dir=None, resume=None, profiler=None, policy=None, NUM_EPISODES=2,
+        capacity=None):
     from healthcare_sim.action import Action
     import time
     
@@ -30,57 +83,220 @@ def run_simulation(Patient, patients, pathways, actions, OUTPUT_ACTIONS, INPUT_A
     clinical_penalty_history = []
     queue_length_history = []
     
+    population = isinstance(patients, Population)
+    rng = get_rng(rng)
+    step_rng = StepRandom(rng)
+    table = pathways[0].transitions if pathways else None
+    if not (isinstance(table, TransitionTable) and all(pw.transitions is table and pw.name in table for pw in pathways)):
+        table = None
+    if policy is not None and (table is None or policy.table.pathway_names != table.pathway_names
+                               or policy.table.action_names != table.action_names):
+        raise ValueError("A policy needs the pathways to share the compiled TransitionTable it was built for")
+    # Disease flags are read as one bitmask per patient per step (see Patient.disease_mask)
+    index = patients.pathway_index if population else pathway_index(NUM_PATHWAYS)
+    pathway_columns = [index[pw.name] for pw in pathways]
+    pathway_bits = [(pw, 1 << j) for pw, j in zip(pathways, pathway_columns)]
+    if capacity is not None:
+        capacity = capacity.reindex(list(actions))
+        action_list = list(actions.values())
+    if sink is not None:
+        activity_log = ActivityLog()  # One log for the whole run, emptied by the sink as it writes
+        for p in patients:
+            p.history = deque(p.history, maxlen=history_limit)
+    if checkpoint_every:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    start_major_step, start_step = 0, 0
+    if resume is not None:
+        start_major_step, start_step = resume.major_step, resume.step
+        step_rng.set_state(resume.step_rng_state)
+        actions_major = dict(resume.actions_major)
+        pathways_major = resume.pathways_major
+        system_cost_major = dict(resume.system_cost_major)
+        activity_log_major = dict(resume.activity_log_major)
+        clinical_penalty_history = list(resume.clinical_penalty_history)
+        queue_length_history = list(resume.queue_length_history)
+        if sink is not None:
+            activity_log = resume.activity_log
+            if resume.sink_state is not None:
+                sink.set_state(resume.sink_state)
+        if policy is not None and resume.policy_state is not None:
+            policy.set_state(resume.policy_state)
+
     print("Running simulation...")
     start_time = time.time()
     
-    for major_step in range(2):  # Major step loop, can be expanded for multiple iterations
-        system_cost = {}
-        sum_cost = 0
-        activity_log = []
-        for p in patients:
-            p.diseases = {f'P{p}': False for p in range(NUM_PATHWAYS)}
-        for step in range(NUM_STEPS):
+    for major_step in range(start_major_step, NUM_EPISODES):  # Major step loop, one learning episode each
+        resuming = resume is not None and major_step == start_major_step
+        if resuming:
+            system_cost = dict(resume.system_cost)
+            sum_cost = resume.sum_cost
+            if sink is None:
+                activity_log = resume.activity_log
+            metrics = SystemMetrics(patients, actions)
+            metrics.total_clinical_penalty = resume.total_clinical_penalty
+        else:
+            system_cost = {}
+            sum_cost = 0
+            if sink is None:
+                activity_log = ActivityLog()
+            if population:
+                patients.reset_diseases()
+            else:
+                for p in patients:
+                    p.disease_mask = 0
+            metrics = SystemMetrics(patients, actions)
+        for act in actions.values():
+            act.metrics = metrics
+        if policy is not None:
+            policy.start_episode(major_step)
+        if profiler:
+            profiler.start_major_step(major_step, actions)
+        for step in range(start_step if resuming else 0, NUM_STEPS):
+            if profiler:
+                profiler.start_step(step)
+            if checkpoint_every and step % checkpoint_every == 0 and not (resuming and step == start_step):
+                if sink is not None:
+                    sink.flush()
+                Checkpoint(
+                    patients, actions, pathways, rng, step_rng.get_state(), major_step, step,
+                    metrics.total_clinical_penalty, sum_cost, system_cost, activity_log, clinical_penalty_history,
+                    queue_length_history, actions_major, system_cost_major, activity_log_major,
+                    policy.get_state() if policy is not None else None, sink.get_state() if sink is not None else None,
+                ).save(os.path.join(checkpoint_dir, f"checkpoint_{major_step}_{step:06d}.npz"))
+                if profiler:
+                    profiler.lap('checkpoint')
             step_cost = 0
             rewards = []
-            for act in actions.values():
-                act.update_capacity(step)
+            step_rng.next_step()
+            if profiler:
+                profiler.lap('draw_random')
+            if capacity is not None:
+                capacity.apply(action_list, step)
+            else:
+                for act in actions.values():
+                    act.update_capacity(step, step_rng)
+            if profiler:
+                profiler.lap('update_capacity')
+            if policy is not None:
+                choices = iter(policy.choose_next_actions(patients, pathways, metrics.system_state, rng))
+            elif table is not None:
+                choices = iter(sample_next_actions(table, patients, pathways, rng))
+            else:
+                choices = None
+            if profiler:
+                profiler.lap('next_action')
+            active = _disease_flags(patients, population, pathway_columns)
+            onset_rows, onset_cols, onset_starts = Patient.draw_onsets(active, PROBABILITY_OF_DISEASE, len(INPUT_ACTIONS), rng)
+            # Onsets join their queues after the loop, so each active pair is told how many would have joined before it
+            onset = np.zeros(active.size, dtype=np.int64)
+            onset[onset_rows * active.shape[1] + onset_cols] = 1
+            onsets_before = iter((np.cumsum(onset) - onset)[np.flatnonzero(active)].tolist())
+            if profiler:
+                profiler.lap('progress_diseases')
+            if population:
+                # Once per active pathway, for the whole cohort; drawn where the loop below would draw it, so that
+                # any StepRandom top-ups come from rng in the same order as with Patient objects
+                patients.clinical_decay(IDEAL_CLINICAL_VALUES, step_rng)
+                if profiler:
+                    profiler.lap('clinical_decay')
             for p in patients:
-                for pw in pathways:
-                    if not p.diseases[pw.name]:
-                        Patient.progress_diseases(p, pw.name, actions, INPUT_ACTIONS, PROBABILITY_OF_DISEASE)
+                disease_mask = p.disease_mask  # A pair's flag only changes when the loop reaches that pair
+                for pw, bit in pathway_bits:
+                    if not disease_mask & bit:
                         continue
-                    Patient.clinical_decay(p, IDEAL_CLINICAL_VALUES) # Patient gets a little worse per pathway they are on
-                    for act in actions.values():
-                        system_state = int(sum(len(act.queue) for act in actions.values())) # Calculate the total queue
-                    next_a = pw.next_action(p,  actions, major_step, step, activity_log, system_state)
+                    if not population:
+                        Patient.clinical_decay(p, IDEAL_CLINICAL_VALUES, step_rng) # Patient gets a little worse per pathway they are on
+                        if profiler:
+                            profiler.lap('clinical_decay')
+                    system_state = metrics.system_state + next(onsets_before) # Total queue across all actions
+                    next_a = pw.next_action(p,  actions, major_step, step, activity_log, system_state, step_rng,
+                        next(choices) if choices is not None else None)
+                    if profiler:
+                        profiler.lap('next_action')
                     if next_a == OUTPUT_ACTIONS:
                         if pw.name in p.diseases:
                             p.diseases[pw.name] = False # Remove disease flag as pathway finished
                     queue_penalty = p.queue_time ** 2  # Quadratic penalty
-                    clinical_penalty = np.exp(p.outcomes['clinical_penalty'] / 50) # Exponential penalty
+                    clinical_penalty = np.exp(p.clinical_penalty / 50) # Exponential penalty
                     action_cost = actions[next_a].cost if next_a in actions else 0
                     reward = - 0.25 * action_cost - 0.5 * clinical_penalty - 0.0001 * queue_penalty - 0.5 * system_state
                     rewards.append(reward)
-                    
-                    avg_clinical_penalty = np.mean([p.outcomes['clinical_penalty'] for p in patients])
-                    avg_queue_length = np.mean([len(act.queue) for act in actions.values()])
+                    if profiler:
+                        profiler.lap('reward')
+            Patient.start_diseases(patients, pathways, onset_rows, onset_cols, onset_starts, actions, INPUT_ACTIONS)
+            if population:
+                patients.comorbidities[:] = patients.diseases.sum(axis=1)
+            if profiler:
+                profiler.lap('progress_diseases')
 
-                    clinical_penalty_history.append(avg_clinical_penalty)
-                    queue_length_history.append(avg_queue_length)
+            avg_clinical_penalty = metrics.avg_clinical_penalty
+            avg_queue_length = metrics.avg_queue_length
+            if profiler:
+                profiler.lap('metrics')
 
             for act in actions.values():
+                queued = len(act.queue)
                 in_progress, cost = act.execute(IDEAL_CLINICAL_VALUES)
                 step_cost += cost
+                if profiler:
+                    profiler.observe_action(act.name, queued, len(act.queue), len(in_progress))
             sum_cost += step_cost
-            system_cost[step] = sum_cost
+            if profiler:
+                profiler.lap('execute')
+            if policy is not None:
+                policy.update(rewards, patients, metrics.system_state)
+                if profiler:
+                    profiler.lap('learn')
+
+            if sink is None:
+                clinical_penalty_history.append(avg_clinical_penalty)
+                queue_length_history.append(avg_queue_length)
+                system_cost[step] = sum_cost
+            else:
+                sink.write_step({
+                    'major_step': major_step,
+                    'step': step,
+                    'step_cost': step_cost,
+                    'system_cost': sum_cost,
+                    'avg_clinical_penalty': avg_clinical_penalty,
+                    'avg_queue_length': avg_queue_length,
+                    'schedule': [act.schedule[-1] for act in actions.values()],
+                }, activity_log)
+                for act in actions.values():
+                    act.schedule.clear()
+            if profiler:
+                profiler.lap('record')
+                profiler.end_step()
             
-        actions_major[major_step] = copy.deepcopy(actions)
-        pathways_major[major_step] = copy.deepcopy(pathways)
-        system_cost_major[major_step] = copy.deepcopy(system_cost)
-        activity_log_major[major_step] = copy.deepcopy(activity_log)
+        if sink is not None:
+            for act in actions.values():
+                act.reset()
+            continue
+
+        # Snapshot only what is reported; a fresh system_cost and activity_log are started each major step, so no copy is needed
+        actions_major[major_step] = ActionsSnapshot(actions)
+        pathways_major[major_step] = [PathwaySnapshot(pw) for pw in pathways]
+        system_cost_major[major_step] = system_cost
+        activity_log_major[major_step] = activity_log
         for act in actions.values():
             act.reset()  # Reset each Action object for the next major step
+    if sink is not None:
+        sink.flush()
     end_time = time.time()
     print(f"Run completed in {end_time - start_time:.2f} seconds")        
     return actions_major, pathways_major, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history
-            
\ No newline at end of file
+            
+
+def _disease_flags(patients, population, columns):
+    """
+    Returns the N x P boolean matrix of disease flags at the start of a step, with one column per pathway in `columns`
+    (the pathways' bit positions, see Patient.disease_mask).
+    """
+    if population:
+        return patients.diseases[:, columns]
+    columns = np.asarray(columns, dtype=np.int64)
+    masks = [p.disease_mask for p in patients]
+    if not len(columns) or columns.max() < 63:
+        return (np.array(masks, dtype=np.int64)[:, None] >> columns & 1).astype(bool)
+    return np.array([[mask >> j & 1 for j in columns.tolist()] for mask in masks], dtype=bool).reshape(len(masks), len(columns))
@@ -0,0 +1,137 @@
+import csv
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+
+"""
+Sinks for streaming runs.
+
+When run_simulation is given a sink it does not keep per-step results in memory. Instead, at the end of every step
+it passes the sink one step record and the run's ActivityLog. Step records are dicts with these keys:
+
+- 'major_step', 'step': Where the run is.
+- 'step_cost': Cost incurred this step; 'system_cost': cumulative cost so far in this major step.
+- 'avg_clinical_penalty', 'avg_queue_length': The values otherwise appended to the run's histories.
+- 'schedule': Patients in progress per action this step, in the order of the actions dict.
+
+A sink that has written the activity log out calls activity_log.clear(), so the log only ever holds the transitions
+since the last flush.
+
+A sink's get_state() is saved with each checkpoint and handed back to set_state() when the run is resumed, so a
+resumed run carries on writing where the checkpointed one left off.
+"""
+
+STEP_COLUMNS = ['major_step', 'step', 'step_cost', 'system_cost', 'avg_clinical_penalty', 'avg_queue_length']
+
+
+class RecordSink(ABC):
+    """
+    Interface for receiving per-step records from a streaming run. Subclasses must implement write_step.
+    """
+
+    @abstractmethod
+    def write_step(self, record, activity_log):
+        """
+        Receives one step record and the run's ActivityLog. Called by run_simulation at the end of every step.
+        """
+
+    def flush(self):
+        """
+        Writes out anything buffered. Called by run_simulation when the run ends.
+        """
+        pass
+
+    def close(self):
+        self.flush()
+
+    def get_state(self):
+        """
+        Returns what a checkpoint needs to resume writing (a JSON-serialisable value), or None.
+        """
+        return None
+
+    def set_state(self, state):
+        pass
+
+
+class MemorySink(RecordSink):
+    """
+    Keeps every step record in a list and leaves the activity log to grow. Useful for small runs and for checking
+    a streaming run against a normal one; it does not bound memory.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.activity_log = None
+
+    def write_step(self, record, activity_log):
+        self.records.append(record)
+        self.activity_log = activity_log
+
+
+class ChunkedFileSink(RecordSink):
+    """
+    Buffers step records and writes them to disk every `flush_every` steps, together with the activity log rows
+    logged since the previous flush, so memory use stays flat however long the run.
+
+    Each flush writes 'steps_<chunk>.<fmt>' holding the buffered step records (for npz, the schedules as a
+    steps x actions matrix plus the action names) and the activity log via ActivityLog.export with the prefix
+    'activity_<chunk>'.
+
+    Attributes:
+        directory (str): Directory the chunks are written to.
+        flush_every (int): Number of steps buffered between writes.
+        fmt (str): 'npz' or 'csv'.
+        action_names (list): Names of the actions, in schedule column order.
+        paths (list): Paths of all files written so far.
+
+    Chunks are numbered from `start_chunk`. When a run is resumed from a checkpoint the number of the next chunk is
+    restored from it (see get_state), so chunks flushed before the checkpoint are not overwritten.
+    """
+
+    def __init__(self, directory, flush_every=100, fmt='npz', action_names=None, start_chunk=0):
+        if fmt not in ('npz', 'csv'):
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_every = flush_every
+        self.fmt = fmt
+        self.action_names = action_names
+        self.paths = []
+        self._records = []
+        self._activity_log = None
+        self._chunk = start_chunk
+
+    def write_step(self, record, activity_log):
+        self._records.append(record)
+        self._activity_log = activity_log
+        if len(self._records) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._records:
+            return
+        path = os.path.join(self.directory, f"steps_{self._chunk:05d}.{self.fmt}")
+        schedule = np.array([r['schedule'] for r in self._records])
+        names = self.action_names or [f'action_{i}' for i in range(schedule.shape[1])]
+        if self.fmt == 'npz':
+            columns = {name: np.array([r[name] for r in self._records]) for name in STEP_COLUMNS}
+            np.savez_compressed(path, schedule=schedule, action_names=np.array(names, dtype=str), **columns)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(STEP_COLUMNS + [f'schedule_{name}' for name in names])
+                for r, row in zip(self._records, schedule):
+                    writer.writerow([r[name] for name in STEP_COLUMNS] + row.tolist())
+        self.paths.append(path)
+        if self._activity_log is not None and len(self._activity_log):
+            self.paths.extend(self._activity_log.export(self.directory, self.fmt, prefix=f"activity_{self._chunk:05d}"))
+            self._activity_log.clear()
+        self._records = []
+        self._chunk += 1
+
+    def get_state(self):
+        return {'chunk': self._chunk}
+
+    def set_state(self, state):
+        self._chunk = state['chunk']
@@ -0,0 +1,77 @@
+import numpy as np
+from collections.abc import Mapping
+
+
+class ActionSnapshot:
+    """
+    Read-only record of one action at the end of a major step.
+
+    Attributes:
+        name (str): The name of the action.
+        base_capacity (int): The action's base capacity.
+        cost (int): The cost associated with performing the action.
+        duration (int): The duration of the action in time steps.
+        effect (dict): The action's effect on clinical variables (shared with the live Action, not copied).
+        schedule (np.ndarray): Number of patients in progress at each time step (a row of the episode's schedule matrix).
+    """
+    __slots__ = ('name', 'base_capacity', 'cost', 'duration', 'effect', 'schedule')
+
+    def __init__(self, name, base_capacity, cost, duration, effect, schedule):
+        self.name = name
+        self.base_capacity = base_capacity
+        self.cost = cost
+        self.duration = duration
+        self.effect = effect
+        self.schedule = schedule
+
+
+class ActionsSnapshot(Mapping):
+    """
+    Compact snapshot of every action at the end of a major step, replacing copy.deepcopy(actions).
+
+    Only what the visualisations need is kept: each action's schedule (as one actions x steps matrix), cost and
+    static parameters. Queues and in-progress lists, and so the patients in them, are not captured, so the
+    snapshot's size scales with actions x steps rather than with the number of patients.
+    It behaves as a read-only dict of action name -> ActionSnapshot.
+
+    Attributes:
+        names (list): Action names, in row order.
+        cost (np.ndarray): Cost per action.
+        schedule (np.ndarray): Actions x steps matrix of patients in progress.
+    """
+
+    def __init__(self, actions, schedule=None):
+        self.names = list(actions.keys())
+        self.cost = np.array([act.cost for act in actions.values()])
+        if schedule is None:
+            steps = max((len(act.schedule) for act in actions.values()), default=0)
+            schedule = np.zeros((len(self.names), steps), dtype=np.int32)
+            for row, act in zip(schedule, actions.values()):
+                row[:len(act.schedule)] = act.schedule
+        self.schedule = np.asarray(schedule, dtype=np.int32)
+        self._actions = {
+            name: ActionSnapshot(name, act.base_capacity, act.cost, act.duration, act.effect, self.schedule[i])
+            for i, (name, act) in enumerate(actions.items())
+        }
+
+    def __getitem__(self, name):
+        return self._actions[name]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class PathwaySnapshot:
+    """
+    Record of a pathway at the end of a major step.
+    The transition and threshold matrices do not change during a run, so they are shared with the live Pathway rather than copied.
+    """
+    __slots__ = ('name', 'transitions', 'thresholds')
+
+    def __init__(self, pathway):
+        self.name = pathway.name
+        self.transitions = pathway.transitions
+        self.thresholds = pathway.thresholds
@@ -0,0 +1,235 @@
+import copy
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import numpy as np
+from healthcare_sim.replicate import default_parameters, summarise_run
+
+"""
+Parallel scenario sweeps with shared build artifacts and memoised results.
+
+run_sweep takes a grid of parameter values (e.g. {'BASE_CAPACITY': [5, 10, 20], 'COST_SCALE': [0.8, 1.0]}), runs
+every combination for every seed across a process pool, and returns one summary per (point, seed) (see
+replicate.summarise_run).
+
+Parameters are split by what they change:
+
+- BUILD_PARAMETERS fix the actions and pathways drawn by initialize_simulation, and COHORT_PARAMETERS the patients.
+  These are built once per distinct set of values and seed in each worker and reused by every sweep point that only
+  differs in run-time parameters.
+- RUN_PARAMETERS are applied to a copy of the built actions before the run: BASE_CAPACITY replaces each action's base
+  capacity and COST_SCALE multiplies each action's drawn cost.
+
+Each seed is split into separate build, cohort and run streams (numpy.random.SeedSequence.spawn), so the same seed
+gives the same actions, pathways and patients at every point of a sweep and points are compared on common random
+numbers.
+
+Finished points are saved in cache_dir, one JSON file per point named by a hash of its full parameters and seed
+(see point_key). A sweep that is re-issued, or extended with new values or seeds, only runs the points that are not
+there yet.
+"""
+
+SWEEP_VERSION = 2  # Part of every point's key; bump when a change to the model changes results
+
+BUILD_PARAMETERS = ['NUM_PATHWAYS', 'NUM_ACTIONS', 'IDEAL_CLINICAL_VALUES', 'INPUT_ACTIONS', 'OUTPUT_ACTIONS']
+COHORT_PARAMETERS = ['NUM_PATIENTS', 'NUM_PATHWAYS', 'IDEAL_CLINICAL_VALUES']
+RUN_PARAMETERS = ['NUM_STEPS', 'NUM_EPISODES', 'BASE_CAPACITY', 'PROBABILITY_OF_DISEASE', 'COST_SCALE']
+
+
+def sweep_parameters(**overrides):
+    """
+    Returns the parameters of one sweep point: those of replicate.default_parameters plus NUM_EPISODES and
+    COST_SCALE, with any keyword overrides applied. OUTPUT_ACTIONS=None means the last action, so that NUM_ACTIONS
+    can be swept on its own.
+    """
+    from healthcare_sim import config
+
+    extra = {'NUM_EPISODES': overrides.pop('NUM_EPISODES', config.NUM_EPISODES), 'COST_SCALE': overrides.pop('COST_SCALE', 1.0)}
+    params = default_parameters(**overrides)
+    params.update(extra)
+    if params['OUTPUT_ACTIONS'] is None:
+        params['OUTPUT_ACTIONS'] = f"a{params['NUM_ACTIONS'] - 1}"
+    return params
+
+
+def parameter_grid(grid):
+    """
+    Expands a grid into the list of override dicts of every combination, with the last parameter varying fastest.
+
+    Args:
+        grid (dict or list): Parameter name -> list of values, or a list of such dicts whose grids are concatenated.
+    """
+    if isinstance(grid, dict):
+        grid = [grid]
+    points = []
+    for subgrid in grid:
+        names = list(subgrid)
+        for values in itertools.product(*(subgrid[name] for name in names)):
+            points.append(dict(zip(names, values)))
+    return points
+
+
+def _json(params):
+    return json.dumps(params, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+
+
+def _canonical(params):
+    # Only the parameter names are sorted: the order of a value's own keys is part of the model (initialize_simulation
+    # gives action i an effect on the (i mod 5)-th clinical variable of IDEAL_CLINICAL_VALUES), so it is kept
+    return _json({name: params[name] for name in sorted(params)})
+
+
+def point_key(params, seed):
+    """
+    Returns the cache key of a sweep point: a hash of its full parameters (see sweep_parameters) and seed.
+    """
+    return hashlib.sha256(f"{SWEEP_VERSION}:{seed}:{_canonical(params)}".encode()).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _build(build_json, seed):
+    """
+    Builds the actions, pathways and patients of a set of build and cohort parameters and a seed (cached per process).
+    `build_json` is the parameters as JSON in their original key order, which json.loads keeps.
+    """
+    from healthcare_sim.action import Action
+    from healthcare_sim.patient import Patient
+    from healthcare_sim.pathway import Pathway
+    from healthcare_sim.build import initialize_patients, initialize_simulation
+
+    params = json.loads(build_json)
+    build_seed, cohort_seed, _ = np.random.SeedSequence(seed).spawn(3)
+    # BASE_CAPACITY and PROBABILITY_OF_DISEASE are not used by the draws; the run-time values are applied per point
+    actions, pathways, _ = initialize_simulation(
+        Action, Pathway, params['NUM_PATIENTS'], params['NUM_PATHWAYS'], params['NUM_ACTIONS'], 0,
+        params['IDEAL_CLINICAL_VALUES'], 0.0, params['INPUT_ACTIONS'], params['OUTPUT_ACTIONS'], np.random.default_rng(build_seed)
+    )
+    patients = initialize_patients(Patient, params['NUM_PATHWAYS'], params['IDEAL_CLINICAL_VALUES'], params['NUM_PATIENTS'],
+                                   np.random.default_rng(cohort_seed))
+    return actions, pathways, patients
+
+
+def run_point(params, seed):
+    """
+    Runs one sweep point and returns its summary (see replicate.summarise_run).
+
+    Args:
+        params (dict): Full parameters of the point (see sweep_parameters).
+        seed (int): The point's seed.
+    """
+    from healthcare_sim.patient import Patient
+    from healthcare_sim.run import run_simulation
+
+    build_params = {name: params[name] for name in dict.fromkeys(BUILD_PARAMETERS + COHORT_PARAMETERS)}
+    built_actions, pathways, built_patients = _build(_json(build_params), seed)
+    actions = copy.deepcopy(built_actions)
+    patients = copy.deepcopy(built_patients)  # Pathways are only read during a run, so they are shared
+    for act in actions.values():
+        act.base_capacity = act.capacity = params['BASE_CAPACITY']
+        act.cost = act.cost * params['COST_SCALE']
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(3)[2])
+    _, _, system_cost_major, _, _, _ = run_simulation(
+        Patient, patients, pathways, actions, params['OUTPUT_ACTIONS'], params['INPUT_ACTIONS'], params['PROBABILITY_OF_DISEASE'],
+        params['NUM_PATHWAYS'], params['NUM_STEPS'], params['IDEAL_CLINICAL_VALUES'], rng, NUM_EPISODES=params['NUM_EPISODES']
+    )
+    return summarise_run(patients, system_cost_major, params['NUM_STEPS'])
+
+
+def _load_point(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json")) as f:
+            return json.load(f)['summary']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_point(cache_dir, key, params, seed, summary):
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(json.dumps({'params': json.loads(_canonical(params)), 'seed': seed, 'summary': summary}, indent=2))
+    os.replace(tmp, path)
+
+
+def _run_group(group):
+    return [run_point(params, seed) for params, seed in group]
+
+
+def run_sweep(grid, seeds=(0,), cache_dir=".sweep_cache", workers=None, use_cache=True, **fixed):
+    """
+    Runs every point of a parameter grid for every seed across a process pool, reusing memoised results.
+
+    Points are scheduled in chunks that share their build and cohort parameters and seed, and each worker keeps its
+    most recent builds, so a build is normally drawn once per worker rather than once per point. Each chunk's points
+    are saved to cache_dir as soon as it finishes, so an interrupted sweep keeps its progress.
+
+    Args:
+        grid (dict or list): Parameters to sweep (see parameter_grid).
+        seeds (iterable of int): Seeds to run every point with.
+        cache_dir (str or None): Directory of memoised points (created if missing); None disables memoisation.
+        workers (int, optional): Number of worker processes (default: one per CPU). With 1, runs in this process.
+        use_cache (bool): Whether to reuse memoised points. Computed points are saved either way.
+        **fixed: Parameters to change from config.py at every point (see sweep_parameters).
+
+    Returns:
+        dict:
+            - 'runs': One dict per (point, seed), in grid then seed order, with the point's swept parameters,
+              'seed', 'key' (see point_key) and the summary metrics.
+            - 'computed': Number of points run by this call.
+            - 'cached': Number of points read from cache_dir.
+    """
+    seeds = list(seeds)
+    points = parameter_grid(grid)
+    records = []
+    for overrides in points:
+        params = sweep_parameters(**{**fixed, **overrides})
+        for seed in seeds:
+            records.append((overrides, params, seed, point_key(params, seed)))
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    results = {}
+    if use_cache and cache_dir is not None:
+        for _, _, _, key in records:
+            if key not in results:
+                summary = _load_point(cache_dir, key)
+                if summary is not None:
+                    results[key] = summary
+    cached = len(results)
+
+    groups = {}
+    for _, params, seed, key in records:
+        if key in results:
+            continue
+        build_key = (_canonical({name: params[name] for name in BUILD_PARAMETERS + COHORT_PARAMETERS}), seed)
+        group = groups.setdefault(build_key, {})
+        group.setdefault(key, (params, seed))
+    # Large groups are split so that a sweep over run-time parameters alone still fills the pool
+    num_workers = 1 if workers == 1 else workers or os.cpu_count() or 1
+    chunk = max(1, -(-sum(len(group) for group in groups.values()) // (4 * num_workers)))
+    tasks = []
+    for group in groups.values():
+        items = list(group.items())
+        tasks.extend(items[i:i + chunk] for i in range(0, len(items), chunk))
+
+    def finish(task, summaries):
+        for (key, (params, seed)), summary in zip(task, summaries):
+            results[key] = summary
+            if cache_dir is not None:
+                _save_point(cache_dir, key, params, seed, summary)
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            finish(task, _run_group([point for _, point in task]))
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_group, [point for _, point in task]): task for task in tasks}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    runs = [{**overrides, 'seed': seed, 'key': key, **results[key]} for overrides, _, seed, key in records]
+    return {'runs': runs, 'computed': len(results) - cached, 'cached': cached}
@@ -0,0 +1,83 @@
+import numpy as np
+from collections.abc import Mapping
+
+"""
+Dense threshold tensor.
+
+The threshold matrix used to be built as nested dicts ({'P0': {'a0': {'bp': ..., 'age': ..., 'rand_factor': ...}}})
+with one scalar draw per entry. A ThresholdTensor holds the same values as one P x A x (K + 2) float array, whose
+last axis is the K clinical variables followed by 'age' and 'rand_factor', so it is drawn in three vectorized calls.
+
+Like TransitionTable it is also a read-only Mapping with the old nested-dict interface (tensor['P0']['a0']['bp']),
+so code reading the dict form works on it unchanged.
+"""
+
+
+class ThresholdTensor(Mapping):
+    """
+    Thresholds per pathway and action as a dense array, with a nested-dict view.
+
+    Attributes:
+        pathway_names (list): Pathway codes, in axis 0 order.
+        action_names (list): Action names, in axis 1 order.
+        columns (list): Threshold names, in axis 2 order (clinical variables, then 'age' and 'rand_factor').
+        values (np.ndarray): P x A x (K + 2) array of thresholds.
+    """
+
+    INTEGER_COLUMNS = ('age',)
+
+    def __init__(self, pathway_names, action_names, columns, values):
+        self.pathway_names = list(pathway_names)
+        self.action_names = list(action_names)
+        self.columns = list(columns)
+        self.values = np.asarray(values, dtype=float)
+        self.pathway_index = {name: j for j, name in enumerate(self.pathway_names)}
+        self._views = {}
+
+    @classmethod
+    def random(cls, pathway_names, action_names, IDEAL_CLINICAL_VALUES, rng):
+        """
+        Draws thresholds with the same distributions as the old nested-dict build: each clinical threshold from
+        N(ideal, 5), 'age' as an integer in [18, 65) and 'rand_factor' from U(0.2, 0.8).
+        """
+        shape = (len(pathway_names), len(action_names))
+        ideal = np.array(list(IDEAL_CLINICAL_VALUES.values()), dtype=float)
+        values = np.concatenate([
+            rng.normal(ideal, 5, size=shape + (len(ideal),)),
+            rng.integers(18, 65, size=shape + (1,)),
+            rng.uniform(0.2, 0.8, size=shape + (1,)),
+        ], axis=2)
+        return cls(pathway_names, action_names, list(IDEAL_CLINICAL_VALUES) + ['age', 'rand_factor'], values)
+
+    @classmethod
+    def from_dict(cls, threshold_matrix):
+        """
+        Builds a tensor from a nested-dict threshold matrix (every pathway and action must have the same keys).
+        """
+        pathway_names = list(threshold_matrix.keys())
+        action_names = list(threshold_matrix[pathway_names[0]].keys()) if pathway_names else []
+        columns = list(threshold_matrix[pathway_names[0]][action_names[0]].keys()) if action_names else []
+        values = [[[threshold_matrix[p][a][c] for c in columns] for a in action_names] for p in pathway_names]
+        return cls(pathway_names, action_names, columns, np.array(values, dtype=float).reshape(len(pathway_names), len(action_names), len(columns)))
+
+    def __getitem__(self, pathway):
+        view = self._views.get(pathway)
+        if view is None:
+            rows = self.values[self.pathway_index[pathway]].tolist()
+            view = self._views[pathway] = {
+                action: {c: (int(v) if c in self.INTEGER_COLUMNS else v) for c, v in zip(self.columns, row)}
+                for action, row in zip(self.action_names, rows)
+            }
+        return view
+
+    def __iter__(self):
+        return iter(self.pathway_names)
+
+    def __len__(self):
+        return len(self.pathway_names)
+
+    def to_dict(self):
+        """
+        Returns the thresholds as a plain nested dict.
+        """
+        return {pathway: {action: dict(row) for action, row in self[pathway].items()} for pathway in self}
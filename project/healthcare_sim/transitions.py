@@ -0,0 +1,221 @@
+import numpy as np
+from collections.abc import Mapping
+from healthcare_sim.population import Population
+
+"""
+Compiled, integer-coded transition tables.
+
+generate_transition_matrix builds the transition structure as nested dicts of action names
+({'P0': {'a0': ['a3', ...]}}). A TransitionTable holds the same structure in CSR form: pathways and actions are
+coded as integers, and the successors of action a on pathway p are indices[indptr[k]:indptr[k + 1]] with
+k = p * num_actions + a. Next actions for any number of (pathway, current action) pairs can then be sampled in one
+vectorized call (see TransitionTable.sample and sample_next_actions).
+
+A TransitionTable is also a read-only Mapping with the old nested-dict interface (table['P0']['a0'] is a list of
+action names), so code that reads the dict form, such as vis_net and vis_change, works on it unchanged.
+"""
+
+
+class TransitionTable(Mapping):
+    """
+    Transition structure as CSR adjacency arrays, with a nested-dict view.
+
+    Attributes:
+        pathway_names (list): Pathway codes, indexed by their integer code.
+        action_names (list): Action names, indexed by their integer code.
+        pathway_index (dict): Pathway code -> integer code.
+        action_index (dict): Action name -> integer code.
+        indptr (np.ndarray): Offsets into `indices`, one slice per (pathway, action), of length P * A + 1.
+        indices (np.ndarray): Successor action codes.
+        counts (np.ndarray): P x A matrix of the number of successors of each (pathway, action).
+    """
+
+    def __init__(self, pathway_names, action_names, indptr, indices, keys=None):
+        self.pathway_names = list(pathway_names)
+        self.action_names = list(action_names)
+        self.pathway_index = {name: j for j, name in enumerate(self.pathway_names)}
+        self.action_index = {name: a for a, name in enumerate(self.action_names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.counts = np.diff(self.indptr).reshape(len(self.pathway_names), len(self.action_names))
+        self._keys = keys or {}  # Pathway -> actions present in the dict form, if not all of them
+        self._views = {}
+
+    @classmethod
+    def from_dict(cls, transition_matrix, action_names=None):
+        """
+        Compiles a nested-dict transition matrix.
+
+        Args:
+            transition_matrix (dict): Pathway code -> action name -> list of next action names.
+            action_names (list, optional): Action names in code order. Defaults to the actions in the order they
+                first appear in the matrix.
+        """
+        pathway_names = list(transition_matrix.keys())
+        if action_names is None:
+            action_names = []
+            for transitions in transition_matrix.values():
+                for action, next_actions in transitions.items():
+                    for name in [action, *next_actions]:
+                        if name not in action_names:
+                            action_names.append(name)
+        action_index = {name: a for a, name in enumerate(action_names)}
+        indptr = [0]
+        indices = []
+        for pathway in pathway_names:
+            transitions = transition_matrix[pathway]
+            for action in action_names:
+                indices.extend(action_index[name] for name in transitions.get(action, []))
+                indptr.append(len(indices))
+        keys = {pathway: list(transition_matrix[pathway].keys()) for pathway in pathway_names}
+        return cls(pathway_names, action_names, indptr, indices, keys)
+
+    @classmethod
+    def random(cls, pathway_names, action_names, input_actions, output_actions, rng):
+        """
+        Draws random transitions with the same rules as generate_transition_matrix, straight into CSR form:
+        output actions have no successors; input actions get 1 to A successors drawn from all actions; other
+        actions get 1 to A - len(input_actions) successors drawn from the non-input actions. Each pathway's subsets
+        are drawn together by ranking one A x A block of uniforms.
+        """
+        output_actions = [output_actions] if isinstance(output_actions, str) else list(output_actions)
+        num_actions = len(action_names)
+        is_input = np.isin(action_names, input_actions)
+        is_output = np.isin(action_names, output_actions)
+        max_successors = np.where(is_input, num_actions, num_actions - is_input.sum())
+        counts = []
+        indices = []
+        for _ in pathway_names:
+            n = np.where(is_output, 0, rng.integers(1, max_successors, endpoint=True))
+            keys = rng.random((num_actions, num_actions))
+            keys[np.ix_(~is_input, is_input)] = 2.0  # Input actions are never chosen as successors of other actions
+            order = np.argsort(keys, axis=1)
+            chosen = np.arange(num_actions) < n[:, None]
+            indices.append(order[chosen])
+            counts.append(n)
+        indptr = np.concatenate([[0], np.cumsum(np.concatenate(counts))]) if counts else np.zeros(1, dtype=np.int64)
+        indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        return cls(pathway_names, action_names, indptr, indices)
+
+    # --- Integer-coded access ---
+    def successors(self, pathway_code, action_code):
+        """
+        Returns the successor action codes of an action on a pathway (a view into `indices`).
+        """
+        k = pathway_code * len(self.action_names) + action_code
+        return self.indices[self.indptr[k]:self.indptr[k + 1]]
+
+    def sample(self, pathway_codes, action_codes, u):
+        """
+        Picks one successor uniformly at random for each (pathway, action) pair, in one vectorized call.
+
+        Args:
+            pathway_codes (array-like): Pathway code of each pair.
+            action_codes (array-like): Current action code of each pair.
+            u (array-like): One uniform [0, 1) value per pair.
+
+        Returns:
+            np.ndarray: The chosen successor code of each pair, or -1 where the action has no successors.
+        """
+        k = np.asarray(pathway_codes, dtype=np.int64) * len(self.action_names) + np.asarray(action_codes, dtype=np.int64)
+        start = self.indptr[k]
+        n = self.indptr[k + 1] - start
+        if not len(self.indices):
+            return np.full(len(k), -1, dtype=np.int64)
+        pick = np.minimum(start + (np.asarray(u) * n).astype(np.int64), len(self.indices) - 1)
+        return np.where(n > 0, self.indices[pick], -1)
+
+    # --- Nested-dict view ---
+    def __getitem__(self, pathway):
+        view = self._views.get(pathway)
+        if view is None:
+            j = self.pathway_index[pathway]
+            keys = self._keys.get(pathway, self.action_names)
+            view = self._views[pathway] = {
+                action: [self.action_names[b] for b in self.successors(j, self.action_index[action])]
+                for action in keys
+            }
+        return view
+
+    def __iter__(self):
+        return iter(self.pathway_names)
+
+    def __len__(self):
+        return len(self.pathway_names)
+
+    def to_dict(self):
+        """
+        Returns the transition structure as a plain nested dict, as generate_transition_matrix built it.
+        """
+        return {pathway: {action: list(next_actions) for action, next_actions in self[pathway].items()} for pathway in self}
+
+
+def active_pairs(table, patients, pathways):
+    """
+    Returns the (patient, pathway) pairs active at the start of a step, in the order the step loop visits them
+    (patients in order, then pathways in order).
+
+    A pair's disease flag and current action only change when the step loop reaches that pair, so the pairs
+    active at the start of a step are exactly those that will call next_action, and their current actions are known.
+    For a Population the pairs are read straight from its disease and current-action matrices.
+
+    Args:
+        table (TransitionTable): The compiled transitions, whose codes are used.
+        patients (list or Population): The cohort.
+        pathways (list): The pathways, in loop order.
+
+    Returns:
+        tuple: Arrays of the patient position, pathway code and current action code of each active pair.
+    """
+    if isinstance(patients, Population):
+        return _population_pairs(table, patients, pathways)
+    positions = []
+    pathway_codes = []
+    action_codes = []
+    codes = [(pw.name, table.pathway_index[pw.name]) for pw in pathways]
+    action_index = table.action_index
+    for i, p in enumerate(patients):
+        has_disease = p.has_disease
+        current = p.pathway_actions
+        for name, code in codes:
+            if has_disease(name):
+                positions.append(i)
+                pathway_codes.append(code)
+                action_codes.append(action_index[current[name][0]])
+    return (np.array(positions, dtype=np.int64), np.array(pathway_codes, dtype=np.int64),
+            np.array(action_codes, dtype=np.int64))
+
+
+def _population_pairs(table, pop, pathways):
+    """
+    active_pairs for a Population, without visiting the patients one by one.
+    """
+    columns = np.array([pop.pathway_index[pw.name] for pw in pathways], dtype=np.int64)
+    positions, k = np.nonzero(pop.diseases[:, columns])  # Row-major, so patients in order, then pathways in order
+    pathway_codes = np.array([table.pathway_index[pw.name] for pw in pathways], dtype=np.int64)[k]
+    to_table = np.array([table.action_index[name] for name in pop.action_names], dtype=np.int64)
+    current = pop.current_action[positions, columns[k]]
+    if (current < 0).any():
+        i = positions[np.argmax(current < 0)]
+        raise KeyError(f"Patient {i} has a disease on a pathway with no current action")
+    return positions.astype(np.int64), pathway_codes, to_table[current]
+
+
+def sample_next_actions(table, patients, pathways, rng):
+    """
+    Batched next-action sampler: picks the next action of every active (patient, pathway) pair in one NumPy call.
+
+    Args:
+        table (TransitionTable): The compiled transitions.
+        patients (list or Population): The cohort.
+        pathways (list): The pathways, in loop order.
+        rng (np.random.Generator): Source of the uniforms, one per active pair.
+
+    Returns:
+        list: The next action name (or None) of each active pair, in the order the step loop visits them
+            (see active_pairs).
+    """
+    _, pathway_codes, action_codes = active_pairs(table, patients, pathways)
+    chosen = table.sample(pathway_codes, action_codes, rng.random(len(pathway_codes)))
+    names = table.action_names
+    return [names[b] if b >= 0 else None for b in chosen.tolist()]
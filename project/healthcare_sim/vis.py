@@ -1,3 +1,4 @@
+import os
 import numpy as np
 import pandas as pd
 import random
@@ -8,7 +9,7 @@ import seaborn as sns
 import plotly.graph_objects as go
 
         
-def vis_heatmaps(actions_major, first_major_step, last_major_step):
+def vis_heatmaps(actions_major, first_major_step, last_major_step, output_dir="outputs"):
     heatmap_data_first = np.array([act.schedule for act in actions_major[first_major_step].values()])
     heatmap_data_last = np.array([act.schedule for act in actions_major[last_major_step].values()])
 
@@ -41,10 +42,10 @@ def vis_heatmaps(actions_major, first_major_step, last_major_step):
     axes[1].set_ylabel("")
 
     plt.tight_layout()
-    plt.savefig("outputs/heatmap.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "heatmap.png"), dpi=300, bbox_inches='tight') 
     plt.close()   
     
-def vis_penalty(patients):
+def vis_penalty(patients, output_dir="outputs"):
     # Subplot 1: Queue Penalty
     plt.subplot(1, 2, 1)
     sns.histplot([p.outcomes['queue_penalty'] for p in patients], kde=True, color='blue')
@@ -60,10 +61,10 @@ def vis_penalty(patients):
     plt.ylabel("Frequency")
 
     plt.tight_layout()
-    plt.savefig("outputs/penalty.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "penalty.png"), dpi=300, bbox_inches='tight') 
     plt.close() 
     
-def vis_activity(actions_major, first_major_step, last_major_step):
+def vis_activity(actions_major, first_major_step, last_major_step, output_dir="outputs"):
 
     actions_first = actions_major[first_major_step]
     actions_last = actions_major[last_major_step]
@@ -88,10 +89,10 @@ def vis_activity(actions_major, first_major_step, last_major_step):
     plt.legend()
 
     plt.grid(True)
-    plt.savefig("outputs/activity.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "activity.png"), dpi=300, bbox_inches='tight') 
     plt.close() 
     
-def vis_learning(system_cost_major, first_major_step, last_major_step):
+def vis_learning(system_cost_major, first_major_step, last_major_step, output_dir="outputs"):
     plt.figure(figsize=(10, 6))
     plt.plot(
         list(system_cost_major[first_major_step].keys()),
@@ -113,10 +114,10 @@ def vis_learning(system_cost_major, first_major_step, last_major_step):
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig("outputs/learning.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "learning.png"), dpi=300, bbox_inches='tight') 
     plt.close()    
     
-def vis_change(transition_matrix, actions_major, first_major_step, last_major_step):
+def vis_change(transition_matrix, actions_major, first_major_step, last_major_step, output_dir="outputs"):
     # Show action usage vs cost for the selected pathway for both first and last major_step on the same figure,
     # with an arrow from first to last (green if usage increased, red if decreased)
 
@@ -166,82 +167,91 @@ def vis_change(transition_matrix, actions_major, first_major_step, last_major_st
     plt.grid(True)
     plt.legend()
     plt.tight_layout()
-    plt.savefig("outputs/change.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "change.png"), dpi=300, bbox_inches='tight') 
     plt.close() 
     
-def vis_sankey(activity_log, ):
-    # Display activity_log as a DataFrame (tabular form)
-    activity_df = pd.DataFrame(activity_log)
-    # filter to one example patient for clarity
-    example_patient_df = activity_df[activity_df['patient_id'] == 3]
-    example_patient_pathway_df = example_patient_df[example_patient_df['pathway_code'] == 'P6']
-    #example_patient_df = activity_df
-
-    display(example_patient_pathway_df.head(20))  
-
-    timesteps = sorted(example_patient_df['simulation_time'].unique())
-    all_pathways = sorted(example_patient_df['pathway_code'].unique())
-
-    # Build a DataFrame: index=timesteps, columns=pathways, value=1 if patient is on that pathway at that time
-    presence_matrix = pd.DataFrame(0, index=timesteps, columns=all_pathways)
-    for t in timesteps:
-        active_pathways = example_patient_df[example_patient_df['simulation_time'] == t]['pathway_code'].unique()
-        for pw in active_pathways:
-            presence_matrix.loc[t, pw] = 1
+def _as_list(selection):
+    if selection is None:
+        return None
+    if isinstance(selection, (str, int, np.integer)):
+        return [selection]
+    return list(selection)
+
+
+def vis_sankey(activity_log, patient_ids=3, pathway_codes='P6', input_actions=('a0', 'a1'), output_action='a9', output_dir="outputs"):
+    """
+    Draws which pathways the selected patients are on over time (path.png) and the flow between actions on the
+    selected pathways (sankey.png). Both are aggregated with groupby, so whole-cohort logs of millions of rows are fine.
+
+    Args:
+        activity_log (ActivityLog or list): The activity log of one major step.
+        patient_ids (int or list, optional): Patients to include (None for the whole cohort). Defaults to patient 3.
+        pathway_codes (str or list, optional): Pathways shown in the Sankey diagram (None for all). Defaults to P6.
+        input_actions (tuple): Actions placed on the left of the Sankey diagram.
+        output_action (str): Action placed on the right, whose transitions are marked red on the presence heatmap.
+        output_dir (str): Directory the figures are written to.
+    """
+    if hasattr(activity_log, 'to_pandas'):
+        activity_df = activity_log.to_pandas()
+    else:
+        activity_df = pd.DataFrame(activity_log)
+    patient_ids = _as_list(patient_ids)
+    pathway_codes = _as_list(pathway_codes)
+    if patient_ids is not None:
+        activity_df = activity_df[activity_df['patient_id'].isin(patient_ids)]
+    pathway_df = activity_df if pathway_codes is None else activity_df[activity_df['pathway_code'].isin(pathway_codes)]
+
+    display(pathway_df.head(20))
+
+    # Presence: number of selected patients on each pathway at each time (0 or 1 for a single patient)
+    visits = activity_df[['pathway_code', 'simulation_time', 'patient_id']].drop_duplicates()
+    presence_matrix = pd.crosstab(visits['pathway_code'], visits['simulation_time'])
+    presence_matrix = presence_matrix[presence_matrix.sum(axis=1) > 0]
+    presence_matrix.index = presence_matrix.index.astype(str)
+    presence_matrix = presence_matrix.sort_index()
+    all_pathways = list(presence_matrix.index)
+
+    if patient_ids is None:
+        who = "All Patients"
+    elif len(patient_ids) == 1:
+        who = f"Patient {patient_ids[0]}"
+    else:
+        who = f"{len(patient_ids)} Patients"
 
     plt.figure(figsize=(12, 4))
-    ax = sns.heatmap(presence_matrix.T, cmap="Greens", cbar=False, linewidths=0.5, linecolor='gray')
+    ax = sns.heatmap(presence_matrix, cmap="Greens", cbar=presence_matrix.values.max(initial=0) > 1, linewidths=0.5, linecolor='gray')
 
-    # Overlay red squares where the next action is 'a9' for patient 3
-    for idx, row in example_patient_df.iterrows():
-        if row['next_action'] == 'a9':
-            # simulation_time is x, pathway_code is y
-            x = row['simulation_time'] - 1  # adjust for zero-based index in heatmap
-            y = all_pathways.index(row['pathway_code'])
-            ax.add_patch(plt.Rectangle((x, y), 1, 1, fill=True, color='red', alpha=0.5, lw=0))
+    # Overlay red squares where any selected patient's next action is the output action
+    exits = activity_df.loc[activity_df['next_action'] == output_action, ['simulation_time', 'pathway_code']].drop_duplicates()
+    xs = presence_matrix.columns.get_indexer(exits['simulation_time'])
+    ys = presence_matrix.index.get_indexer(exits['pathway_code'].astype(str))
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        ax.add_patch(plt.Rectangle((x, y), 1, 1, fill=True, color='red', alpha=0.5, lw=0))
 
-    plt.title(f"Pathway Presence Over Time for Patient 3 (Red = next action 'a9')")
+    plt.title(f"Pathway Presence Over Time for {who} (Red = next action '{output_action}')")
     plt.xlabel("Simulation Time")
     plt.ylabel("Pathway")
     plt.yticks(ticks=np.arange(len(all_pathways)) + 0.5, labels=all_pathways, rotation=0)
-    plt.savefig("outputs/path.png", dpi=300, bbox_inches='tight') 
-    plt.close() 
-
-    # Prepare data for Sankey diagram
-    filtered_df = example_patient_pathway_df.dropna(subset=['action_name','next_action'])
-    sources = filtered_df['action_name']
-    targets = filtered_df['next_action']
-    labels = list(pd.unique(pd.concat([sources, targets])))
-
-    # Cut the 'a9' output action from the Sankey diagram
-    mask = sources != 'a9'
-    filtered_sources = sources[mask]
-    filtered_targets = targets[mask]
-
-    values = [1] * len(filtered_df)  # Each transition counts as 1
-
-    left_nodes = ['a0', 'a1']
-    right_nodes = ['a9']
-    middle_nodes = [l for l in labels if l not in left_nodes + right_nodes]
+    plt.savefig(os.path.join(output_dir, "path.png"), dpi=300, bbox_inches='tight')
+    plt.close()
+
+    # Sankey: transitions counted per (action, next action) pair, excluding those out of the output action
+    flows = pathway_df.loc[pathway_df['action_name'] != output_action, ['action_name', 'next_action']]
+    counts = flows.groupby(['action_name', 'next_action'], observed=True).size()
+    counts = counts[counts > 0]
+    sources = counts.index.get_level_values('action_name').astype(str)
+    targets = counts.index.get_level_values('next_action').astype(str)
+
+    labels = list(pd.unique(np.concatenate([sources.to_numpy(), targets.to_numpy()])))
+    left_nodes = [l for l in input_actions if l in labels]
+    right_nodes = [output_action] if output_action in labels else []
+    middle_nodes = sorted((l for l in labels if l not in left_nodes + right_nodes), key=lambda l: (len(l), l))
     ordered_labels = left_nodes + middle_nodes + right_nodes
-
-    # Remap indices for sources and targets
     label_indices_ordered = {label: idx for idx, label in enumerate(ordered_labels)}
-    source_indices_ordered = filtered_sources.map(label_indices_ordered)
-    target_indices_ordered = filtered_targets.map(label_indices_ordered)
-
-    # Set x positions: 0 for left, 1 for right, 0.5 for middle
-    x_positions = [i / (len(ordered_labels) - 1) for i in range(len(ordered_labels))]
-    for label in ordered_labels:
-        if label in left_nodes:
-            x_positions.append(0.0)
-        elif label in right_nodes:
-            x_positions.append(1.0)
-        else:
-            x_positions.append(0.5)
-
-    # Optional: set y positions to spread nodes vertically
-    y_positions = [i / (len(ordered_labels) - 1) for i in range(len(ordered_labels))]
+
+    # x: inputs on the left, the output on the right, everything else in the middle; y spreads the nodes vertically
+    x_positions = [0.01 if l in left_nodes else 0.99 if l in right_nodes else 0.5 for l in ordered_labels]
+    y_positions = [(i + 1) / (len(ordered_labels) + 1) for i in range(len(ordered_labels))]
 
     fig = go.Figure(data=[go.Sankey(
         node=dict(
@@ -253,15 +263,15 @@ def vis_sankey(activity_log, ):
             y=y_positions,
         ),
         link=dict(
-            source=source_indices_ordered,
-            target=target_indices_ordered,
-            value=values,
+            source=[label_indices_ordered[l] for l in sources],
+            target=[label_indices_ordered[l] for l in targets],
+            value=counts.to_numpy().tolist(),
         ))])
 
-    fig.update_layout(title_text="Patient Action Flow (Sankey Diagram)", font_size=10)
-    fig.write_image("outputs/sankey.png", scale=2) 
+    fig.update_layout(title_text=f"Patient Action Flow for {who} (Sankey Diagram)", font_size=10)
+    fig.write_image(os.path.join(output_dir, "sankey.png"), scale=2)
     
-def vis_net(transition_matrix):
+def vis_net(transition_matrix, output_dir="outputs"):
     # Visualize a single pathway as a set of action transitions using a directed graph
     plt.figure(figsize=(12, 8))
     G_transitions_single = nx.DiGraph()
@@ -283,6 +293,6 @@ def vis_net(transition_matrix):
     nx.draw_networkx_edge_labels(G_transitions_single, pos, edge_labels=edge_labels, font_size=8)
 
     plt.title(f"Pathway {selected_pathway} as Action Transitions")
-    plt.savefig("outputs/net.png", dpi=300, bbox_inches='tight') 
+    plt.savefig(os.path.join(output_dir, "net.png"), dpi=300, bbox_inches='tight') 
     plt.close() 
     
\ No newline at end of file
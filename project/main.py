@@ -4,8 +4,12 @@ It includes components for patient management, action execution, and visualizati
 '''
 
 #Step 1: imports
+# Figures are rendered by healthcare_sim.render in worker processes, so run_headless never loads the plotting stack
+import csv
+import json
+import os
+import sys
 import numpy as np
-import random
 from healthcare_sim import (
     Patient,
     Pathway,
@@ -14,17 +18,10 @@ from healthcare_sim import (
     config,
     initialize_patients,
     initialize_simulation,
-    vis_heatmaps,
-    vis_penalty,
-    vis_activity,
-    vis_learning,
-    vis_change,
-    vis_sankey,
-    vis_net,
+    QPolicy,
 )
-
-#np.random.seed(0)
-#random.seed(0)
+from healthcare_sim.replicate import summarise_run
+from healthcare_sim.render import simulation_figures, render_figures
 
 NUM_PATIENTS = config.NUM_PATIENTS
 NUM_PATHWAYS = config.NUM_PATHWAYS
@@ -36,11 +33,15 @@ PROBABILITY_OF_DISEASE = config.PROBABILITY_OF_DISEASE
 IDEAL_CLINICAL_VALUES = config.IDEAL_CLINICAL_VALUES
 INPUT_ACTIONS = config.INPUT_ACTIONS
 OUTPUT_ACTIONS = config.OUTPUT_ACTIONS
+SEED = config.SEED
+NUM_EPISODES = config.NUM_EPISODES
+
+def build_simulation(use_policy=False): 
+    rng = np.random.default_rng(SEED)
 
-def build_simulation(): 
     # Step 2: call patient, action and pathway classes to create instances
-    actions, pathways, transition_matrix = initialize_simulation(Action, Pathway, NUM_PATIENTS, NUM_PATHWAYS, NUM_ACTIONS, BASE_CAPACITY, IDEAL_CLINICAL_VALUES, PROBABILITY_OF_DISEASE, INPUT_ACTIONS, OUTPUT_ACTIONS)
-    patients = initialize_patients(Patient, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS)
+    actions, pathways, transition_matrix = initialize_simulation(Action, Pathway, NUM_PATIENTS, NUM_PATHWAYS, NUM_ACTIONS, BASE_CAPACITY, IDEAL_CLINICAL_VALUES, PROBABILITY_OF_DISEASE, INPUT_ACTIONS, OUTPUT_ACTIONS, rng)
+    patients = initialize_patients(Patient, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS, rng)
     
     print(NUM_PATIENTS, "patients created.")
     for i, patient in enumerate(patients[:3]):
@@ -64,26 +65,21 @@ def build_simulation():
         print(f"  Cost: {action_obj.cost}")
         print(f"  Duration: {action_obj.duration}")
         print()
-        
-    vis_net(transition_matrix)
-    
+
     # Step 4: run the simulation
     print("Starting simulation...")
+    # With use_policy, Q-learning over the shared transition table (one episode per major step) replaces uniform sampling
+    policy = QPolicy(pathways[0].transitions) if use_policy else None
     actions_major, pathways_major, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history = run_simulation(
         Patient, patients, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, PROBABILITY_OF_DISEASE,
-        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES
+        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES, rng, policy=policy, NUM_EPISODES=NUM_EPISODES
     )
     
-    # Step 5: Visualisae results
-    first_major_step = min(actions_major.keys())
+    # Step 5: Visualisae results (rendered in parallel; figures whose data is unchanged since the last run are skipped)
     last_major_step = max(actions_major.keys())
-
-    vis_heatmaps(actions_major,first_major_step,last_major_step)
-    vis_penalty(patients)
-    vis_activity(actions_major, first_major_step, last_major_step)
-    vis_learning(system_cost_major, first_major_step, last_major_step)
-    vis_change(transition_matrix, actions_major, first_major_step, last_major_step)
-    vis_sankey(activity_log_major[last_major_step])
+    jobs = simulation_figures(actions_major, patients, system_cost_major, transition_matrix, activity_log_major)
+    for name, status in render_figures(jobs).items():
+        print(f"{name}: {status}")
 
     print("Total system cost:", sum(system_cost_major[last_major_step].values()))
     print("Average queue penalty:", np.mean([p.outcomes['queue_penalty'] for p in patients]))
@@ -91,5 +87,60 @@ def build_simulation():
     print("Average wait time:", np.mean([p.queue_time / 30 for p in patients]))
     print("Average clinical variables:", {k: np.mean([p.clinical[k] - IDEAL_CLINICAL_VALUES[k] for p in patients]) for k in IDEAL_CLINICAL_VALUES.keys()})
 
+def run_headless(output_dir="outputs", use_policy=False):
+    """
+    Builds and runs the simulation from config.py without rendering anything, and saves the numeric results.
+
+    Writes to output_dir:
+        - results.json: The headline summary (see replicate.summarise_run), the cumulative system cost at each
+          step of every major step, and the average clinical penalty and queue length sampled during the run.
+        - patients.csv: One row per patient with its id, age, sex, queue time and outcomes.
+
+    Args:
+        output_dir (str): Directory to write to (created if missing).
+        use_policy (bool): Whether next actions are chosen by a QPolicy learning over the major steps, rather than
+            sampled uniformly.
+
+    Returns:
+        dict: The headline summary.
+    """
+    rng = np.random.default_rng(SEED)
+    actions, pathways, transition_matrix = initialize_simulation(Action, Pathway, NUM_PATIENTS, NUM_PATHWAYS, NUM_ACTIONS, BASE_CAPACITY, IDEAL_CLINICAL_VALUES, PROBABILITY_OF_DISEASE, INPUT_ACTIONS, OUTPUT_ACTIONS, rng)
+    patients = initialize_patients(Patient, NUM_PATHWAYS, IDEAL_CLINICAL_VALUES, NUM_PATIENTS, rng)
+    policy = QPolicy(pathways[0].transitions) if use_policy else None
+    _, _, system_cost_major, _, clinical_penalty_history, queue_length_history = run_simulation(
+        Patient, patients, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, PROBABILITY_OF_DISEASE,
+        NUM_PATHWAYS, NUM_STEPS, IDEAL_CLINICAL_VALUES, rng, policy=policy, NUM_EPISODES=NUM_EPISODES
+    )
+    summary = summarise_run(patients, system_cost_major, NUM_STEPS)
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = {
+        'seed': SEED,
+        'summary': summary,
+        'system_cost_major': {str(m): {str(step): float(cost) for step, cost in costs.items()} for m, costs in system_cost_major.items()},
+        'clinical_penalty_history': [float(v) for v in clinical_penalty_history],
+        'queue_length_history': [float(v) for v in queue_length_history],
+    }
+    with open(os.path.join(output_dir, "results.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    outcome_keys = list(patients[0].outcomes) if len(patients) else []
+    with open(os.path.join(output_dir, "patients.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(['pid', 'age', 'sex', 'queue_time'] + outcome_keys)
+        for p in patients:
+            writer.writerow([p.pid, p.age, p.sex, p.queue_time] + [p.outcomes[k] for k in outcome_keys])
+
+    for metric, value in summary.items():
+        print(f"{metric}: {value}")
+    return summary
+
 if __name__ == "__main__":
-    build_simulation()
\ No newline at end of file
+    # `python main.py --headless` runs without any plotting and only writes numeric results;
+    # `--policy` trains a QPolicy over the major steps instead of sampling next actions uniformly
+    use_policy = "--policy" in sys.argv[1:]
+    if "--headless" in sys.argv[1:]:
+        run_headless(use_policy=use_policy)
+    else:
+        build_simulation(use_policy=use_policy)
@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from healthcare_sim import Action, Pathway, Patient, Population, config, initialize_patients, initialize_population, initialize_simulation
+
+"""
+Shared setup for the tests: small simulations built from config.py's parameters and a fixed seed.
+"""
+
+NUM_PATIENTS = 200
+NUM_STEPS = 30
+
+
+def build(seed=0, population=False, NUM_PATIENTS=NUM_PATIENTS):
+    """
+    Returns (rng, actions, pathways, patients) for a small simulation, the same for the same seed.
+    """
+    rng = np.random.default_rng(seed)
+    actions, pathways, _ = initialize_simulation(
+        Action, Pathway, NUM_PATIENTS, config.NUM_PATHWAYS, config.NUM_ACTIONS, config.BASE_CAPACITY,
+        config.IDEAL_CLINICAL_VALUES, config.PROBABILITY_OF_DISEASE, config.INPUT_ACTIONS, config.OUTPUT_ACTIONS, rng
+    )
+    if population:
+        patients = initialize_population(Population, config.NUM_PATHWAYS, config.IDEAL_CLINICAL_VALUES, NUM_PATIENTS, rng)
+    else:
+        patients = initialize_patients(Patient, config.NUM_PATHWAYS, config.IDEAL_CLINICAL_VALUES, NUM_PATIENTS, rng)
+    return rng, actions, pathways, patients
+
+
+def run_args(NUM_STEPS=NUM_STEPS):
+    """
+    Returns the positional arguments of run_simulation after patients, pathways and actions.
+    """
+    return (config.OUTPUT_ACTIONS, config.INPUT_ACTIONS, config.PROBABILITY_OF_DISEASE, config.NUM_PATHWAYS, NUM_STEPS,
+            config.IDEAL_CLINICAL_VALUES)
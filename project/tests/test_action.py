@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from conftest import build
+from healthcare_sim import Action, config
+
+
+@pytest.mark.parametrize('duration', [0, 1, 3, 7])
+def test_timing_wheel_matches_countdown(duration):
+    """
+    The timing wheel gives the same finished patients, schedule and in-progress list as counting each in-progress
+    patient's remaining time down every step (how Action.execute worked before the wheel).
+    """
+    rng = np.random.default_rng(duration)
+    _, _, _, patients = build(NUM_PATIENTS=120)
+    act = Action('a', 4, {'bp': 5}, 10, duration)
+    waiting = list(patients)
+    in_progress = []  # (patient, remaining_time), as the countdown kept them
+    for step in range(40):
+        arrivals = waiting[:int(rng.integers(0, 6))]
+        waiting = waiting[len(arrivals):]
+        if arrivals:
+            act.assign_many(arrivals)
+        act.capacity = int(rng.integers(0, 8))
+
+        finished = [p for p, remaining in in_progress if remaining <= 1]
+        in_progress = [(p, remaining - 1) for p, remaining in in_progress if remaining > 1]
+        slots = act.capacity - len(in_progress)
+        # A duration of 0 counted down from 0 and so finished after one step, as a duration of 1 does
+        in_progress += [(entry[3], max(duration, 1)) for entry in sorted(act.queue.entries())[:max(slots, 0)]]
+
+        got, cost = act.execute(config.IDEAL_CLINICAL_VALUES)
+        assert got == finished
+        assert cost == len(finished) * act.cost
+        assert act.schedule[-1] == act.occupancy == len(in_progress)
+        assert sorted(act.in_progress, key=lambda e: (e[1], e[0].pid)) == sorted(in_progress, key=lambda e: (e[1], e[0].pid))
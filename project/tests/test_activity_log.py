@@ -0,0 +1,16 @@
+import pytest
+from healthcare_sim import ActivityLog
+
+
+def test_codes_stop_at_the_int16_limit():
+    log = ActivityLog(chunk_size=4096)
+    for i in range(ActivityLog.MAX_LABELS):
+        log.record('P0', True, 0, 0, None, f'a{i}', None)
+    assert log.to_numpy()['action_name'].max() == ActivityLog.MAX_LABELS - 1
+
+    # One more label would wrap around to a negative code, which reads back as None or as the wrong action
+    with pytest.raises(ValueError, match='extra'):
+        log.record('P0', True, 0, 0, None, 'extra', None)
+    assert len(log) == ActivityLog.MAX_LABELS
+    log.record('P0', True, 1, 1, 'a0', f'a{ActivityLog.MAX_LABELS - 1}', None)
+    assert list(log)[-1]['action_name'] == f'a{ActivityLog.MAX_LABELS - 1}'
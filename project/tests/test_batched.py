@@ -0,0 +1,22 @@
+import pytest
+from conftest import build
+from healthcare_sim import BatchedSimulation, config
+
+
+def _batched(OUTPUT_ACTIONS=config.OUTPUT_ACTIONS, INPUT_ACTIONS=config.INPUT_ACTIONS):
+    rng, actions, pathways, patients = build(NUM_PATIENTS=50)
+    return BatchedSimulation(4, pathways, actions, OUTPUT_ACTIONS, INPUT_ACTIONS, config.PROBABILITY_OF_DISEASE,
+                             config.IDEAL_CLINICAL_VALUES, patients=patients, rng=rng)
+
+
+@pytest.mark.parametrize('actions, missing', [({'OUTPUT_ACTIONS': 'a99'}, 'a99'), ({'INPUT_ACTIONS': ['a0', 'b1']}, 'b1')])
+def test_unknown_input_or_output_action_raises(actions, missing):
+    # An unknown output action once became -1, the code of "no next action", so its pairs silently counted as finished
+    with pytest.raises(ValueError, match=missing):
+        _batched(**actions)
+
+
+def test_output_action_is_indexed():
+    env = _batched()
+    assert env.output == env.table.action_index[config.OUTPUT_ACTIONS]
+    assert env.inputs.tolist() == [env.table.action_index[a] for a in config.INPUT_ACTIONS]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import CapacityCalendar, Patient, run_simulation
+from healthcare_sim.capacity import closures, seasonal, weekly
+
+FLAT = [weekly(weekend=1.0, fluctuation=None)]
+
+
+def test_weekly_lookup():
+    _, actions, _, _ = build()
+    calendar = CapacityCalendar.from_profiles(actions, 14, [weekly(weekend=0.7, fluctuation=None)])
+    base = [act.base_capacity for act in actions.values()]
+    for step in range(30):  # Past the calendar's length, where it wraps around
+        expected = [int(b * 0.7) for b in base] if step % 7 in (5, 6) else base
+        assert calendar.at(step) == expected
+
+
+def test_fluctuation_stays_in_range():
+    _, actions, _, _ = build()
+    calendar = CapacityCalendar.from_profiles(actions, 70, rng=np.random.default_rng(0))
+    weekdays = calendar.capacity[:, np.arange(70) % 7 < 5]
+    base = np.array([act.base_capacity for act in actions.values()])[:, None]
+    assert (weekdays >= np.floor(base * 0.8)).all() and (weekdays <= base * 1.2).all()
+    assert len(np.unique(weekdays)) > 1
+
+
+def test_seasonal_and_closures():
+    _, actions, _, _ = build()
+    calendar = CapacityCalendar.from_profiles(actions, 20, FLAT + [seasonal(amplitude=0.5, period=20), closures([(3, 6, ['a1'])])])
+    a1 = list(actions).index('a1')
+    assert calendar.capacity[a1, 3:6].tolist() == [0, 0, 0]
+    assert calendar.capacity[0, 0] == int(actions['a0'].base_capacity * 1.5)
+    assert calendar.capacity[0, 10] == int(actions['a0'].base_capacity * 0.5)
+
+
+def test_apply_sets_each_action():
+    _, actions, _, _ = build()
+    capacity = np.arange(len(actions) * 3).reshape(len(actions), 3)
+    calendar = CapacityCalendar(list(actions), capacity)
+    calendar.apply(list(actions.values()), 4)
+    assert [act.capacity for act in actions.values()] == capacity[:, 1].tolist()
+
+    reordered = calendar.reindex(list(reversed(list(actions))))
+    assert reordered.at(1) == capacity[::-1, 1].tolist()
+    with pytest.raises(ValueError, match='missing'):
+        calendar.reindex(list(actions) + ['missing'])
+
+
+def test_csv_round_trip(tmp_path):
+    _, actions, _, _ = build()
+    calendar = CapacityCalendar.from_profiles(actions, 10, rng=np.random.default_rng(0))
+    calendar.to_csv(tmp_path / 'rota.csv')
+    loaded = CapacityCalendar.from_csv(tmp_path / 'rota.csv')
+    assert loaded.action_names == calendar.action_names
+    assert np.array_equal(loaded.capacity, calendar.capacity)
+
+    (tmp_path / 'bad.csv').write_text("day,a0\n0,1\n")
+    with pytest.raises(ValueError, match='step'):
+        CapacityCalendar.from_csv(tmp_path / 'bad.csv')
+
+
+def test_run_follows_calendar():
+    def run(profiles):
+        rng, actions, pathways, patients = build()
+        calendar = CapacityCalendar.from_profiles(actions, run_args()[4], profiles) if profiles else None
+        actions_major = run_simulation(Patient, patients, pathways, actions, *run_args(), rng, capacity=calendar)[0]
+        return actions_major[1].schedule
+
+    flat = run(FLAT)
+    closed = run(FLAT + [closures([(10, 20, ['a0', 'a1'])])])
+    # With the input actions closed nobody is admitted to them, so they empty out
+    assert (closed[:2, 12:20] <= flat[:2, 12:20]).all()
+    assert not closed[:2, 12:20].any()
+    assert not np.array_equal(closed, flat)
+    assert not np.array_equal(flat, run(None))
@@ -0,0 +1,100 @@
+import glob
+import os
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Action, ActivityLog, ChunkedFileSink, Checkpoint, Pathway, Patient, config, run_simulation
+
+
+def _outputs(result, patients):
+    actions_major, _, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history = result
+    return (
+        {m: snapshot.schedule.tolist() for m, snapshot in actions_major.items()},
+        system_cost_major,
+        {m: (log.to_numpy().tolist(), log.pathway_labels, log.action_labels) for m, log in activity_log_major.items()},
+        clinical_penalty_history,
+        queue_length_history,
+        [type(value) for value in clinical_penalty_history + queue_length_history],  # Equal values can still differ in type
+        [(dict(p.clinical), p.queue_time, dict(p.outcomes), list(p.history), dict(p.pathway_actions)) for p in patients],
+    )
+
+
+@pytest.mark.parametrize('population', [False, True])
+def test_resume_matches_uninterrupted_run(tmp_path, population):
+    rng, actions, pathways, patients = build(population=population)
+    reference = _outputs(run_simulation(Patient, patients, pathways, actions, *run_args(), rng,
+                                        checkpoint_every=10, checkpoint_dir=tmp_path), patients)
+
+    paths = sorted(glob.glob(os.path.join(tmp_path, 'checkpoint_*.npz')))
+    assert len(paths) == config.NUM_EPISODES * 3
+    for path in paths:
+        checkpoint = Checkpoint.load(path, Patient, Action, Pathway, config.IDEAL_CLINICAL_VALUES)
+        result = run_simulation(Patient, checkpoint.patients, checkpoint.pathways, checkpoint.actions, *run_args(),
+                                checkpoint.rng, resume=checkpoint)
+        assert _outputs(result, checkpoint.patients) == reference, path
+
+
+class _CrashingSink(ChunkedFileSink):
+    """
+    A ChunkedFileSink that stops the run after a number of steps, as an interruption would.
+    """
+
+    def __init__(self, directory, crash_after, **kwargs):
+        super().__init__(directory, **kwargs)
+        self.crash_after = crash_after
+
+    def write_step(self, record, activity_log):
+        if self.crash_after == 0:
+            raise KeyboardInterrupt
+        self.crash_after -= 1
+        super().write_step(record, activity_log)
+
+
+def _streamed(directory):
+    """
+    Returns the step records and activity log rows of every chunk in a sink directory, with the chunk file names.
+    """
+    names = sorted(os.listdir(directory))
+    steps = [np.load(os.path.join(directory, name)) for name in names if name.startswith('steps_')]
+    columns = {key: np.concatenate([chunk[key] for chunk in steps]).tolist() for key in ('major_step', 'step', 'step_cost', 'schedule')}
+    log = ActivityLog.load([os.path.join(directory, name) for name in names if name.startswith('activity_')])
+    return names, columns, log.to_pandas().to_dict('list')
+
+
+def test_streaming_resume_does_not_overwrite_chunks(tmp_path):
+    rng, actions, pathways, patients = build()
+    run_simulation(Patient, patients, pathways, actions, *run_args(), rng,
+                   sink=ChunkedFileSink(tmp_path / 'reference', flush_every=7),
+                   checkpoint_every=10, checkpoint_dir=tmp_path / 'reference_checkpoints')
+
+    # Stop the run part way through its second major step, then resume from its latest checkpoint into the same directory
+    rng, actions, pathways, patients = build()
+    with pytest.raises(KeyboardInterrupt):
+        run_simulation(Patient, patients, pathways, actions, *run_args(), rng,
+                       sink=_CrashingSink(tmp_path / 'resumed', 45, flush_every=7),
+                       checkpoint_every=10, checkpoint_dir=tmp_path / 'checkpoints')
+    path = sorted(glob.glob(os.path.join(tmp_path, 'checkpoints', 'checkpoint_*.npz')))[-1]
+    checkpoint = Checkpoint.load(path, Patient, Action, Pathway, config.IDEAL_CLINICAL_VALUES)
+    assert (checkpoint.major_step, checkpoint.step) == (1, 10)
+    run_simulation(Patient, checkpoint.patients, checkpoint.pathways, checkpoint.actions, *run_args(), checkpoint.rng,
+                   sink=ChunkedFileSink(tmp_path / 'resumed', flush_every=7), resume=checkpoint,
+                   checkpoint_every=10, checkpoint_dir=tmp_path / 'checkpoints')
+
+    names, columns, log = _streamed(tmp_path / 'resumed')
+    assert len(columns['step']) == config.NUM_EPISODES * run_args()[4]
+    assert _streamed(tmp_path / 'reference') == (names, columns, log)
+
+
+def test_action_codes_beyond_int16(tmp_path):
+    rng, _, pathways, patients = build(NUM_PATIENTS=3)
+    actions = {f'a{i}': Action(f'a{i}', 1, {}, 1, 1) for i in range(40000)}
+    patient, pathway = patients[0], pathways[0].name
+    patient.history = [('a39999', pathway)]
+    patient.pathway_actions = {pathway: ('a39999', 'a32768')}
+    actions['a39999'].assign(patient)
+    Checkpoint(patients, actions, pathways, rng, {}, 0, 0, 0.0, 0, {}, ActivityLog(), [], [], {}, {}, {}).save(tmp_path / 'c.npz')
+
+    restored = Checkpoint.load(tmp_path / 'c.npz', Patient, Action, Pathway, config.IDEAL_CLINICAL_VALUES).patients[0]
+    assert restored.history == [('a39999', pathway)]
+    assert restored.pathway_actions == {pathway: ('a39999', 'a32768')}
+    assert [(action.name, entry_id) for action, entry_id in restored.queue_entries] == [('a39999', 0)]
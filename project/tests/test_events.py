@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Patient, run_event_simulation, run_simulation
+from healthcare_sim.events import _next_onset
+
+
+def _outputs(result):
+    actions_major, _, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history = result
+    return (
+        {m: snapshot.schedule.tolist() for m, snapshot in actions_major.items()},
+        system_cost_major,
+        {m: list(log) for m, log in activity_log_major.items()},
+        clinical_penalty_history,
+        queue_length_history,
+    )
+
+
+def _run(engine, seed=0, population=False, PROBABILITY_OF_DISEASE=None, NUM_EPISODES=2):
+    rng, actions, pathways, patients = build(seed, population)
+    args = list(run_args())
+    if PROBABILITY_OF_DISEASE is not None:
+        args[2] = PROBABILITY_OF_DISEASE
+    return _outputs(engine(Patient, patients, pathways, actions, *args, rng, NUM_EPISODES=NUM_EPISODES))
+
+
+def test_same_seed_same_results():
+    first = _run(run_event_simulation)
+    assert _run(run_event_simulation) == first
+    assert _run(run_event_simulation, seed=1) != first
+
+
+def test_population_matches_patient_objects():
+    assert _run(run_event_simulation, population=True) == _run(run_event_simulation)
+
+
+def test_no_onsets_matches_fixed_step_loop():
+    # With no disease every step is skipped, so this checks the carried-forward histories and costs
+    events = _run(run_event_simulation, PROBABILITY_OF_DISEASE=0.0)
+    assert events == _run(run_simulation, PROBABILITY_OF_DISEASE=0.0)
+    assert len(events[3]) == 2 * run_args()[4]
+
+
+def test_cost_matches_fixed_step_loop():
+    # The two engines draw their random numbers differently, so they agree in distribution rather than run by run
+    def final_cost(engine):
+        return np.mean([_run(engine, seed, NUM_EPISODES=1)[1][0][run_args()[4] - 1] for seed in range(4)])
+
+    assert final_cost(run_event_simulation) == pytest.approx(final_cost(run_simulation), rel=0.05)
+
+
+@pytest.mark.parametrize('p', [0.02, 0.15, 0.6])
+def test_next_onset_is_geometric(p):
+    rng = np.random.default_rng(0)
+    waits = np.array([_next_onset(10, p, rng) - 10 for _ in range(20000)])
+    assert waits.min() == 0
+    assert waits.mean() == pytest.approx((1 - p) / p, rel=0.05)
+    assert np.mean(waits == 0) == pytest.approx(p, rel=0.1)
+
+
+def test_next_onset_edge_probabilities():
+    rng = np.random.default_rng(0)
+    assert _next_onset(3, 0.0, rng) == float('inf')
+    assert _next_onset(3, 1.0, rng) == 3
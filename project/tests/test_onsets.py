@@ -0,0 +1,63 @@
+import numpy as np
+from conftest import build, run_args
+from healthcare_sim import Pathway, Patient, config, run_simulation
+
+
+def test_onset_counts_follow_probability():
+    rng = np.random.default_rng(0)
+    active = rng.random((20000, 10)) < np.linspace(0, 0.9, 10)  # Each pathway with a different share already active
+    rows, cols, starts = Patient.draw_onsets(active, 0.1, 3, rng)
+    assert not active[rows, cols].any()
+    assert np.array_equal(np.lexsort((cols, rows)), np.arange(len(rows)))  # Patient then pathway order
+
+    inactive = (~active).sum(axis=0)
+    onsets = np.bincount(cols, minlength=active.shape[1])
+    sd = np.sqrt(inactive * 0.1 * 0.9)
+    assert (np.abs(onsets - 0.1 * inactive) < 4 * sd).all()
+    np.testing.assert_allclose(np.bincount(starts, minlength=3) / len(starts), 1 / 3, atol=0.02)
+
+
+def test_start_diseases_sets_flags_and_queues():
+    _, actions, pathways, patients = build(NUM_PATIENTS=20)
+    rows, cols, starts = np.array([0, 0, 5]), np.array([1, 4, 1]), np.array([0, 1, 1])
+    Patient.start_diseases(patients, pathways, rows, cols, starts, actions, config.INPUT_ACTIONS)
+    assert patients[0].history == [(config.INPUT_ACTIONS[0], 'P1'), (config.INPUT_ACTIONS[1], 'P4')]
+    assert patients[0].comorbidities == 2 and patients[5].has_disease('P1')
+    assert sorted(item.pid for _, _, _, item in actions[config.INPUT_ACTIONS[1]].queue.entries()) == [0, 5]
+    assert [(action.name, entry_id) for action, entry_id in patients[5].queue_entries] == [(config.INPUT_ACTIONS[1], 1)]
+
+
+def test_system_state_counts_same_step_onsets(monkeypatch):
+    rng, actions, pathways, patients = build(NUM_PATIENTS=100)
+    calls, steps = [], []
+    next_action, draw_onsets = Pathway.next_action, Patient.draw_onsets
+
+    def record_call(self, patient, actions, major_step, step, activity_log, system_state, *args):
+        next_a = next_action(self, patient, actions, major_step, step, activity_log, system_state, *args)
+        calls.append((patient.pid, self.name, system_state, next_a))
+        return next_a
+
+    def record_onsets(active, *args):
+        drawn = draw_onsets(active, *args)
+        steps.append((len(calls), sum(len(act.queue) for act in actions.values()), active, drawn))
+        return drawn
+
+    monkeypatch.setattr(Pathway, 'next_action', record_call)
+    monkeypatch.setattr(Patient, 'draw_onsets', staticmethod(record_onsets))
+    run_simulation(Patient, patients, pathways, actions, *run_args(NUM_STEPS=15), rng, NUM_EPISODES=1)
+
+    # Replay each step as the serial loop ran it: an onset joined its queue when the loop reached its pair
+    checked = 0
+    for first_call, queued, active, (rows, cols, _) in steps:
+        onset = np.zeros_like(active)
+        onset[rows, cols] = True
+        expected = iter(calls[first_call:])
+        for i, j in zip(*np.nonzero(active | onset)):
+            if active[i, j]:
+                pid, name, system_state, next_a = next(expected)
+                assert (pid, name, system_state) == (patients[i].pid, pathways[j].name, queued)
+                queued += next_a is not None
+                checked += 1
+            else:
+                queued += 1
+    assert checked == len(calls) > 0
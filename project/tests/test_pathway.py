@@ -0,0 +1,28 @@
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Patient, run_simulation
+
+
+def _scan(history, pathway):
+    """
+    The (current, previous) actions on a pathway found by scanning the history backwards, as the index replaced.
+    """
+    found = [action for action, pw in reversed(history) if pw == pathway][:2]
+    return tuple(found + [None] * (2 - len(found))) if found else None
+
+
+@pytest.mark.parametrize('population', [False, True])
+def test_index_agrees_with_history(population):
+    rng, actions, pathways, patients = build(population=population)
+    run_simulation(Patient, patients, pathways, actions, *run_args(), rng)
+    checked = 0
+    for p in patients:
+        history = list(p.history)
+        for pw in pathways:
+            expected = _scan(history, pw.name)
+            assert p.pathway_actions.get(pw.name) == expected
+            assert pw.get_current_action_on_pathway(p) == (expected[0] if expected else None)
+            assert pw.get_last_action_on_pathway(p) == (expected[1] if expected else None)
+            checked += expected is not None and expected[1] is not None
+        assert set(p.pathway_actions) == {pathway for _, pathway in history}
+    assert checked > 0
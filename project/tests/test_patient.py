@@ -0,0 +1,58 @@
+import pytest
+from conftest import build
+from healthcare_sim import config
+
+
+@pytest.fixture(params=[False, True], ids=['patient', 'population'])
+def patient(request):
+    return build(NUM_PATIENTS=5, population=request.param)[3][2]
+
+
+def test_disease_view_matches_mask(patient):
+    assert dict(patient.diseases) == {f'P{j}': False for j in range(config.NUM_PATHWAYS)}
+    patient.diseases['P3'] = True
+    patient.diseases['P0'] = True
+    patient.diseases['P0'] = True  # Setting a flag twice keeps one bit
+    assert patient.disease_mask == 0b1001
+    assert patient.has_disease('P3') and patient.diseases['P3'] and patient.comorbidities == 2
+    patient.diseases['P3'] = False
+    assert patient.disease_mask == 0b1 and not patient.has_disease('P3') and patient.comorbidities == 1
+
+    patient.diseases = {'P1': True, 'P2': False, 'P9': True}
+    assert patient.disease_mask == 0b1000000010
+    assert [name for name, flag in patient.diseases.items() if flag] == ['P1', 'P9']
+    assert 'P9' in patient.diseases and 'P10' not in patient.diseases and not patient.has_disease('P10')
+    assert len(patient.diseases) == config.NUM_PATHWAYS
+    with pytest.raises(KeyError):
+        patient.diseases['P10']
+    with pytest.raises(TypeError):
+        del patient.diseases['P1']
+
+
+def test_outcomes_view_behaves_like_dict(patient):
+    outcomes = patient.outcomes
+    assert outcomes == {'queue_penalty': 1000000, 'clinical_penalty': 100}
+    assert list(outcomes) == ['queue_penalty', 'clinical_penalty'] and len(outcomes) == 2
+    assert outcomes.get('missing') is None and 'queue_penalty' in outcomes
+
+    outcomes['queue_penalty'] = 90
+    outcomes.update(clinical_penalty=12.5)
+    assert patient.queue_penalty == 90 and patient.clinical_penalty == 12.5
+    assert dict(patient.outcomes) == {'queue_penalty': 90, 'clinical_penalty': 12.5}
+    assert repr(patient.outcomes) == repr({'queue_penalty': 90, 'clinical_penalty': 12.5})
+
+    copied = dict(patient.outcomes)
+    patient.outcomes['queue_penalty'] = 0
+    assert copied['queue_penalty'] == 90  # A copy does not follow the patient
+    with pytest.raises(KeyError):
+        outcomes['missing']
+    with pytest.raises(KeyError):
+        outcomes['missing'] = 1
+    with pytest.raises(TypeError):
+        del outcomes['queue_penalty']
+
+
+def test_outcomes_assignment():
+    patient = build(NUM_PATIENTS=5)[3][0]
+    patient.outcomes = {'queue_penalty': 7, 'clinical_penalty': 3.0}
+    assert (patient.queue_penalty, patient.clinical_penalty) == (7, 3.0)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Patient, QPolicy, TransitionTable, run_simulation
+
+
+@pytest.fixture
+def table():
+    # P0: a0 -> a1 or a2, a1 -> a3, a2 -> a3; a3 is the output action
+    return TransitionTable.from_dict({'P0': {'a0': ['a1', 'a2'], 'a1': ['a3'], 'a2': ['a3'], 'a3': []}}, ['a0', 'a1', 'a2', 'a3'])
+
+
+def _codes(*values):
+    return np.array(values, dtype=np.int64)
+
+
+def test_greedy_choice_follows_q_table(table):
+    policy = QPolicy(table, epsilon=0.0)
+    policy.q[0, 0, :, 2] = 1.0  # a0 -> a2 is best in every state
+    policy.q[0, 0, 1, 3] = 5.0  # a0 -> a3 is not a valid transition, so is never chosen
+    pathways, actions, states = _codes(0, 0, 0, 0), _codes(0, 0, 1, 3), _codes(0, 1, 2, 0)
+    first = policy.choose(pathways, actions, states, np.random.default_rng(0))
+    assert first.tolist() == [2, 2, 3, -1]
+    assert np.array_equal(policy.choose(pathways, actions, states, np.random.default_rng(1)), first)
+    assert policy.greedy_actions('P0', 'a0') == ['a2', 'a1']
+
+
+def test_exploration_picks_valid_actions(table):
+    policy = QPolicy(table, epsilon=1.0)
+    chosen = policy.choose(_codes(*[0] * 1000), _codes(*[0] * 1000), _codes(*[0] * 1000), np.random.default_rng(0))
+    assert set(chosen.tolist()) == {1, 2}
+
+
+def test_learn_updates_the_chosen_entry(table):
+    policy = QPolicy(table, alpha=0.5, gamma=0.9)
+    policy.q[0, 2, 4, 3] = 2.0  # Best value from (a2, state 4)
+    policy.learn(_codes(0), _codes(0), _codes(1), _codes(2), [1.0], _codes(4))
+    expected = np.zeros_like(policy.q)
+    expected[0, 2, 4, 3] = 2.0
+    expected[0, 0, 1, 2] = 0.5 * (1.0 + 0.9 * 2.0)
+    np.testing.assert_allclose(policy.q, expected, rtol=1e-6)
+
+
+def test_learn_terminal_and_shared_entries(table):
+    policy = QPolicy(table, alpha=0.5, gamma=0.9)
+    policy.q[0, 3, :, :] = 100.0  # Ignored: a3 has no successors, so moving to it ends the episode
+    # Two pairs make the same choice from the same state; their TD errors are averaged
+    policy.learn(_codes(0, 0, 0), _codes(1, 1, 0), _codes(0, 0, 0), _codes(3, 3, -1), [2.0, 4.0, 9.0], _codes(0, 0, 0))
+    assert policy.q[0, 1, 0, 3] == pytest.approx(0.5 * 3.0)
+    assert policy.q[0, 0].sum() == 0  # The pair with no next action is skipped
+
+
+def test_run_trains_the_policy():
+    rng, actions, pathways, patients = build()
+    policy = QPolicy(pathways[0].transitions, epsilon=0.5, epsilon_decay=0.5)
+    run_simulation(Patient, patients, pathways, actions, *run_args(), rng, policy=policy)
+    assert np.count_nonzero(policy.q) > 0
+    assert not policy.q[~np.broadcast_to(policy.valid[:, :, None, :], policy.q.shape)].any()
+    assert policy.epsilon == 0.25
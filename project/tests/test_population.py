@@ -0,0 +1,45 @@
+import numpy as np
+from conftest import build, run_args
+from healthcare_sim import Patient, Population, config, run_simulation
+from healthcare_sim.rng import StepRandom
+
+
+def _outputs(population):
+    rng, actions, pathways, patients = build(population=population)
+    actions_major, _, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history = run_simulation(
+        Patient, patients, pathways, actions, *run_args(), rng)
+    return {
+        'clinical_penalty_history': clinical_penalty_history,
+        'queue_length_history': queue_length_history,
+        'activity_log': {m: list(log) for m, log in activity_log_major.items()},  # Decoded, as label codes are per log
+        'system_cost': system_cost_major,
+        'schedules': {m: snapshot.schedule.tolist() for m, snapshot in actions_major.items()},
+        'patients': [(dict(p.clinical), dict(p.outcomes), dict(p.diseases), p.queue_time, list(p.history)) for p in patients],
+    }
+
+
+def test_population_run_matches_patient_run():
+    expected = _outputs(population=False)
+    got = _outputs(population=True)
+    assert len(expected['activity_log'][0]) > 0
+    for key, value in expected.items():
+        assert got[key] == value, key
+
+
+def test_cohort_decay_matches_per_pathway_decay():
+    _, _, _, patients = build()
+    for i, p in enumerate(patients):
+        p.diseases = {f'P{j}': (i + j) % 3 == 0 for j in range(config.NUM_PATHWAYS)}
+    pop = Population.from_patients(patients, config.NUM_PATHWAYS, config.IDEAL_CLINICAL_VALUES)
+
+    step_rng = StepRandom(np.random.default_rng(0))
+    step_rng.next_step()
+    for p in patients:
+        for _ in range(p.comorbidities):
+            Patient.clinical_decay(p, config.IDEAL_CLINICAL_VALUES, step_rng)
+    cohort_rng = StepRandom(np.random.default_rng(0))
+    cohort_rng.next_step()
+    pop.clinical_decay(config.IDEAL_CLINICAL_VALUES, cohort_rng)
+
+    assert [dict(view.clinical) for view in pop] == [p.clinical for p in patients]
+    assert cohort_rng.get_state() == step_rng.get_state()
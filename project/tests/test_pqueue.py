@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Action, Checkpoint, Pathway, Patient, config, run_simulation
+from healthcare_sim.pqueue import IndexedPriorityQueue
+
+
+def _queue(priorities, tiebreaks):
+    queue = IndexedPriorityQueue()
+    for item, (priority, tiebreak) in enumerate(zip(priorities, tiebreaks)):
+        queue.push(item, priority, tiebreak)
+    return queue
+
+
+def _drain(queue):
+    entries = []
+    while queue:
+        entries.append(queue.pop())
+    return entries
+
+
+def _check_index(queue):
+    assert {entry[2]: i for i, entry in enumerate(queue._heap)} == queue._pos
+
+
+@pytest.fixture
+def draws():
+    rng = np.random.default_rng(0)
+    # Few distinct values, so many entries tie on priority and tiebreak
+    return rng.integers(0, 5, 200).astype(float), rng.integers(0, 3, 200)
+
+
+def test_pop_order_matches_sorted(draws):
+    queue = _queue(*draws)
+    expected = sorted(queue.entries())
+    _check_index(queue)
+    assert _drain(queue) == expected
+
+
+def test_ties_are_served_in_push_order():
+    queue = _queue([1.0] * 10, [0] * 10)
+    assert [item for _, _, _, item in _drain(queue)] == list(range(10))
+
+
+@pytest.mark.parametrize('shift', [-10.0, 10.0])
+def test_update_moves_entries(draws, shift):
+    queue = _queue(*draws)
+    rng = np.random.default_rng(1)
+    for entry_id in rng.choice(200, 50, replace=False).tolist():
+        queue.update(entry_id, float(draws[0][entry_id] + shift * rng.random()))
+        _check_index(queue)
+    expected = sorted(queue.entries())
+    assert _drain(queue) == expected
+
+
+@pytest.mark.parametrize('batch', [10, 500])  # Sifted in one by one, and appended then heapified
+def test_push_many(draws, batch):
+    queue = _queue(*draws)
+    rng = np.random.default_rng(2)
+    ids = queue.push_many(list(range(200, 200 + batch)), rng.integers(0, 5, batch).astype(float), rng.integers(0, 3, batch))
+    assert ids == list(range(200, 200 + batch))
+    _check_index(queue)
+    expected = sorted(queue.entries())
+    assert _drain(queue) == expected
+
+
+@pytest.mark.parametrize('k', [5, 150])  # Popped one at a time, and ranked with one lexsort
+def test_pop_many(draws, k):
+    queue = _queue(*draws)
+    expected = sorted(queue.entries())
+    assert queue.pop_many(k) == expected[:k]
+    _check_index(queue)
+    assert _drain(queue) == expected[k:]
+
+
+def test_entry_ids_are_per_queue():
+    first, second = _queue([1.0, 2.0], [0, 0]), IndexedPriorityQueue()
+    assert second.push('a', 1.0) == 0
+    assert first.next_id == 2
+
+    restored = IndexedPriorityQueue.from_entries(first.entries())
+    assert restored.next_id == 2
+    restored = IndexedPriorityQueue.from_entries(first.entries(), next_id=5)
+    assert restored.push('b', 0.0) == 5
+    assert first.next_id == 2
+
+
+def test_loading_a_checkpoint_leaves_other_queues_alone(tmp_path):
+    # Entry ids once came from one process-wide counter, which Checkpoint.load rewound for every queue
+    rng, actions, pathways, patients = build(NUM_PATIENTS=50)
+    run_simulation(Patient, patients, pathways, actions, *run_args(NUM_STEPS=4), rng, checkpoint_every=2, checkpoint_dir=tmp_path)
+    queue = _queue([1.0] * 5, [0] * 5)
+    Checkpoint.load(tmp_path / 'checkpoint_1_000002.npz', Patient, Action, Pathway, config.IDEAL_CLINICAL_VALUES)
+    queue.push_many(list(range(5, 10)), [1.0] * 5, [0] * 5)
+    assert [item for _, _, _, item in _drain(queue)] == list(range(10))
@@ -0,0 +1,38 @@
+import inspect
+import pytest
+from healthcare_sim import render
+
+pytest.importorskip('matplotlib')
+
+
+def _jobs(scale=1):
+    system_cost_major = {0: {0: 10 * scale, 1: 30 * scale}, 1: {0: 5 * scale, 1: 20 * scale}}
+    return {'vis_learning': (system_cost_major, 0, 1)}
+
+
+def test_unchanged_figures_are_cached(tmp_path):
+    assert render.render_figures(_jobs(), tmp_path, workers=1) == {'vis_learning': 'rendered'}
+    assert (tmp_path / 'learning.png').exists()
+    assert render.render_figures(_jobs(), tmp_path, workers=1) == {'vis_learning': 'cached'}
+
+
+def test_changed_arguments_are_rendered(tmp_path):
+    render.render_figures(_jobs(), tmp_path, workers=1)
+    assert render.render_figures(_jobs(scale=2), tmp_path, workers=1) == {'vis_learning': 'rendered'}
+    assert render.render_figures(_jobs(scale=2), tmp_path, workers=1) == {'vis_learning': 'cached'}
+
+
+def test_missing_file_is_rendered(tmp_path):
+    render.render_figures(_jobs(), tmp_path, workers=1)
+    (tmp_path / 'learning.png').unlink()
+    assert render.render_figures(_jobs(), tmp_path, workers=1) == {'vis_learning': 'rendered'}
+
+
+def test_any_change_to_vis_module_changes_key(monkeypatch):
+    from healthcare_sim import vis
+
+    key = render.figure_key('vis_learning', _jobs()['vis_learning'])
+    getsource = inspect.getsource
+    # An edit outside vis_learning itself, e.g. to a shared helper or a module-level constant
+    monkeypatch.setattr(inspect, 'getsource', lambda obj: getsource(obj) + ('\nSHARED = 1\n' if obj is vis else ''))
+    assert render.figure_key('vis_learning', _jobs()['vis_learning']) != key
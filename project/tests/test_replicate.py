@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from healthcare_sim.replicate import confidence_interval, default_parameters, run_replication, run_replications
+
+SMALL = {'NUM_PATIENTS': 20, 'NUM_STEPS': 5}
+
+
+def test_workers_give_the_same_results():
+    serial = run_replications(4, seed=11, workers=1, **SMALL)
+    parallel = run_replications(4, seed=11, workers=2, **SMALL)
+    assert parallel == serial
+    assert len({run['total_system_cost'] for run in serial['runs']}) > 1  # Each replication has its own stream
+
+
+def test_runs_follow_spawned_seed_streams():
+    result = run_replications(3, seed=5, workers=1, **SMALL)
+    children = np.random.SeedSequence(5).spawn(3)
+    assert result['runs'] == [run_replication(child, default_parameters(**SMALL)) for child in children]
+    assert run_replications(3, seed=6, workers=1, **SMALL)['runs'] != result['runs']
+
+    unseeded = run_replications(2, workers=1, **SMALL)
+    assert run_replications(2, seed=unseeded['seed'], workers=1, **SMALL)['runs'] == unseeded['runs']
+
+
+def test_summary_and_parameters():
+    mean, std, low, high = confidence_interval([1.0, 2.0, 3.0])
+    assert (mean, std) == (2.0, 1.0)
+    assert (low, high) == pytest.approx((2.0 - 4.303 / np.sqrt(3), 2.0 + 4.303 / np.sqrt(3)), abs=1e-3)
+    assert np.isnan(confidence_interval([1.0])[1])
+    with pytest.raises(ValueError, match='NUM_PATIENT'):
+        default_parameters(NUM_PATIENT=10)
@@ -0,0 +1,105 @@
+import csv
+import glob
+import os
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import ActivityLog, ChunkedFileSink, MemorySink, Patient, RecordSink, config, run_simulation
+
+NUM_STEPS = 30
+
+
+def _reference():
+    """
+    Returns the histories and decoded activity log rows of a normal (in-memory) run.
+    """
+    rng, actions, pathways, patients = build()
+    actions_major, _, system_cost_major, activity_log_major, clinical_penalty_history, queue_length_history = run_simulation(
+        Patient, patients, pathways, actions, *run_args(NUM_STEPS), rng)
+    return {
+        'avg_clinical_penalty': clinical_penalty_history,
+        'avg_queue_length': queue_length_history,
+        'system_cost': [system_cost_major[m][step] for m in sorted(system_cost_major) for step in range(NUM_STEPS)],
+        'schedule': np.concatenate([snapshot.schedule for snapshot in actions_major.values()], axis=1).T.tolist(),
+        'rows': [row for m in sorted(activity_log_major) for row in activity_log_major[m]],
+    }
+
+
+def _streamed(sink):
+    rng, actions, pathways, patients = build()
+    run_simulation(Patient, patients, pathways, actions, *run_args(NUM_STEPS), rng, sink=sink)
+
+
+def test_record_sink_is_abstract():
+    with pytest.raises(TypeError):
+        RecordSink()
+
+    class Incomplete(RecordSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_memory_sink_matches_in_memory_run():
+    reference = _reference()
+    sink = MemorySink()
+    _streamed(sink)
+    assert len(sink.records) == config.NUM_EPISODES * NUM_STEPS
+    assert [(r['major_step'], r['step']) for r in sink.records] == [
+        (m, step) for m in range(config.NUM_EPISODES) for step in range(NUM_STEPS)]
+    for key in ('avg_clinical_penalty', 'avg_queue_length', 'system_cost', 'schedule'):
+        assert [r[key] for r in sink.records] == reference[key], key
+    assert list(sink.activity_log) == reference['rows']
+
+
+def test_chunked_file_sink_rolls_over(tmp_path):
+    reference = _reference()
+    sink = ChunkedFileSink(tmp_path, flush_every=7)
+    _streamed(sink)
+
+    total = config.NUM_EPISODES * NUM_STEPS
+    steps = sorted(glob.glob(os.path.join(tmp_path, 'steps_*.npz')))
+    assert [os.path.basename(path) for path in steps] == [f'steps_{c:05d}.npz' for c in range(-(-total // 7))]
+    chunks = [np.load(path) for path in steps]
+    assert [len(chunk['step']) for chunk in chunks] == [7] * (total // 7) + [total % 7]
+    assert np.concatenate([chunk['avg_queue_length'] for chunk in chunks]).tolist() == reference['avg_queue_length']
+    assert np.concatenate([chunk['schedule'] for chunk in chunks]).tolist() == reference['schedule']
+
+    # The activity log is emptied at every flush, so the files hold the whole run's rows between them
+    log = ActivityLog.load(glob.glob(os.path.join(tmp_path, 'activity_*.npz')))
+    assert list(log) == reference['rows']
+    assert set(sink.paths) == set(glob.glob(os.path.join(tmp_path, '*')))
+
+
+def test_chunked_file_sink_csv(tmp_path):
+    sink = ChunkedFileSink(tmp_path, flush_every=NUM_STEPS, fmt='csv', action_names=['x', 'y'])
+    log = ActivityLog()
+    log.record('P0', True, 1, 0, None, 'a0', 'a1')
+    for step in range(NUM_STEPS + 1):
+        sink.write_step({'major_step': 0, 'step': step, 'step_cost': 1, 'system_cost': step, 'avg_clinical_penalty': 2.0,
+                         'avg_queue_length': 0.5, 'schedule': [step, 0]}, log)
+    sink.close()
+    with open(tmp_path / 'steps_00001.csv') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][-2:] == ['schedule_x', 'schedule_y']
+    assert rows[1][1] == str(NUM_STEPS) and rows[1][-2:] == [str(NUM_STEPS), '0']
+    assert os.path.exists(tmp_path / 'activity_00000_00000.csv') and len(log) == 0
+    with pytest.raises(ValueError, match='format'):
+        ChunkedFileSink(tmp_path, fmt='parquet')
+
+
+def test_chunked_file_sink_state_resumes_numbering(tmp_path):
+    record = {'major_step': 0, 'step': 0, 'step_cost': 0, 'system_cost': 0, 'avg_clinical_penalty': 0.0,
+              'avg_queue_length': 0.0, 'schedule': [0]}
+    first = ChunkedFileSink(tmp_path, flush_every=1)
+    for _ in range(3):
+        first.write_step(record, ActivityLog())
+    assert first.get_state() == {'chunk': 3}
+
+    resumed = ChunkedFileSink(tmp_path, flush_every=1)
+    resumed.set_state(first.get_state())
+    resumed.write_step(record, ActivityLog())
+    assert resumed.paths == [os.path.join(tmp_path, 'steps_00003.npz')]
+    assert len(glob.glob(os.path.join(tmp_path, 'steps_*.npz'))) == 4
+    assert ChunkedFileSink(tmp_path, start_chunk=5).get_state() == {'chunk': 5}
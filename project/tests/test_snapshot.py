@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import ActionsSnapshot, Patient, run_simulation
+
+
+def test_mid_run_snapshot_is_unaffected_by_later_steps(monkeypatch):
+    rng, actions, pathways, patients = build()
+    taken = []
+    draw_onsets = Patient.draw_onsets
+
+    def snapshot_at_step_10(*args):
+        if not taken and len(next(iter(actions.values())).schedule) == 10:
+            taken.append((ActionsSnapshot(actions), {name: list(act.schedule) for name, act in actions.items()}))
+        return draw_onsets(*args)
+
+    monkeypatch.setattr(Patient, 'draw_onsets', staticmethod(snapshot_at_step_10))
+    run_simulation(Patient, patients, pathways, actions, *run_args(), rng)  # Later steps append, then reset() clears
+    snapshot, schedules = taken[0]
+
+    assert all(len(act.schedule) == 0 for act in actions.values())
+    assert snapshot.schedule.shape == (len(actions), 10)
+    assert {name: act.schedule.tolist() for name, act in snapshot.items()} == schedules
+    assert snapshot.schedule.sum() > 0
+
+
+def test_snapshot_exposes_what_the_visualisations_read():
+    _, actions, _, _ = build()
+    for i, act in enumerate(actions.values()):
+        act.schedule = [i, i + 1, 0]
+    snapshot = ActionsSnapshot(actions)
+    for act in actions.values():
+        act.schedule.append(99)
+        act.cost += 1
+
+    assert list(snapshot) == list(actions) and len(snapshot) == len(actions) and 'a0' in snapshot
+    for i, (name, act) in enumerate(snapshot.items()):
+        live = actions[name]
+        assert act.name == name
+        assert (act.base_capacity, act.duration, act.effect) == (live.base_capacity, live.duration, live.effect)
+        assert act.cost == live.cost - 1 == snapshot.cost[i]
+        assert act.schedule.tolist() == [i, i + 1, 0] and sum(act.schedule) == 2 * i + 1
+    assert np.array([act.schedule for act in snapshot.values()]).shape == (len(actions), 3)  # As vis_heatmaps stacks them
+    with pytest.raises(TypeError):
+        snapshot['a0'] = None
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from healthcare_sim import Action, Pathway, Patient, config, initialize_patients, initialize_simulation, run_simulation, sweep
+from healthcare_sim.replicate import summarise_run
+
+SMALL = {'NUM_PATIENTS': 20, 'NUM_STEPS': 5, 'NUM_EPISODES': 1}
+
+
+def test_point_matches_direct_run():
+    params = sweep.sweep_parameters(BASE_CAPACITY=3, **SMALL)
+    build_seed, cohort_seed, run_seed = np.random.SeedSequence(7).spawn(3)
+    actions, pathways, _ = initialize_simulation(
+        Action, Pathway, params['NUM_PATIENTS'], params['NUM_PATHWAYS'], params['NUM_ACTIONS'], 3,
+        config.IDEAL_CLINICAL_VALUES, params['PROBABILITY_OF_DISEASE'], params['INPUT_ACTIONS'], params['OUTPUT_ACTIONS'],
+        np.random.default_rng(build_seed)
+    )
+    patients = initialize_patients(Patient, params['NUM_PATHWAYS'], config.IDEAL_CLINICAL_VALUES, params['NUM_PATIENTS'],
+                                   np.random.default_rng(cohort_seed))
+    _, _, system_cost_major, _, _, _ = run_simulation(
+        Patient, patients, pathways, actions, params['OUTPUT_ACTIONS'], params['INPUT_ACTIONS'], params['PROBABILITY_OF_DISEASE'],
+        params['NUM_PATHWAYS'], params['NUM_STEPS'], config.IDEAL_CLINICAL_VALUES, np.random.default_rng(run_seed), NUM_EPISODES=1
+    )
+    assert sweep.run_point(params, 7) == summarise_run(patients, system_cost_major, params['NUM_STEPS'])
+
+
+def test_build_keeps_clinical_variable_order():
+    params = sweep.sweep_parameters(**SMALL)
+    build_params = {name: params[name] for name in dict.fromkeys(sweep.BUILD_PARAMETERS + sweep.COHORT_PARAMETERS)}
+    actions, _, patients = sweep._build(sweep._json(build_params), 0)
+    assert list(actions['a0'].effect) == list(config.IDEAL_CLINICAL_VALUES)
+    assert list(patients[0].clinical) == list(config.IDEAL_CLINICAL_VALUES)
+
+
+def test_repeated_points_are_memoised(tmp_path, monkeypatch):
+    grid = {'BASE_CAPACITY': [3, 5]}
+    first = sweep.run_sweep(grid, seeds=(0,), cache_dir=tmp_path, workers=1, **SMALL)
+    assert (first['computed'], first['cached']) == (2, 0)
+
+    def fail(params, seed):
+        raise AssertionError("A memoised point was run again")
+
+    monkeypatch.setattr(sweep, 'run_point', fail)
+    again = sweep.run_sweep(grid, seeds=(0,), cache_dir=tmp_path, workers=1, **SMALL)
+    assert (again['computed'], again['cached']) == (0, 2)
+    assert again['runs'] == first['runs']
+
+
+def test_changed_parameter_is_run(tmp_path):
+    sweep.run_sweep({'BASE_CAPACITY': [3]}, seeds=(0,), cache_dir=tmp_path, workers=1, **SMALL)
+    sweep._build.cache_clear()
+    changed = sweep.run_sweep({'BASE_CAPACITY': [3, 4]}, seeds=(0, 1), cache_dir=tmp_path, workers=1, **SMALL)
+    assert (changed['computed'], changed['cached']) == (3, 1)
+    # Points that differ only in run-time parameters share one build per seed
+    assert sweep._build.cache_info().misses == 2
+
+    other = sweep.run_sweep({'BASE_CAPACITY': [3]}, seeds=(0,), cache_dir=tmp_path, workers=1, **{**SMALL, 'NUM_STEPS': 6})
+    assert (other['computed'], other['cached']) == (1, 0)
+
+
+def test_workers_give_the_same_results(tmp_path):
+    grid = {'BASE_CAPACITY': [3, 5]}
+    serial = sweep.run_sweep(grid, seeds=(0, 1), cache_dir=None, workers=1, **SMALL)
+    parallel = sweep.run_sweep(grid, seeds=(0, 1), cache_dir=None, workers=2, **SMALL)
+    assert parallel['runs'] == serial['runs']
+
+
+def test_point_key_depends_on_every_parameter():
+    params = sweep.sweep_parameters()
+    assert sweep.point_key(params, 0) == sweep.point_key(dict(reversed(list(params.items()))), 0)
+    assert sweep.point_key(params, 0) != sweep.point_key(params, 1)
+    assert sweep.point_key(params, 0) != sweep.point_key({**params, 'COST_SCALE': 1.1}, 0)
+    reordered = dict(reversed(list(params['IDEAL_CLINICAL_VALUES'].items())))
+    assert sweep.point_key(params, 0) != sweep.point_key({**params, 'IDEAL_CLINICAL_VALUES': reordered}, 0)
@@ -0,0 +1,46 @@
+import numpy as np
+from conftest import build
+from healthcare_sim import ThresholdTensor, config
+
+
+def _tensor(seed=0):
+    pathway_names = [f'P{p}' for p in range(config.NUM_PATHWAYS)]
+    action_names = [f'a{i}' for i in range(config.NUM_ACTIONS)]
+    return ThresholdTensor.random(pathway_names, action_names, config.IDEAL_CLINICAL_VALUES, np.random.default_rng(seed))
+
+
+def test_lookups_match_values():
+    tensor = _tensor()
+    assert tensor.columns == list(config.IDEAL_CLINICAL_VALUES) + ['age', 'rand_factor']
+    for j, pathway in enumerate(tensor):
+        for a, action in enumerate(tensor.action_names):
+            row = tensor[pathway][action]
+            assert list(row) == tensor.columns
+            assert [row[c] for c in tensor.columns] == tensor.values[j, a].tolist()
+            assert type(row['age']) is int
+    assert ThresholdTensor.from_dict(tensor.to_dict()).to_dict() == tensor.to_dict()
+
+
+def test_draws_follow_nested_dict_distributions():
+    tensor = _tensor()
+    ideal = np.array(list(config.IDEAL_CLINICAL_VALUES.values()))
+    clinical, age, rand_factor = tensor.values[..., :-2], tensor.values[..., -2], tensor.values[..., -1]
+    np.testing.assert_allclose(clinical.mean(axis=(0, 1)), ideal, atol=2.0)
+    np.testing.assert_allclose(clinical.std(axis=(0, 1)), 5, rtol=0.3)
+    assert (age == np.round(age)).all() and age.min() >= 18 and age.max() < 65
+    assert rand_factor.min() >= 0.2 and rand_factor.max() < 0.8
+
+
+def test_crossings_match_per_patient_dict_logic():
+    # The tensor compared against the whole cohort at once must agree with a per-patient, per-key dict comparison
+    tensor = _tensor()
+    _, _, _, patients = build(population=True)
+    keys = list(config.IDEAL_CLINICAL_VALUES)
+    for pathway, action in [('P0', 'a0'), ('P3', 'a7'), ('P9', 'a9')]:
+        row = tensor.values[tensor.pathway_index[pathway], tensor.action_names.index(action)]
+        above = patients.clinical >= row[:len(keys)]
+        too_old = patients.age >= row[tensor.columns.index('age')]
+        thresholds = tensor.to_dict()[pathway][action]
+        assert above.tolist() == [[p.clinical[k] >= thresholds[k] for k in keys] for p in patients]
+        assert too_old.tolist() == [p.age >= thresholds['age'] for p in patients]
+        assert 0 < above.sum() < above.size
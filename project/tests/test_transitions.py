@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Patient, TransitionTable, config, run_simulation
+from healthcare_sim.build import generate_transition_matrix
+from healthcare_sim.transitions import active_pairs, sample_next_actions
+
+
+def test_dict_round_trip():
+    matrix = generate_transition_matrix(config.NUM_PATHWAYS, config.NUM_ACTIONS, config.INPUT_ACTIONS,
+                                        config.OUTPUT_ACTIONS, np.random.default_rng(0))
+    table = TransitionTable.from_dict(matrix)
+    assert table.to_dict() == matrix
+    assert list(table) == list(matrix)
+    for pathway, transitions in matrix.items():
+        assert table[pathway] == transitions
+        for action, next_actions in transitions.items():
+            codes = table.successors(table.pathway_index[pathway], table.action_index[action])
+            assert [table.action_names[b] for b in codes] == next_actions
+
+
+def test_pathway_view_matches_compiled_table():
+    _, _, pathways, _ = build()
+    table = pathways[0].transitions
+    assert TransitionTable.from_dict(table.to_dict(), table.action_names).to_dict() == table.to_dict()
+    for pw in pathways:
+        for action, next_actions in pw.transitions[pw.name].items():
+            assert next_actions == table.to_dict()[pw.name][action]
+            assert (len(next_actions) == 0) == (action == config.OUTPUT_ACTIONS)
+
+
+def test_sample_follows_row_probabilities():
+    # a0's row lists a1 twice, so a1 should be picked two times in three
+    table = TransitionTable.from_dict({'P0': {'a0': ['a1', 'a1', 'a2'], 'a1': ['a2', 'a3'], 'a2': [], 'a3': ['a0']}},
+                                      ['a0', 'a1', 'a2', 'a3'])
+    n = 30000
+    rng = np.random.default_rng(0)
+    for action, expected in [(0, {1: 2 / 3, 2: 1 / 3}), (1, {2: 0.5, 3: 0.5}), (2, {-1: 1.0}), (3, {0: 1.0})]:
+        chosen = table.sample(np.zeros(n, dtype=np.int64), np.full(n, action), rng.random(n))
+        values, counts = np.unique(chosen, return_counts=True)
+        assert dict(zip(values.tolist(), (counts / n).tolist())) == pytest.approx(expected, abs=0.01)
+
+
+def test_sample_next_actions_frequencies():
+    _, actions, pathways, patients = build(NUM_PATIENTS=2000)
+    table = pathways[0].transitions
+    for p in patients:
+        p.diseases = {'P0': True}
+        p.record_action('a0', 'P0')
+    chosen = sample_next_actions(table, patients, pathways, np.random.default_rng(0))
+    assert len(chosen) == len(patients)
+    successors = table['P0']['a0']
+    frequencies = {name: chosen.count(name) / len(chosen) for name in successors}
+    assert set(chosen) <= set(successors)
+    assert frequencies == pytest.approx({name: 1 / len(successors) for name in successors}, abs=0.05)
+
+
+def test_population_pairs_match_patient_loop():
+    rng, actions, pathways, patients = build(population=True)
+    run_simulation(Patient, patients, pathways, actions, *run_args(NUM_STEPS=10), rng)
+    table = pathways[0].transitions
+    vectorized = active_pairs(table, patients, pathways)
+    looped = active_pairs(table, list(patients), pathways)  # A plain list of views takes the per-patient loop
+    assert len(vectorized[0]) > 0
+    for got, expected in zip(vectorized, looped):
+        assert np.array_equal(got, expected)
@@ -0,0 +1,75 @@
+import pytest
+from conftest import build, run_args
+from healthcare_sim import Patient, run_simulation
+
+pytest.importorskip('plotly')
+pytest.importorskip('seaborn')
+
+from healthcare_sim import vis
+
+
+def _reference(rows, patient_id, pathway_code, output_action):
+    """
+    The per-row loops vis_sankey used before it was aggregated: presence per (pathway, time), exits and Sankey links.
+    """
+    patient_rows = [row for row in rows if row['patient_id'] == patient_id]
+    presence = {}
+    for row in patient_rows:
+        presence[row['pathway_code'], row['simulation_time']] = 1
+    exits = {(row['pathway_code'], row['simulation_time']) for row in patient_rows if row['next_action'] == output_action}
+    links = {}
+    for row in patient_rows:
+        if row['pathway_code'] == pathway_code and row['action_name'] != output_action:
+            links[row['action_name'], row['next_action']] = links.get((row['action_name'], row['next_action']), 0) + 1
+    return presence, exits, links
+
+
+@pytest.fixture
+def log():
+    rng, actions, pathways, patients = build(NUM_PATIENTS=20)
+    return run_simulation(Patient, patients, pathways, actions, *run_args(), rng, NUM_EPISODES=1)[3][0]
+
+
+@pytest.fixture
+def drawn(monkeypatch, tmp_path):
+    """
+    Runs vis_sankey without writing images, capturing the presence heatmap, its red overlay and the Sankey figure.
+    """
+    captured = {}
+    heatmap = vis.sns.heatmap
+
+    def capture_heatmap(data, **kwargs):
+        captured['presence'] = data
+        captured['ax'] = heatmap(data, **kwargs)
+        return captured['ax']
+
+    monkeypatch.setattr(vis, 'display', lambda *args: None)
+    monkeypatch.setattr(vis.sns, 'heatmap', capture_heatmap)
+    monkeypatch.setattr(vis.go.Figure, 'write_image', lambda fig, *args, **kwargs: captured.setdefault('figure', fig))
+
+    def draw(activity_log, **kwargs):
+        vis.vis_sankey(activity_log, output_dir=tmp_path, **kwargs)
+        return captured
+    return draw
+
+
+@pytest.mark.parametrize('as_list', [False, True])
+def test_sankey_matches_per_row_loop(log, drawn, as_list):
+    rows = list(log)
+    patient_id, pathway_code = max(((r['patient_id'], r['pathway_code']) for r in rows), key=lambda key: sum(
+        (r['patient_id'], r['pathway_code']) == key for r in rows))
+    presence, exits, links = _reference(rows, patient_id, pathway_code, 'a9')
+    captured = drawn(rows if as_list else log, patient_ids=patient_id, pathway_codes=pathway_code)
+
+    matrix = captured['presence']
+    assert {(p, t) for p in matrix.index for t in matrix.columns if matrix.loc[p, t]} == set(presence)
+    assert set(matrix.to_numpy().ravel().tolist()) <= {0, 1}
+    patches = {(matrix.index[int(patch.get_y())], matrix.columns[int(patch.get_x())]) for patch in captured['ax'].patches}
+    assert patches == exits
+
+    sankey = captured['figure'].data[0]
+    labels = list(sankey.node.label)
+    got = {(labels[s], labels[t]): v for s, t, v in zip(sankey.link.source, sankey.link.target, sankey.link.value)}
+    assert got == links and len(links) > 1
+    assert len(labels) == len({action for link in links for action in link})
+    assert labels[0] in ('a0', 'a1') and ('a9' not in labels or labels[-1] == 'a9')